@@ -0,0 +1,118 @@
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+MAX_AVAILABILITY_DAYS = 31
+DEFAULT_SLOT_MINUTES = 30
+MAX_SLOT_MINUTES = 480
+DEFAULT_SLOTS_LIMIT = 10
+MAX_SLOTS_LIMIT = 100
+
+Interval = tuple[datetime, datetime]
+
+
+@dataclass(frozen=True)
+class WorkingWindow:
+    """Рабочее окно в день недели (0 — понедельник)."""
+
+    weekday: int
+    start: time
+    end: time
+
+
+@dataclass
+class DoctorSchedule:
+    """Расписание доктора: длина приёма и рабочие окна по дням недели."""
+
+    doctor_id: int
+    slot: timedelta
+    windows: list[WorkingWindow]
+
+
+def working_slots(schedule: DoctorSchedule, start: datetime, end: datetime):
+    """Все слоты расписания внутри [start, end) по возрастанию времени.
+
+    Окна одного дня не пересекаются (проверяется при сохранении),
+    поэтому обход окон по началу даёт слоты в хронологическом порядке.
+    """
+    by_weekday: dict[int, list[WorkingWindow]] = defaultdict(list)
+    for window in sorted(schedule.windows, key=lambda w: w.start):
+        by_weekday[window.weekday].append(window)
+    day: date = start.date()
+    while datetime.combine(day, time.min) < end:
+        for window in by_weekday.get(day.weekday(), ()):
+            slot_start = datetime.combine(day, window.start)
+            window_end = datetime.combine(day, window.end)
+            while slot_start + schedule.slot <= window_end:
+                slot_end = slot_start + schedule.slot
+                if slot_end > end:
+                    return
+                if slot_start >= start:
+                    yield slot_start, slot_end
+                slot_start = slot_end
+        day += timedelta(days=1)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Слить пересекающиеся и смежные интервалы, отсортированные по началу."""
+    merged: list[Interval] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(
+    schedule: DoctorSchedule,
+    busy: Iterable[Interval],
+    start: datetime,
+    end: datetime,
+) -> Iterator[Interval]:
+    """Свободные слоты доктора по возрастанию времени.
+
+    busy — интервалы записей на приём по возрастанию начала. Они
+    сливаются, после чего слоты и интервалы проходятся одним встречным
+    проходом: O(слотов + записей).
+    """
+    busy = merge_intervals(busy)
+    i = 0
+    for slot_start, slot_end in working_slots(schedule, start, end):
+        while i < len(busy) and busy[i][1] <= slot_start:
+            i += 1
+        if i < len(busy) and busy[i][0] < slot_end:
+            continue
+        yield slot_start, slot_end
+
+
+def _keyed_slots(schedule: DoctorSchedule, busy, start, end):
+    # ключ сортировки для heapq.merge: время начала, затем id доктора
+    for slot_start, slot_end in free_slots(schedule, busy, start, end):
+        yield slot_start, schedule.doctor_id, slot_end
+
+
+def earliest_slots(
+    schedules: Iterable[DoctorSchedule],
+    busy: dict[int, list[Interval]],
+    start: datetime,
+    end: datetime,
+    limit: int,
+) -> list[tuple[int, datetime, datetime]]:
+    """Первые limit свободных слотов среди нескольких докторов.
+
+    Слоты каждого доктора генерируются лениво и сливаются через heapq.merge,
+    поэтому вычисляется только то, что попадёт в ответ.
+    """
+    streams = [
+        _keyed_slots(schedule, busy.get(schedule.doctor_id, ()), start, end)
+        for schedule in schedules
+    ]
+    return [
+        (doctor_id, slot_start, slot_end)
+        for slot_start, doctor_id, slot_end in islice(heapq.merge(*streams), limit)
+    ]
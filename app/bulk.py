@@ -0,0 +1,170 @@
+from typing import Iterable, NamedTuple, Optional
+from fastapi import HTTPException
+from sqlalchemy import ColumnElement, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .writes import integrity_error
+
+MAX_BULK_SIZE = 5000
+# сколько id можно запросить одним batch-get
+MAX_BATCH_GET_SIZE = 200
+
+
+class SkipConflicts(NamedTuple):
+    """Как пропускать строки пачки, нарушающие ограничение БД.
+
+    Новые строки вставляются с ON CONFLICT ON CONSTRAINT ... DO NOTHING,
+    обновления — с ON CONFLICT (id) DO UPDATE ... WHERE guard. Строки,
+    которых нет в RETURNING, отклоняются с detail, остальные сохраняются.
+    """
+
+    constraint: str
+    detail: str
+    # колонки, по которым вставленные строки сопоставляются с индексами;
+    # у принятых новых строк значения этих колонок не должны повторяться
+    key: tuple[str, ...]
+    # условие ON CONFLICT DO UPDATE WHERE: обновление не нарушит ограничение
+    guard: ColumnElement
+
+
+class BulkBatch:
+    """Результат проверки пачки: принятые строки и ошибки по индексам.
+
+    Строки без id вставляются, строки с id обновляют существующие записи.
+    """
+
+    def __init__(self, items: list):
+        if len(items) > MAX_BULK_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch size must not exceed {MAX_BULK_SIZE} items",
+            )
+        self.items = items
+        self.rows: dict[int, dict] = {}
+        self.errors: list[dict] = []
+        self._ids: set[int] = set()
+
+    def reject(self, index: int, detail: str) -> None:
+        self.errors.append({"index": index, "detail": detail})
+
+    def accept(self, index: int, row: dict) -> None:
+        row_id = row.get("id")
+        if row_id is not None:
+            if row_id in self._ids:
+                self.reject(index, f"Duplicate id={row_id} in batch")
+                return
+            self._ids.add(row_id)
+        self.rows[index] = row
+
+    async def save(
+        self, db: AsyncSession, model, skip: Optional[SkipConflicts] = None
+    ) -> dict:
+        """Записать принятые строки: один INSERT и один upsert на пачку."""
+        new = {i: row for i, row in self.rows.items() if row.get("id") is None}
+        existing = {i: row for i, row in self.rows.items() if i not in new}
+        saved = {}
+        try:
+            if new:
+                for row in new.values():
+                    row.pop("id", None)
+                if skip is None:
+                    stmt = insert(model).returning(model, sort_by_parameter_order=True)
+                else:
+                    stmt = (
+                        pg_insert(model)
+                        .on_conflict_do_nothing(constraint=skip.constraint)
+                        .returning(model)
+                    )
+                # render_nulls: не разбивать INSERT на группы по None-колонкам
+                result = await db.scalars(
+                    stmt,
+                    list(new.values()),
+                    execution_options={"render_nulls": True},
+                )
+                if skip is None:
+                    saved.update(zip(new, result.all()))
+                else:
+                    inserted = {
+                        tuple(getattr(obj, c) for c in skip.key): obj
+                        for obj in result.all()
+                    }
+                    for i, row in new.items():
+                        obj = inserted.get(tuple(row[c] for c in skip.key))
+                        if obj is None:
+                            self.reject(i, skip.detail)
+                        else:
+                            saved[i] = obj
+            if existing:
+                stmt = pg_insert(model)
+                columns = next(iter(existing.values())).keys()
+                set_ = {c: stmt.excluded[c] for c in columns if c != "id"}
+                # onupdate колонок на ON CONFLICT DO UPDATE не действует
+                set_["version"] = model.version + 1
+                set_["updated_at"] = func.timezone("utc", func.now())
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[model.id],
+                    set_=set_,
+                    where=skip.guard if skip else None,
+                ).returning(model)
+                result = await db.scalars(
+                    stmt,
+                    list(existing.values()),
+                    execution_options={"populate_existing": True},
+                )
+                updated = {obj.id: obj for obj in result.all()}
+                for i, row in existing.items():
+                    if row["id"] in updated:
+                        saved[i] = updated[row["id"]]
+                    else:
+                        self.reject(i, skip.detail)
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            # какая строка пачки нарушила ограничение, неизвестно
+            raise integrity_error(model, {}, e) from e
+        return {
+            "items": [saved[i] for i in sorted(saved)],
+            "errors": sorted(self.errors, key=lambda error: error["index"]),
+        }
+
+
+async def fetch_ids(db: AsyncSession, id_column, ids: Iterable[int]) -> set[int]:
+    """Какие из ids есть в таблице: один запрос с IN (...)."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    result = await db.execute(select(id_column).where(id_column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def fetch_map(
+    db: AsyncSession, id_column, value_column, ids: Iterable[int]
+) -> dict:
+    """id -> значение колонки для существующих ids, одним запросом."""
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return {}
+    result = await db.execute(select(id_column, value_column).where(id_column.in_(ids)))
+    return dict(result.tuples().all())
+
+
+async def fetch_in_order(db: AsyncSession, stmt, id_column, ids: list[int]) -> dict:
+    """Строки stmt с id из ids одним IN-запросом, в порядке ids.
+
+    Повторы в ids возвращаются один раз; отсутствующие id — в missing.
+    """
+    if len(ids) > MAX_BATCH_GET_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch size must not exceed {MAX_BATCH_GET_SIZE} ids",
+        )
+    ids = list(dict.fromkeys(ids))
+    found = {}
+    if ids:
+        result = await db.execute(stmt.where(id_column.in_(ids)))
+        found = {row.id: row for row in result.all()}
+    return {
+        "items": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from .database import env_int, session_engine, session_pinned
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = env_int("CACHE_TTL", 60)  # секунды
+CACHE_MAXSIZE = env_int("CACHE_MAXSIZE", 10000)
+# Канал LISTEN/NOTIFY для сброса кэша во всех воркерах; пусто — выключено
+CACHE_NOTIFY_CHANNEL = os.getenv("CACHE_NOTIFY_CHANNEL", "")
+
+
+class AsyncCache:
+    """Read-through кэш с TTL, вытеснением LRU и single-flight по ключу.
+
+    Одновременные промахи по одному ключу ждут одну загрузку. Если ключ
+    сбросили, пока шла загрузка, её результат не сохраняется, чтобы не
+    закэшировать значение, прочитанное до коммита изменения.
+
+    Значение, прочитанное с реплики (database.session_engine задан),
+    может отставать от основного сервера: его получают загрузивший и
+    ждавшие его чтения с реплик, но в кэш оно не попадает. Клиент,
+    закреплённый за основным сервером после записи (session_pinned),
+    кэш не читает: загружает значение сам и сохраняет свежую копию.
+    """
+
+    def __init__(self, name: str, maxsize: int = CACHE_MAXSIZE, ttl: int = CACHE_TTL):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        # загрузки с реплик: общие для чтений с реплик, но не сохраняются
+        self._replica_inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        from_replica = session_engine.get() is not None
+        inflight = self._replica_inflight if from_replica else self._inflight
+        while not session_pinned.get():
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            future = inflight.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # отменили загрузившего, а не нас — пробуем снова
+                if asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if inflight.get(key) is future:
+                del inflight[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # исключение уже получил вызывающий, ожидающих может не быть
+                future.exception()
+            raise
+        if inflight.get(key) is future:
+            del inflight[key]
+            if not from_replica:
+                self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        self._inflight.pop(key, None)
+        self._replica_inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._inflight.clear()
+        self._replica_inflight.clear()
+
+
+clinic_cache = AsyncCache("clinics")
+doctor_cache = AsyncCache("doctors")
+CACHES = {cache.name: cache for cache in (clinic_cache, doctor_cache)}
+
+
+def clear_all() -> None:
+    for cache in CACHES.values():
+        cache.clear()
+
+
+NOTIFY_KEYS = text(
+    "SELECT pg_notify(:channel, key) FROM unnest(CAST(:keys AS text[])) AS key"
+)
+
+
+async def mark_stale(db: AsyncSession, cache: AsyncCache, *keys: int) -> None:
+    """Сбросить ключи после коммита текущей транзакции.
+
+    Вызывать до commit: локальный кэш очищается в after_commit, а при
+    включённом канале в транзакцию добавляется pg_notify, который
+    PostgreSQL доставит остальным воркерам только после коммита.
+    """
+    pending = db.sync_session.info.setdefault("stale_cache_keys", set())
+    pending.update((cache.name, key) for key in keys)
+    if CACHE_NOTIFY_CHANNEL and keys:
+        # один запрос на все ключи, даже для пачки из тысяч записей
+        await db.execute(
+            NOTIFY_KEYS,
+            {
+                "channel": CACHE_NOTIFY_CHANNEL,
+                "keys": [f"{cache.name}:{key}" for key in keys],
+            },
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for name, key in session.info.pop("stale_cache_keys", ()):
+        CACHES[name].invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("stale_cache_keys", None)
+
+
+def _on_notify(connection, pid, channel, payload: str) -> None:
+    name, _, key = payload.partition(":")
+    cache = CACHES.get(name)
+    if cache is not None and key.isdigit():
+        cache.invalidate(int(key))
+
+
+class InvalidationListener:
+    """LISTEN на канале сброса кэша на отдельном соединении из пула.
+
+    Если соединение оборвалось, слушатель переподключается с растущей
+    паузой. Уведомления, отправленные без него, потеряны, поэтому после
+    переподключения локальные кэши очищаются целиком.
+    """
+
+    def __init__(
+        self,
+        db_engine: AsyncEngine,
+        channel: str = CACHE_NOTIFY_CHANNEL,
+        retry_seconds: float = 1.0,
+        max_retry_seconds: float = 30.0,
+    ):
+        self.engine = db_engine
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._conn = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    async def start(self) -> None:
+        if not self.channel:
+            return
+        self._stopped = False
+        await self._listen()
+        logger.info("Слушаем сброс кэша на канале %s", self.channel)
+
+    async def _listen(self) -> None:
+        conn = await self.engine.connect()
+        try:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            await driver.add_listener(self.channel, _on_notify)
+            driver.add_termination_listener(self._on_terminated)
+        except BaseException:
+            await conn.close()
+            raise
+        self._conn = conn
+
+    async def _on_terminated(self, driver_connection) -> None:
+        if self._stopped or self._reconnect is not None:
+            return
+        logger.warning("Соединение LISTEN %s оборвалось", self.channel)
+        self._reconnect = asyncio.create_task(self._run_reconnect())
+
+    async def _run_reconnect(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                await conn.invalidate()
+                await conn.close()
+            except Exception:
+                pass
+        delay = self.retry_seconds
+        try:
+            while not self._stopped:
+                try:
+                    await self._listen()
+                except Exception as e:
+                    logger.warning(
+                        "Не удалось снова слушать %s: %s; повтор через %.0f с",
+                        self.channel,
+                        e,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_seconds)
+                    continue
+                clear_all()
+                logger.info("Снова слушаем сброс кэша на канале %s", self.channel)
+                return
+        finally:
+            self._reconnect = None
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+            try:
+                await self._reconnect
+            except asyncio.CancelledError:
+                pass
+        if self._conn is None:
+            return
+        raw = await self._conn.get_raw_connection()
+        raw.driver_connection.remove_termination_listener(self._on_terminated)
+        await raw.driver_connection.remove_listener(self.channel, _on_notify)
+        await self._conn.close()
+        self._conn = None
@@ -0,0 +1,133 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from urllib.parse import parse_qsl, urlencode
+from .database import env_bool
+
+COALESCE_GET = env_bool("COALESCE_GET", True)
+
+# маршруты чтения, которые можно объединять
+COALESCE_PREFIXES = (
+    "/clinics",
+    "/doctors",
+    "/patients",
+    "/appointemts",
+    "/search",
+    "/stats",
+)
+# потоковые ответы не буферизуем
+COALESCE_EXCLUDE_SUFFIXES = ("/export",)
+# заголовки запроса, от которых зависит ответ
+COALESCE_VARY_HEADERS = (b"accept", b"if-none-match", b"if-modified-since")
+
+
+@dataclass
+class CoalescingStats:
+    requests: int = 0
+    leaders: int = 0
+    coalesced: int = 0
+    waiting: int = 0
+    max_waiters: int = 0
+
+    def snapshot(self) -> dict:
+        data = asdict(self)
+        data["hit_rate"] = self.coalesced / self.requests if self.requests else 0.0
+        return data
+
+
+coalescing_stats = CoalescingStats()
+
+
+class _Flight:
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+        # маршрут, найденный роутером для ведущего запроса
+        self.route = None
+
+
+class CoalescingMiddleware:
+    """Объединяет одновременные одинаковые GET-запросы.
+
+    Первый запрос с данным ключом (путь, отсортированная строка запроса
+    и заголовки из COALESCE_VARY_HEADERS) выполняется как обычно, а его
+    ответ целиком буферизуется. Запросы с тем же ключом, пришедшие до
+    его завершения, не идут в БД и получают копию тех же байтов, а в их
+    scope копируется scope["route"] ведущего: до роутера они не доходят,
+    а метрикам нужен шаблон маршрута. Если ведущий запрос упал,
+    остальные выполняются самостоятельно.
+    """
+
+    def __init__(self, app, prefixes=COALESCE_PREFIXES, stats=coalescing_stats):
+        self.app = app
+        self.prefixes = prefixes
+        self.stats = stats
+        self._inflight: dict[tuple, _Flight] = {}
+
+    def _key(self, scope) -> tuple | None:
+        path = scope["path"]
+        if scope["method"] != "GET" or not path.startswith(self.prefixes):
+            return None
+        if path.rstrip("/").endswith(COALESCE_EXCLUDE_SUFFIXES):
+            return None
+        query = urlencode(
+            sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        )
+        headers = tuple(
+            (name, value)
+            for name, value in scope["headers"]
+            if name in COALESCE_VARY_HEADERS
+        )
+        # реплика или основной сервер (app/replicas.py): закреплённый после
+        # записи клиент не должен получить ответ, прочитанный с реплики
+        return path, query, tuple(sorted(headers)), scope.get("db_read")
+
+    async def __call__(self, scope, receive, send):
+        key = self._key(scope) if scope["type"] == "http" else None
+        if key is None:
+            return await self.app(scope, receive, send)
+
+        self.stats.requests += 1
+        flight = self._inflight.get(key)
+        if flight is not None:
+            messages = await self._wait(flight)
+            if messages is not None:
+                if flight.route is not None:
+                    scope["route"] = flight.route
+                for message in messages:
+                    await send(message)
+                return
+            return await self.app(scope, receive, send)
+
+        flight = _Flight()
+        self._inflight[key] = flight
+        self.stats.leaders += 1
+        messages = []
+
+        async def capture(message):
+            messages.append(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            flight.future.set_result(None)
+            raise
+        else:
+            flight.route = scope.get("route")
+            flight.future.set_result(messages)
+        finally:
+            del self._inflight[key]
+        for message in messages:
+            await send(message)
+
+    async def _wait(self, flight: _Flight):
+        flight.waiters += 1
+        self.stats.waiting += 1
+        self.stats.max_waiters = max(self.stats.max_waiters, flight.waiters)
+        try:
+            messages = await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            self.stats.waiting -= 1
+        if messages is not None:
+            self.stats.coalesced += 1
+        return messages
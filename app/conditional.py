@@ -0,0 +1,97 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+
+
+def resource_etag(obj, variant: str = "") -> str:
+    """ETag одной записи: id и версия строки.
+
+    variant отличает другие представления той же записи (fields=,
+    include=, см. app/fieldsets.py).
+    """
+    if variant:
+        return f'"{obj.id}-{obj.version}-{variant}"'
+    return f'"{obj.id}-{obj.version}"'
+
+
+def collection_etag(
+    items: Iterable, next_cursor: Optional[int] = None, variant: str = ""
+) -> str:
+    """ETag страницы списка: хэш пар (id, version), курсора и представления.
+
+    Меняется при изменении, добавлении или удалении любой записи
+    на странице, но не требует сериализации самих записей. Last-Modified
+    у списков не отдаётся: max(updated_at) не меняется, когда запись
+    удалили или она выпала из фильтра.
+    """
+    digest = hashlib.sha1()
+    for obj in items:
+        digest.update(f"{obj.id}-{obj.version};".encode())
+    digest.update(f"next={next_cursor}".encode())
+    if variant:
+        digest.update(f";variant={variant}".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def last_modified(items: Iterable) -> Optional[datetime]:
+    """Самое позднее updated_at среди записей (None для пустого списка)."""
+    return max((obj.updated_at for obj in items if obj.updated_at), default=None)
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # слабое сравнение (RFC 9110, 13.1.2): префикс W/ не учитывается
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag.removeprefix("W/") in tags
+
+
+def _not_modified_since(header: str, modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    # в HTTP-дате нет долей секунды
+    return modified.replace(microsecond=0) <= since
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """Проставить ETag/Last-Modified и проверить условный запрос.
+
+    Возвращает готовый ответ 304, если у клиента актуальная копия:
+    ручка отдаёт его как есть, и тело не сериализуется. Иначе None.
+    If-Modified-Since учитывается, только если нет If-None-Match.
+    """
+    headers = {"ETag": etag}
+    if modified is not None:
+        headers["Last-Modified"] = _http_date(modified)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif if_modified_since is not None and modified is not None:
+        fresh = _not_modified_since(if_modified_since, modified)
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=headers)
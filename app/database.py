@@ -1,5 +1,11 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -19,8 +25,127 @@ DATABASE_URL = (
 )
 
 
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Настройки пула и логирования SQL
+DB_ECHO = env_bool("DB_ECHO", False)
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 20)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)  # секунды ожидания соединения
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)  # секунды, -1 — не пересоздавать
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT = env_int("DB_STATEMENT_TIMEOUT", 0)  # мс, 0 — без лимита
+
+# Кэш подготовленных выражений на каждом соединении: повторяющиеся
+# запросы (db.get по id, поиск по имени) не разбираются и не
+# планируются заново. 0 — не кэшировать.
+DB_PREPARED_STATEMENT_CACHE_SIZE = env_int("DB_PREPARED_STATEMENT_CACHE_SIZE", 500)
+# PgBouncer в режиме transaction: имена выражений должны быть
+# уникальными, т.к. соседние транзакции могут попасть на другой бэкенд.
+# Нужен PgBouncer >= 1.21 с max_prepared_statements > 0.
+DB_PGBOUNCER = env_bool("DB_PGBOUNCER", False)
+
+
+class PoolStats:
+    """Счётчики ожидания соединения из пула."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет время ожидания свободного соединения."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+
+def prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def connect_args(
+    statement_cache_size: int = DB_PREPARED_STATEMENT_CACHE_SIZE,
+    pgbouncer: bool = DB_PGBOUNCER,
+    statement_timeout: int = DB_STATEMENT_TIMEOUT,
+) -> dict:
+    """Аргументы подключения asyncpg."""
+    args = {"prepared_statement_cache_size": statement_cache_size}
+    if pgbouncer:
+        args["prepared_statement_name_func"] = prepared_statement_name
+        # внутренний кэш asyncpg использует свои имена, отключаем его
+        args["statement_cache_size"] = 0
+    if statement_timeout:
+        args["server_settings"] = {"statement_timeout": str(statement_timeout)}
+    return args
+
+
+def engine_options(**overrides) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args(),
+    }
+    options.update(overrides)
+    return options
+
+
+def pool_stats(db_engine=None) -> dict:
+    """Снимок состояния пула: занятые соединения, overflow и ожидание."""
+    pool = (db_engine or engine).pool
+    snapshot = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(
+            checkouts=stats.checkouts,
+            wait_avg_ms=(
+                stats.wait_total / stats.checkouts * 1000 if stats.checkouts else 0.0
+            ),
+            wait_max_ms=stats.wait_max * 1000,
+        )
+    return snapshot
+
+
 # engine и сессии
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, **engine_options())
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -28,9 +153,17 @@ AsyncSessionLocal = sessionmaker(
 )
 Base = declarative_base()
 
+# engine для сессий текущего запроса, None — основной; чтения на реплики
+# направляет ReplicaRoutingMiddleware (app/replicas.py)
+session_engine: ContextVar[Optional[AsyncEngine]] = ContextVar(
+    "session_engine", default=None
+)
+# клиент недавно писал и читает с основного сервера: кэши его не обслуживают
+session_pinned: ContextVar[bool] = ContextVar("session_pinned", default=False)
+
 
 async def async_get_db():
-    async with AsyncSessionLocal() as db:
+    async with AsyncSessionLocal(bind=session_engine.get() or engine) as db:
         try:
             yield db
         finally:
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# сколько строк забирать из серверного курсора за один раз
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(keys: list[str], rows) -> str:
+    return "".join(
+        json.dumps(
+            {key: _plain(value) for key, value in zip(keys, row)},
+            ensure_ascii=False,
+        )
+        + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_rows(
+    db: AsyncSession, stmt: Select, fmt: ExportFormat
+) -> AsyncIterator[bytes]:
+    """Отдавать строки запроса порциями из серверного курсора.
+
+    В памяти одновременно находится только одна порция, поэтому расход
+    памяти не зависит от размера таблицы. Запрос должен выбирать
+    колонки, а не ORM-объекты, чтобы не наполнять identity map.
+    Генератор выполняется уже после выхода из эндпоинта, поэтому сам
+    закрывает сессию.
+    """
+    try:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        keys = list(result.keys())
+        if fmt == ExportFormat.CSV:
+            yield _encode_csv([keys]).encode()
+        async for rows in result.partitions():
+            if fmt == ExportFormat.CSV:
+                yield _encode_csv(rows).encode()
+            else:
+                yield _encode_ndjson(keys, rows).encode()
+    finally:
+        await db.close()
+
+
+def export_response(
+    rows: AsyncIterator[bytes], fmt: ExportFormat, name: str
+) -> StreamingResponse:
+    return StreamingResponse(
+        rows,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
@@ -0,0 +1,55 @@
+"""Быстрый путь ответов списков.
+
+Обычный путь FastAPI для списка: ORM-объекты, валидация каждого по
+response_model, затем jsonable-представление и stdlib json. Для больших
+страниц это дороже самого запроса. Здесь страница читается колонками
+схемы чтения (строки Row, без ORM), и строки сразу кодируются orjson.
+Путь доверенный: значения приходят из колонок БД с типами схемы, поэтому
+повторная валидация не нужна, а response_model у ручки остаётся только
+для документации OpenAPI.
+"""
+
+from typing import Optional
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import Select, select
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, закодированный orjson (datetime — в ISO 8601)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def read_columns(model, schema) -> list:
+    """Колонки модели, соответствующие полям схемы, в порядке полей."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def page_response(
+    page: dict, response: Response, projection=None, included: Optional[dict] = None
+) -> FastJSONResponse:
+    """Страница строк из paginate в JSON без response_model.
+
+    Возвращённый из ручки Response FastAPI отдаёт как есть, поэтому
+    заголовки, выставленные в response (ETag, Last-Modified), переносятся.
+    projection (app/fieldsets.py) урезает поля и добавляет связанные записи.
+    """
+    if projection is None:
+        items = [row._asdict() for row in page["items"]]
+    else:
+        items = [projection.item(row, included or {}) for row in page["items"]]
+    content = {"items": items, "next_cursor": page["next_cursor"]}
+    return FastJSONResponse(content, headers=response.headers)
+
+
+def list_select(model, schema, projection=None) -> Select:
+    """Запрос страницы списка: колонки схемы, без ORM-объектов.
+
+    С projection выбираются только запрошенные в fields= колонки.
+    """
+    if projection is not None:
+        return projection.select()
+    return select(*read_columns(model, schema))
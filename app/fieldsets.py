@@ -0,0 +1,199 @@
+"""Выборочные поля (fields=) и связанные сущности (include=) в GET-ручках.
+
+`?fields=id,name` превращается в select только нужных колонок и такой же
+урезанный ответ. `?include=doctor,clinic` догружает связанные записи
+одним запросом с IN (...) на каждую связь для всей страницы сразу.
+Без параметров ручки работают как раньше.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Iterable, NamedTuple, Optional
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .fastjson import FastJSONResponse, read_columns
+from .models import Appointment, Clinic, Doctor, Patient
+from .schemas import (
+    AppointmentReadSchema,
+    ClinicReadSchema,
+    DoctorReadSchema,
+    PatientReadSchema,
+)
+
+# колонки, которые читаются всегда: курсор, ETag и Last-Modified
+SERVICE_FIELDS = ("id", "version", "updated_at")
+
+
+class Relation(NamedTuple):
+    """Связь «многие к одному», доступная в include=."""
+
+    column: str  # внешний ключ в самой сущности
+    model: type
+    schema: type
+
+
+RELATIONS = {
+    Clinic: {},
+    Doctor: {"clinic": Relation("clinic_id", Clinic, ClinicReadSchema)},
+    Patient: {
+        "doctor": Relation("doctor_id", Doctor, DoctorReadSchema),
+        "clinic": Relation("clinic_id", Clinic, ClinicReadSchema),
+    },
+    Appointment: {
+        "doctor": Relation("doctor_id", Doctor, DoctorReadSchema),
+        "patient": Relation("patient_id", Patient, PatientReadSchema),
+    },
+}
+
+
+def _split(value: Optional[str]) -> list[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+@dataclass(frozen=True)
+class Projection:
+    model: type
+    schema: type
+    fields: Optional[tuple[str, ...]] = None  # None — все поля схемы
+    include: tuple[str, ...] = ()
+
+    @classmethod
+    def parse(
+        cls, model, schema, fields: Optional[str], include: Optional[str]
+    ) -> "Projection":
+        """Разобрать параметры запроса; неизвестные имена — 400."""
+        requested, related = _split(fields), _split(include)
+        unknown = [name for name in requested if name not in schema.model_fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        unknown = [name for name in related if name not in RELATIONS[model]]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown include: {', '.join(unknown)}"
+            )
+        selected = None
+        if requested:
+            # id нужен клиенту для ссылок и курсора, он есть всегда
+            selected = tuple(
+                name
+                for name in schema.model_fields
+                if name in requested or name == "id"
+            )
+        return cls(model, schema, selected, tuple(dict.fromkeys(related)))
+
+    @property
+    def active(self) -> bool:
+        return self.fields is not None or bool(self.include)
+
+    @property
+    def output_fields(self) -> tuple[str, ...]:
+        if self.fields is None:
+            return tuple(self.schema.model_fields)
+        return self.fields
+
+    def select(self) -> Select:
+        """select только нужных колонок (плюс служебные и ключи для include)."""
+        relations = RELATIONS[self.model]
+        names = dict.fromkeys(
+            (
+                *SERVICE_FIELDS,
+                *self.output_fields,
+                *(relations[name].column for name in self.include),
+            )
+        )
+        return select(*(getattr(self.model, name) for name in names))
+
+    async def load_included(
+        self, db: AsyncSession, records: Iterable
+    ) -> dict[str, dict]:
+        """Связанные записи: имя связи -> {id: строка}, запрос на связь."""
+        records = list(records)
+        included = {}
+        for name in self.include:
+            relation = RELATIONS[self.model][name]
+            ids = {getattr(record, relation.column) for record in records}
+            ids.discard(None)
+            rows = {}
+            if ids:
+                stmt = select(*read_columns(relation.model, relation.schema)).where(
+                    relation.model.id.in_(ids)
+                )
+                rows = {row.id: row for row in (await db.execute(stmt)).all()}
+            included[name] = rows
+        return included
+
+    def related(self, included: dict) -> list:
+        """Все догруженные строки: они тоже влияют на Last-Modified записи."""
+        return [row for rows in included.values() for row in rows.values()]
+
+    def variant(self, included: dict) -> str:
+        """Добавка к ETag: набор полей, связи и версии связанных строк.
+
+        Урезанный ответ и ответ со связями — другие представления той же
+        записи, поэтому ETag у них свой и меняется вместе со связанными.
+        """
+        if not self.active:
+            return ""
+        digest = hashlib.sha1(
+            f"fields={','.join(self.output_fields)};"
+            f"include={','.join(self.include)};".encode()
+        )
+        for name in self.include:
+            for row_id in sorted(included[name]):
+                digest.update(
+                    f"{name}:{row_id}-{included[name][row_id].version};".encode()
+                )
+        return digest.hexdigest()[:16]
+
+    def item(self, record, included: dict) -> dict:
+        """Запись в виде ответа: выбранные поля и связанные сущности."""
+        item = {name: getattr(record, name) for name in self.output_fields}
+        for name in self.include:
+            relation = RELATIONS[self.model][name]
+            row = included[name].get(getattr(record, relation.column))
+            item[name] = row._asdict() if row is not None else None
+        return item
+
+
+def projection_params(model, schema):
+    """Зависимость FastAPI: Projection из параметров fields и include."""
+    relations = ", ".join(RELATIONS[model]) or "нет"
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description="Поля через запятую, например id,name"
+        ),
+        include: Optional[str] = Query(
+            None, description=f"Связанные записи через запятую: {relations}"
+        ),
+    ) -> Projection:
+        return Projection.parse(model, schema, fields, include)
+
+    return dependency
+
+
+clinic_projection = projection_params(Clinic, ClinicReadSchema)
+doctor_projection = projection_params(Doctor, DoctorReadSchema)
+patient_projection = projection_params(Patient, PatientReadSchema)
+appointment_projection = projection_params(Appointment, AppointmentReadSchema)
+
+
+def item_response(record, response: Response, projection: Projection, included: dict):
+    """Одна запись: как есть через response_model или урезанная по fields/include."""
+    if not projection.active:
+        return record
+    return FastJSONResponse(projection.item(record, included), headers=response.headers)
+
+
+def batch_response(
+    result: dict, response: Response, projection: Projection, included: dict
+) -> FastJSONResponse:
+    """Ответ batch-get: записи по fields/include и список ненайденных id."""
+    items = [projection.item(row, included) for row in result["items"]]
+    return FastJSONResponse(
+        {"items": items, "missing": result["missing"]}, headers=response.headers
+    )
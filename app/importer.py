@@ -0,0 +1,327 @@
+"""Загрузка больших CSV/JSONL файлов с пациентами и записями через COPY.
+
+Запуск:
+    python -m app.importer patients patients.csv
+    python -m app.importer appointments appointments.jsonl --batch-size 20000
+
+Файл читается потоково порциями по batch_size записей. Каждая порция
+проверяется схемами из schemas.py, ссылки на докторов и клиники
+сверяются с заранее загруженными множествами id, а принятые строки
+пишутся через asyncpg copy_records_to_table. Позиция в файле
+сохраняется в import_checkpoints в той же транзакции, что и COPY,
+поэтому после сбоя повторный запуск продолжает с места остановки.
+Если COPY упирается в пересечение приёмов, порция пишется построчно,
+а пересекающиеся записи уходят в отклонённые.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .database import engine
+from .availability import DEFAULT_SLOT_MINUTES
+from .models import Appointment, Clinic, Doctor, ImportCheckpoint, Patient
+from .pagination import to_naive
+from .schemas import AppointmentSchema, PatientSchema
+from .writes import BOOKED_DETAIL, EXCLUSION_VIOLATION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+@dataclass
+class ImportStats:
+    imported: int = 0
+    rejected: int = 0
+    skipped: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return (self.imported + self.rejected) / elapsed if elapsed else 0.0
+
+
+def read_records(path: Path) -> Iterator[Union[dict, str]]:
+    """Читать записи построчно; пустые значения CSV считаются NULL.
+
+    Строки JSONL отдаются как есть: их разбирает parse_record внутри
+    проверки записи, и битая строка попадает в отклонённые, а не
+    обрывает импорт.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if path.suffix == ".csv":
+            for row in csv.DictReader(file):
+                yield {
+                    key: value if value != "" else None for key, value in row.items()
+                }
+        else:
+            for line in file:
+                if line.strip():
+                    yield line
+
+
+def parse_record(record: Union[dict, str]) -> dict:
+    if isinstance(record, dict):
+        return record
+    data = json.loads(record)
+    if not isinstance(data, dict):
+        raise ValueError("Record must be a JSON object")
+    return data
+
+
+def reject_line(record: int, data, error: Union[Exception, str]) -> str:
+    return (
+        json.dumps(
+            {"record": record, "data": data, "error": str(error)},
+            default=str,
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+class References:
+    """Id докторов и клиник, загруженные один раз на весь импорт."""
+
+    def __init__(
+        self,
+        doctors: dict[int, Optional[int]],
+        clinics: set[int],
+        slots: Optional[dict[int, int]] = None,
+    ):
+        self.doctors = doctors
+        self.clinics = clinics
+        # id доктора -> длина приёма в минутах
+        self.slots = slots or {}
+
+    @classmethod
+    async def load(cls, conn) -> "References":
+        doctors = await conn.execute(
+            select(Doctor.id, Doctor.clinic_id, Doctor.slot_minutes)
+        )
+        clinics = await conn.execute(select(Clinic.id))
+        rows = doctors.all()
+        return cls(
+            {row.id: row.clinic_id for row in rows},
+            set(clinics.scalars().all()),
+            {row.id: row.slot_minutes for row in rows},
+        )
+
+
+def patient_record(data: dict, refs: References, known_patients: set[int]) -> tuple:
+    patient = PatientSchema.model_validate(data)
+    clinic_id = patient.clinic_id
+    if patient.doctor_id is not None:
+        if patient.doctor_id not in refs.doctors:
+            raise ValueError(f"Doctor with id={patient.doctor_id} not found")
+        doctor_clinic_id = refs.doctors[patient.doctor_id]
+        if clinic_id is not None and clinic_id != doctor_clinic_id:
+            raise ValueError(
+                f"Doctor with id={patient.doctor_id} is not associated with clinic id={clinic_id}"
+            )
+        clinic_id = clinic_id or doctor_clinic_id
+    elif clinic_id is not None and clinic_id not in refs.clinics:
+        raise ValueError(f"Clinic with id={clinic_id} not found")
+    return (patient.name, patient.doctor_id, clinic_id)
+
+
+def appointment_record(data: dict, refs: References, known_patients: set[int]) -> tuple:
+    appointment = AppointmentSchema.model_validate(data)
+    if appointment.doctor_id not in refs.doctors:
+        raise ValueError(f"Doctor with id={appointment.doctor_id} not found")
+    if appointment.patient_id not in known_patients:
+        raise ValueError(f"Patient with id={appointment.patient_id} not found")
+    date = to_naive(appointment.date)
+    slot = refs.slots.get(appointment.doctor_id, DEFAULT_SLOT_MINUTES)
+    return (
+        appointment.doctor_id,
+        appointment.patient_id,
+        date,
+        date + timedelta(minutes=slot),
+    )
+
+
+# kind -> (модель, колонки COPY, функция проверки записи)
+TARGETS = {
+    "patients": (Patient, ["name", "doctor_id", "clinic_id"], patient_record),
+    "appointments": (
+        Appointment,
+        ["doctor_id", "patient_id", "date", "ends_at"],
+        appointment_record,
+    ),
+}
+
+
+async def _patient_ids(conn, batch: Iterable[dict]) -> set[int]:
+    """Пациентов слишком много для предзагрузки: один запрос на порцию."""
+    ids = set()
+    for data in batch:
+        try:
+            ids.add(int(data.get("patient_id")))
+        except (TypeError, ValueError):
+            pass
+    if not ids:
+        return set()
+    result = await conn.execute(select(Patient.id).where(Patient.id.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def _insert_skipping_conflicts(
+    conn, model, columns: list[str], rows: list[tuple], sources: list[tuple]
+) -> list[tuple]:
+    """Вставить строки по одной с ON CONFLICT DO NOTHING.
+
+    Возвращает (номер записи, данные) строк, которые не вставились.
+    """
+    stmt = pg_insert(model).on_conflict_do_nothing().returning(model.id)
+    skipped = []
+    for row, source in zip(rows, sources):
+        if await conn.scalar(stmt, dict(zip(columns, row))) is None:
+            skipped.append(source)
+    return skipped
+
+
+async def run_import(
+    kind: str,
+    path: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    db_engine: AsyncEngine = engine,
+    rejects: Optional[Path] = None,
+) -> ImportStats:
+    model, columns, build_record = TARGETS[kind]
+    source = f"{kind}:{path.resolve()}"
+    stats = ImportStats()
+
+    async with db_engine.connect() as conn:
+        refs = await References.load(conn)
+        position = await conn.scalar(
+            select(ImportCheckpoint.position).where(ImportCheckpoint.source == source)
+        )
+        await conn.commit()
+    position = position or 0
+    if position:
+        logger.info("Продолжаем %s с записи %d", source, position)
+
+    records = read_records(path)
+    stats.skipped = sum(1 for _ in islice(records, position))
+    reject_file = rejects.open("a", encoding="utf-8") if rejects else None
+    try:
+        while batch := list(islice(records, batch_size)):
+            # отклонённые копятся до коммита порции: порция, упавшая и
+            # повторённая при перезапуске, не пишет их в файл дважды
+            rejected = []
+            async with db_engine.begin() as conn:
+                parsed = {}
+                for offset, record in enumerate(batch):
+                    try:
+                        parsed[offset] = parse_record(record)
+                    except ValueError as e:
+                        rejected.append(reject_line(position + offset, record, e))
+                known_patients = (
+                    await _patient_ids(conn, parsed.values())
+                    if kind == "appointments"
+                    else set()
+                )
+                rows, sources = [], []
+                for offset, data in parsed.items():
+                    try:
+                        rows.append(build_record(data, refs, known_patients))
+                    except (ValidationError, ValueError) as e:
+                        rejected.append(reject_line(position + offset, data, e))
+                    else:
+                        sources.append((position + offset, data))
+                position += len(batch)
+                # чекпоинт и COPY в одной транзакции: либо оба, либо ничего
+                stmt = pg_insert(ImportCheckpoint).values(
+                    source=source, position=position
+                )
+                await conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[ImportCheckpoint.source],
+                        set_={"position": stmt.excluded.position},
+                    )
+                )
+                imported = len(rows)
+                if rows:
+                    try:
+                        async with conn.begin_nested():
+                            raw = await conn.get_raw_connection()
+                            await raw.driver_connection.copy_records_to_table(
+                                model.__tablename__, records=rows, columns=columns
+                            )
+                    except Exception as e:
+                        if getattr(e, "sqlstate", None) != EXCLUSION_VIOLATION:
+                            raise
+                        # приём пересекается с уже записанным: COPY откатан
+                        # до savepoint, порция пишется построчно с пропуском
+                        skipped = await _insert_skipping_conflicts(
+                            conn, model, columns, rows, sources
+                        )
+                        imported -= len(skipped)
+                        rejected.extend(
+                            reject_line(record, data, BOOKED_DETAIL)
+                            for record, data in skipped
+                        )
+            stats.imported += imported
+            stats.rejected += len(rejected)
+            if reject_file:
+                reject_file.writelines(rejected)
+                reject_file.flush()
+            logger.info(
+                "%s: загружено %d, отклонено %d, %.0f строк/с",
+                kind,
+                stats.imported,
+                stats.rejected,
+                stats.rows_per_second,
+            )
+    finally:
+        if reject_file:
+            reject_file.close()
+    return stats
+
+
+async def _run(args: argparse.Namespace) -> ImportStats:
+    try:
+        return await run_import(
+            args.kind, args.path, args.batch_size, rejects=args.rejects
+        )
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("kind", choices=sorted(TARGETS))
+    parser.add_argument("path", type=Path, help="CSV или JSONL файл")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--rejects", type=Path, help="JSONL файл для отклонённых записей"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(_run(args))
+    logger.info(
+        "Готово: загружено %d, отклонено %d, пропущено %d, %.0f строк/с",
+        stats.imported,
+        stats.rejected,
+        stats.skipped,
+        stats.rows_per_second,
+    )
+
+
+if __name__ == "__main__":
+    main()
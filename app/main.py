@@ -1,28 +1,39 @@
 from contextlib import asynccontextmanager
 import logging
 from fastapi import FastAPI
-from .database import engine
-from .models import Base
-from .routers import clinics, doctors, patients, appointments
+from fastapi.responses import PlainTextResponse
+from .database import engine, pool_stats
+from .cache import InvalidationListener
+from .coalescing import COALESCE_GET, CoalescingMiddleware, coalescing_stats
+from .metrics import METRICS_ENABLED, MetricsMiddleware, registry
+from .migrations import prepare_schema
+from .querywatch import QUERY_WATCH, QueryWatchMiddleware
+from .replicas import ReplicaRoutingMiddleware, replica_set
+from .sqlhooks import instrument_engines
+from .routers import clinics, doctors, patients, appointments, search, purge, stats
+from .stats import DailyStatsRefresher
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def create_tables():
-    async with engine.begin() as conn:
-        logger.info("Создание таблиц...")
-        await conn.run_sync(Base.metadata.create_all) 
-        logger.info("Таблицы созданы")
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Запуск приложения...")
-    await create_tables()  # Выполняется при старте приложения
+    # схема создаётся миграциями (python -m app.migrations upgrade),
+    # при старте по умолчанию только сверяется её версия
+    await prepare_schema(engine)
+    cache_listener = InvalidationListener(engine)
+    await cache_listener.start()
+    stats_refresher = DailyStatsRefresher(engine)
+    await stats_refresher.start()
+    await replica_set.start()
     yield
     logger.info("Остановка приложения...")
+    await cache_listener.stop()
+    await stats_refresher.stop()
+    await replica_set.stop()
     await engine.dispose()  # Выполняется при завершении работы приложения
 
 
@@ -33,7 +44,51 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# метрики и QUERY_WATCH получают запросы от одних обработчиков событий
+if METRICS_ENABLED or QUERY_WATCH:
+    instrument_engines()
+
+if COALESCE_GET:
+    app.add_middleware(CoalescingMiddleware)
+# снаружи объединения запросов: время видно и у получивших копию ответа
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if QUERY_WATCH:
+    app.add_middleware(QueryWatchMiddleware)
+# снаружи всех: выбор реплики нужен объединению запросов и сессиям
+if replica_set.engines:
+    app.add_middleware(ReplicaRoutingMiddleware)
+
 app.include_router(doctors.router)
 app.include_router(patients.router)
 app.include_router(clinics.router)
 app.include_router(appointments.router)
+app.include_router(search.router)
+app.include_router(purge.router)
+app.include_router(stats.router)
+
+
+@app.get("/health/pool", tags=["health"])
+async def read_pool_stats():
+    """Снимок состояния пула соединений."""
+    return pool_stats()
+
+
+@app.get("/health/coalescing", tags=["health"])
+async def read_coalescing_stats():
+    """Статистика объединения одинаковых GET-запросов."""
+    return coalescing_stats.snapshot()
+
+
+@app.get("/health/replicas", tags=["health"])
+async def read_replica_stats():
+    """Реплики для чтения и те из них, что прошли последнюю проверку."""
+    return replica_set.snapshot()
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def read_metrics():
+    """Метрики запросов в текстовом формате Prometheus."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
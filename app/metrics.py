@@ -0,0 +1,268 @@
+"""Метрики запросов в текстовом формате Prometheus (GET /metrics).
+
+Middleware на каждый HTTP-запрос кладёт в contextvar счётчик, а
+обработчики событий SQLAlchemy из app/sqlhooks.py добавляют в него число запросов к БД,
+их время и число строк (rowcount). По завершении ответа всё это
+записывается в гистограммы с метками method и route, где route — шаблон
+пути (`/doctors/{doctor_id}`), а не сам путь, чтобы число рядов не росло
+с числом id. Разница между временем ответа и временем БД — это
+валидация, сериализация и прочая работа приложения.
+
+Запись — несколько сложений в dict в том же потоке, без блокировок и
+внешних зависимостей, поэтому метрики можно держать включёнными в бою.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from .database import env_bool
+from .sqlhooks import on_query
+
+# метрики и обработчики событий; выключается METRICS_ENABLED=false
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+METRICS_PATH = "/metrics"
+# метка route для путей, не совпавших ни с одной ручкой (404 и т.п.)
+UNMATCHED_ROUTE = "<unmatched>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in sorted(self.values.items()):
+            lines.append(
+                f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин.
+
+    Хранит некумулятивные счётчики по корзинам, кумулятивные суммы
+    считаются только при выдаче /metrics.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # метки -> [счётчики по корзинам..., +Inf, сумма]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def clear(self) -> None:
+        self.series.clear()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        names = (*self.labelnames, "le")
+        for labels, series in sorted(self.series.items()):
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                total += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, (*labels, bound))} {total}"
+                )
+            suffix = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{suffix} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+ROUTE_LABELS = ("method", "route")
+
+requests_total = registry.register(
+    Counter("http_requests_total", "Число HTTP-запросов", (*ROUTE_LABELS, "status"))
+)
+request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Время ответа, с",
+        ROUTE_LABELS,
+        LATENCY_BUCKETS,
+    )
+)
+request_db_duration = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds",
+        "Время запросов к БД за один HTTP-запрос, с",
+        ROUTE_LABELS,
+        LATENCY_BUCKETS,
+    )
+)
+request_db_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Число запросов к БД за один HTTP-запрос",
+        ROUTE_LABELS,
+        QUERY_COUNT_BUCKETS,
+    )
+)
+request_db_rows = registry.register(
+    Counter(
+        "http_request_db_rows_total",
+        "Строки, возвращённые или изменённые запросами к БД",
+        ROUTE_LABELS,
+    )
+)
+response_size = registry.register(
+    Histogram(
+        "http_response_size_bytes",
+        "Размер тела ответа, байт",
+        ROUTE_LABELS,
+        SIZE_BUCKETS,
+    )
+)
+db_queries_total = registry.register(
+    Counter(
+        "db_queries_total",
+        "Все запросы к БД, включая фоновые задачи вне HTTP-запросов",
+    )
+)
+db_query_duration_total = registry.register(
+    Counter(
+        "db_query_duration_seconds_total",
+        "Суммарное время всех запросов к БД, с",
+    )
+)
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "current_request_metrics", default=None
+)
+
+
+@on_query
+def _record_query(statement, seconds, cursor, executemany) -> None:
+    db_queries_total.inc()
+    db_query_duration_total.inc(amount=seconds)
+    request = current_request.get()
+    if request is None:
+        return
+    request.queries += 1
+    request.db_seconds += seconds
+    # у серверных курсоров (выгрузка) rowcount неизвестен: -1
+    if cursor.rowcount > 0:
+        request.rows += cursor.rowcount
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Время ответа, работа с БД и размер ответа по шаблону маршрута.
+
+    Сам /metrics не учитывается. Запрос, прерванный исключением,
+    записывается со статусом 500.
+    """
+
+    def __init__(self, app, exclude=(METRICS_PATH,)):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+
+        request = RequestMetrics()
+        token = current_request.set(request)
+        status = 500
+        size = 0
+
+        async def measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, measure)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            labels = (scope["method"], route_template(scope))
+            requests_total.inc((*labels, status))
+            request_duration.observe(labels, elapsed)
+            request_db_duration.observe(labels, request.db_seconds)
+            request_db_queries.observe(labels, request.queries)
+            request_db_rows.inc(labels, request.rows)
+            response_size.observe(labels, size)
@@ -0,0 +1,217 @@
+"""Версионные миграции схемы БД.
+
+Миграции лежат в app/migrations/versions в модулях vNNNN_<имя>.py и
+применяются по возрастанию номера. В каждом модуле есть функция
+`async def upgrade(conn)` и, при необходимости, `TRANSACTIONAL = False`
+для операций, которые нельзя выполнять в транзакции (CREATE INDEX
+CONCURRENTLY). Применённые версии записываются в schema_migrations.
+
+Запуск:
+    python -m app.migrations upgrade
+    python -m app.migrations status
+    python -m app.migrations verify
+"""
+
+import importlib
+import logging
+import os
+import pkgutil
+import re
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Iterable
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+# что делать со схемой при старте приложения:
+# verify — только сверить версию (по умолчанию), upgrade — применить
+# недостающие миграции, off — ничего не проверять
+DB_SCHEMA_MODE = os.getenv("DB_SCHEMA_MODE", "verify")
+
+# ключ pg_advisory_lock: миграции из нескольких процессов не идут параллельно
+MIGRATION_LOCK_KEY = 727_001
+
+metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column(
+        "applied_at",
+        DateTime,
+        nullable=False,
+        server_default=func.timezone("utc", func.now()),
+    ),
+)
+
+_MODULE_NAME = re.compile(r"^v(\d{4})_(\w+)$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "TRANSACTIONAL", True)
+
+
+def discover() -> list[Migration]:
+    """Все миграции из пакета versions по возрастанию версии."""
+    from . import versions
+
+    migrations = []
+    for info in pkgutil.iter_modules(versions.__path__):
+        match = _MODULE_NAME.match(info.name)
+        if match is None:
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{info.name}")
+        migrations.append(Migration(int(match[1]), match[2], module))
+    migrations.sort(key=lambda migration: migration.version)
+    expected = list(range(1, len(migrations) + 1))
+    if [migration.version for migration in migrations] != expected:
+        raise RuntimeError("Migration versions must be consecutive starting at 1")
+    return migrations
+
+
+def latest_version() -> int:
+    migrations = discover()
+    return migrations[-1].version if migrations else 0
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    """Последняя применённая версия; 0, если миграции ещё не применялись."""
+    exists = await conn.scalar(select(func.to_regclass(schema_migrations.name)))
+    if exists is None:
+        return 0
+    version = await conn.scalar(select(func.max(schema_migrations.c.version)))
+    return version or 0
+
+
+async def execute_all(conn: AsyncConnection, statements: Iterable[str]) -> None:
+    for statement in statements:
+        await conn.execute(text(statement))
+
+
+async def constraint_exists(conn: AsyncConnection, name: str) -> bool:
+    result = await conn.scalar(
+        text("SELECT count(*) FROM pg_constraint WHERE conname = :name"),
+        {"name": name},
+    )
+    return bool(result)
+
+
+async def extension_available(conn: AsyncConnection, name: str) -> bool:
+    result = await conn.scalar(
+        text("SELECT count(*) FROM pg_available_extensions WHERE name = :name"),
+        {"name": name},
+    )
+    return bool(result)
+
+
+async def create_index_concurrently(
+    conn: AsyncConnection, name: str, definition: str
+) -> None:
+    """CREATE INDEX CONCURRENTLY без блокировки записи в таблицу.
+
+    Прерванное построение оставляет невалидный индекс с тем же именем,
+    IF NOT EXISTS его бы пропустил, поэтому такой индекс сначала удаляется.
+    conn должен быть в режиме AUTOCOMMIT.
+    """
+    invalid = await conn.scalar(
+        text(
+            "SELECT count(*) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    )
+    if invalid:
+        logger.warning("Удаляем недостроенный индекс %s", name)
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(
+        text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}")
+    )
+
+
+async def _apply(db_engine: AsyncEngine, conn: AsyncConnection, migration) -> None:
+    logger.info("Миграция %04d_%s...", migration.version, migration.name)
+    record = schema_migrations.insert().values(
+        version=migration.version, name=migration.name
+    )
+    if migration.transactional:
+        async with conn.begin():
+            await migration.module.upgrade(conn)
+            await conn.execute(record)
+        return
+    # операции вне транзакции идут на отдельном соединении в AUTOCOMMIT;
+    # они должны быть идемпотентны, так как версия пишется после них
+    async with db_engine.connect() as autocommit:
+        autocommit = await autocommit.execution_options(isolation_level="AUTOCOMMIT")
+        await migration.module.upgrade(autocommit)
+    async with conn.begin():
+        await conn.execute(record)
+
+
+async def upgrade(db_engine: AsyncEngine = engine) -> list[int]:
+    """Применить недостающие миграции; вернуть применённые версии.
+
+    На время работы берётся pg_advisory_lock, поэтому одновременный
+    запуск из нескольких процессов безопасен: второй дождётся первого
+    и увидит, что применять уже нечего.
+    """
+    applied = []
+    async with db_engine.connect() as conn:
+        await conn.execute(select(func.pg_advisory_lock(MIGRATION_LOCK_KEY)))
+        await conn.commit()
+        try:
+            async with conn.begin():
+                await conn.run_sync(metadata.create_all)
+                version = await current_version(conn)
+            for migration in discover():
+                if migration.version <= version:
+                    continue
+                await _apply(db_engine, conn, migration)
+                applied.append(migration.version)
+        finally:
+            await conn.execute(select(func.pg_advisory_unlock(MIGRATION_LOCK_KEY)))
+            await conn.commit()
+    return applied
+
+
+async def verify(db_engine: AsyncEngine = engine) -> int:
+    """Проверить, что схема в БД актуальна: один лёгкий запрос при старте."""
+    async with db_engine.connect() as conn:
+        version = await current_version(conn)
+    expected = latest_version()
+    if version != expected:
+        raise RuntimeError(
+            f"Database schema version is {version}, expected {expected}; "
+            "run `python -m app.migrations upgrade`"
+        )
+    return version
+
+
+async def prepare_schema(db_engine: AsyncEngine = engine) -> None:
+    """Подготовка схемы при старте приложения по DB_SCHEMA_MODE."""
+    if DB_SCHEMA_MODE == "upgrade":
+        applied = await upgrade(db_engine)
+        logger.info("Применены миграции: %s", applied or "нет")
+    elif DB_SCHEMA_MODE == "verify":
+        version = await verify(db_engine)
+        logger.info("Версия схемы БД: %s", version)
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import logging
+from ..database import engine
+from . import current_version, discover, upgrade, verify
+
+logger = logging.getLogger(__name__)
+
+
+async def status() -> None:
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    for migration in discover():
+        mark = "x" if migration.version <= version else " "
+        print(f"[{mark}] {migration.version:04d}_{migration.name}")
+
+
+async def _run(command: str) -> None:
+    try:
+        if command == "upgrade":
+            applied = await upgrade()
+            logger.info("Применены миграции: %s", applied or "нет")
+        elif command == "verify":
+            logger.info("Версия схемы БД: %s", await verify())
+        else:
+            await status()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    # status печатает список миграций с отметкой применённых
+    parser.add_argument("command", choices=["upgrade", "status", "verify"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run(args.command))
+
+
+if __name__ == "__main__":
+    main()
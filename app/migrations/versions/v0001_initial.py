@@ -0,0 +1,51 @@
+"""Исходная схема: таблицы, которые раньше создавал create_all.
+
+IF NOT EXISTS позволяет принять под миграции уже развёрнутую БД.
+"""
+
+from .. import execute_all
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS clinics (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR,
+        address VARCHAR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_clinics_id ON clinics (id)",
+    "CREATE INDEX IF NOT EXISTS ix_clinics_name ON clinics (name)",
+    """
+    CREATE TABLE IF NOT EXISTS doctors (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR,
+        clinic_id INTEGER REFERENCES clinics (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_doctors_id ON doctors (id)",
+    "CREATE INDEX IF NOT EXISTS ix_doctors_name ON doctors (name)",
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR,
+        doctor_id INTEGER REFERENCES doctors (id),
+        clinic_id INTEGER REFERENCES clinics (id),
+        appointment_time TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_patients_id ON patients (id)",
+    "CREATE INDEX IF NOT EXISTS ix_patients_name ON patients (name)",
+    """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id SERIAL PRIMARY KEY,
+        doctor_id INTEGER REFERENCES doctors (id),
+        patient_id INTEGER REFERENCES patients (id),
+        date TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_appointments_id ON appointments (id)",
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -0,0 +1,72 @@
+"""Версии строк, расписания докторов, чекпоинты импорта и защита от
+двойной записи на приём.
+
+Ограничение appointments_doctor_no_overlap не добавится, если в БД уже
+есть пересекающиеся приёмы одного доктора: их нужно разрешить заранее.
+"""
+
+from .. import constraint_exists, execute_all
+
+VERSIONED_TABLES = ("clinics", "doctors", "patients", "appointments")
+
+STATEMENTS = [
+    *(f"""
+        ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE
+                NOT NULL DEFAULT timezone('utc', now())
+        """ for table in VERSIONED_TABLES),
+    """
+    ALTER TABLE doctors
+        ADD COLUMN IF NOT EXISTS slot_minutes INTEGER NOT NULL DEFAULT 30
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS working_hours (
+        id SERIAL PRIMARY KEY,
+        doctor_id INTEGER NOT NULL REFERENCES doctors (id) ON DELETE CASCADE,
+        weekday INTEGER NOT NULL,
+        start TIME WITHOUT TIME ZONE NOT NULL,
+        "end" TIME WITHOUT TIME ZONE NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_working_hours_doctor_id
+        ON working_hours (doctor_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        source VARCHAR PRIMARY KEY,
+        position INTEGER NOT NULL
+    )
+    """,
+    """
+    ALTER TABLE appointments
+        ADD COLUMN IF NOT EXISTS ends_at TIMESTAMP WITHOUT TIME ZONE
+    """,
+    # старые приёмы занимают один слот своего доктора
+    """
+    UPDATE appointments
+    SET ends_at = date + make_interval(
+        mins => coalesce(
+            (SELECT slot_minutes FROM doctors WHERE doctors.id = appointments.doctor_id),
+            30
+        )
+    )
+    WHERE ends_at IS NULL
+    """,
+    "ALTER TABLE appointments ALTER COLUMN ends_at SET NOT NULL",
+]
+
+NO_OVERLAP = """
+    ALTER TABLE appointments
+    ADD CONSTRAINT appointments_doctor_no_overlap EXCLUDE USING gist (
+        int4range(doctor_id, doctor_id, '[]') WITH =,
+        tsrange(date, ends_at) WITH &&
+    )
+"""
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
+    if not await constraint_exists(conn, "appointments_doctor_no_overlap"):
+        await execute_all(conn, [NO_OVERLAP])
@@ -0,0 +1,32 @@
+"""Индексы для фильтров, поиска свободных слотов и поиска по имени.
+
+Строятся CONCURRENTLY, чтобы не блокировать запись в большие таблицы.
+Индексы pg_trgm создаются, только если расширение есть на сервере.
+"""
+
+from .. import create_index_concurrently, execute_all, extension_available
+
+TRANSACTIONAL = False
+
+INDEXES = {
+    "ix_appointments_doctor_id_date": "appointments (doctor_id, date)",
+    "ix_appointments_patient_id": "appointments (patient_id)",
+    "ix_appointments_date": "appointments (date)",
+    "ix_patients_doctor_id": "patients (doctor_id)",
+    "ix_patients_clinic_id": "patients (clinic_id)",
+    "ix_doctors_clinic_id": "doctors (clinic_id)",
+}
+
+TRGM_INDEXES = {
+    f"ix_{table}_name_trgm": f"{table} USING gin (name gin_trgm_ops)"
+    for table in ("clinics", "doctors", "patients")
+}
+
+
+async def upgrade(conn):
+    for name, definition in INDEXES.items():
+        await create_index_concurrently(conn, name, definition)
+    if await extension_available(conn, "pg_trgm"):
+        await execute_all(conn, ["CREATE EXTENSION IF NOT EXISTS pg_trgm"])
+        for name, definition in TRGM_INDEXES.items():
+            await create_index_concurrently(conn, name, definition)
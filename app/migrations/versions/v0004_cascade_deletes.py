@@ -0,0 +1,36 @@
+"""ON DELETE CASCADE на внешних ключах поддерева клиники.
+
+Ключи пересоздаются как NOT VALID (без полного прохода по таблице под
+эксклюзивной блокировкой) и затем проверяются VALIDATE CONSTRAINT,
+которому достаточно SHARE UPDATE EXCLUSIVE.
+"""
+
+from .. import execute_all
+
+# (таблица, колонка, таблица, на которую ссылается ключ)
+FOREIGN_KEYS = [
+    ("doctors", "clinic_id", "clinics"),
+    ("patients", "doctor_id", "doctors"),
+    ("patients", "clinic_id", "clinics"),
+    ("appointments", "doctor_id", "doctors"),
+    ("appointments", "patient_id", "patients"),
+]
+
+
+async def upgrade(conn):
+    await execute_all(
+        conn,
+        [f"""
+            ALTER TABLE {table}
+                DROP CONSTRAINT IF EXISTS {table}_{column}_fkey,
+                ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column})
+                    REFERENCES {target} (id) ON DELETE CASCADE NOT VALID
+            """ for table, column, target in FOREIGN_KEYS],
+    )
+    await execute_all(
+        conn,
+        [
+            f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_{column}_fkey"
+            for table, column, _ in FOREIGN_KEYS
+        ],
+    )
@@ -0,0 +1,28 @@
+"""Сводная таблица приёмов по доктору и дню для /stats.
+
+Таблица новая и пустая, поэтому создаётся в транзакции вместе с
+индексом; заполняется первым пересчётом (POST /stats/refresh или
+фоновый пересчёт при STATS_REFRESH_SECONDS > 0).
+"""
+
+from .. import execute_all
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS appointment_daily_stats (
+        doctor_id INTEGER NOT NULL REFERENCES doctors (id) ON DELETE CASCADE,
+        day DATE NOT NULL,
+        appointments INTEGER NOT NULL,
+        booked_minutes INTEGER NOT NULL,
+        PRIMARY KEY (doctor_id, day)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_appointment_daily_stats_day
+        ON appointment_daily_stats (day)
+    """,
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
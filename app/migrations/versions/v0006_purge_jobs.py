@@ -0,0 +1,24 @@
+"""Задачи фонового удаления в БД: их состояние видно из любого воркера."""
+
+from .. import execute_all
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS purge_jobs (
+        id VARCHAR PRIMARY KEY,
+        target VARCHAR NOT NULL,
+        target_id INTEGER NOT NULL,
+        status VARCHAR NOT NULL,
+        deleted JSONB NOT NULL,
+        error VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+            DEFAULT timezone('utc', now()),
+        started_at TIMESTAMP WITHOUT TIME ZONE,
+        finished_at TIMESTAMP WITHOUT TIME ZONE
+    )
+    """,
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -0,0 +1,19 @@
+"""Сводка пациентов по клиникам для /stats/patients-per-clinic.
+
+Таблица новая и пустая; заполняется следующим пересчётом сводки.
+"""
+
+from .. import execute_all
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS clinic_patient_stats (
+        clinic_id INTEGER PRIMARY KEY REFERENCES clinics (id) ON DELETE CASCADE,
+        patients INTEGER NOT NULL
+    )
+    """,
+]
+
+
+async def upgrade(conn):
+    await execute_all(conn, STATEMENTS)
@@ -1,66 +1,272 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from datetime import timedelta
+from sqlalchemy import (
+    DDL,
+    Column,
+    Date,
+    Integer,
+    String,
+    ForeignKey,
+    DateTime,
+    Index,
+    Time,
+    event,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
+from .availability import DEFAULT_SLOT_MINUTES
 
+# Связи не подгружаются: lazy="raise" превращает случайное обращение к
+# незагруженной связи в понятную ошибку вместо MissingGreenlet. Нужные
+# связи загружаются явно (selectinload) или отдельным запросом по id.
+# Дочерние строки удаляет сама БД (ON DELETE CASCADE), а passive_deletes
+# не даёт ORM загружать поддерево ради удаления.
 
-class Doctor(Base):
+
+def trgm_available(ddl, target, bind, **kw) -> bool:
+    """Есть ли расширение pg_trgm на сервере (индексы для /search)."""
+    return bool(
+        bind.scalar(
+            text("SELECT count(*) FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        )
+    )
+
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=trgm_available),
+)
+
+
+def trgm_index(name: str) -> Index:
+    """GIN-индекс по name для ILIKE 'x%' и поиска похожих (оператор %)."""
+    return Index(
+        name,
+        "name",
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    ).ddl_if(callable_=trgm_available)
+
+
+class Versioned:
+    """Версия строки и время последнего изменения (UTC).
+
+    Оба поля обновляются в SET каждого UPDATE через onupdate; пакетный
+    upsert (ON CONFLICT) выставляет их сам. По ним строятся ETag и
+    Last-Modified.
+    """
+
+    version = Column(
+        Integer,
+        nullable=False,
+        server_default=text("1"),
+        onupdate=literal_column("version") + 1,
+    )
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        server_default=func.timezone("utc", func.now()),
+        onupdate=func.timezone("utc", func.now()),
+    )
+
+
+class Doctor(Versioned, Base):
     __tablename__ = "doctors"
+    __table_args__ = (trgm_index("ix_doctors_name_trgm"),)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    clinic_id = Column(Integer, ForeignKey("clinics.id"))
-    clinic = relationship("Clinic", back_populates="doctors", lazy="selectin")
+    clinic_id = Column(
+        Integer, ForeignKey("clinics.id", ondelete="CASCADE"), index=True
+    )
+    # длина одного приёма, рабочие окна — в WorkingHours
+    slot_minutes = Column(
+        Integer, nullable=False, server_default=text(str(DEFAULT_SLOT_MINUTES))
+    )
+    clinic = relationship("Clinic", back_populates="doctors", lazy="raise")
     patients = relationship(
         "Patient",
         back_populates="doctor",
-        lazy="selectin",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
     )
     appointments = relationship(
         "Appointment",
         back_populates="doctor",
-        lazy="selectin",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
     )
 
 
-class Patient(Base):
+class Patient(Versioned, Base):
     __tablename__ = "patients"
+    __table_args__ = (trgm_index("ix_patients_name_trgm"),)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=True)
-    clinic_id = Column(Integer, ForeignKey("clinics.id"), nullable=True)
-    doctor = relationship("Doctor", back_populates="patients", lazy="selectin")
-    clinic = relationship("Clinic", back_populates="patients", lazy="selectin")
+    doctor_id = Column(
+        Integer,
+        ForeignKey("doctors.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    clinic_id = Column(
+        Integer,
+        ForeignKey("clinics.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    doctor = relationship("Doctor", back_populates="patients", lazy="raise")
+    clinic = relationship("Clinic", back_populates="patients", lazy="raise")
     appointments = relationship(
         "Appointment",
         back_populates="patient",
-        lazy="selectin",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
     )
     appointment_time = Column(DateTime)
 
 
-class Clinic(Base):
+class Clinic(Versioned, Base):
     __tablename__ = "clinics"
+    __table_args__ = (trgm_index("ix_clinics_name_trgm"),)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     address = Column(String)
     doctors = relationship(
-        "Doctor", back_populates="clinic", lazy="selectin", cascade="all, delete-orphan"
+        "Doctor",
+        back_populates="clinic",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
     )
     patients = relationship(
         "Patient",
         back_populates="clinic",
-        lazy="selectin",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise",
+    )
+
+
+def _default_ends_at(context):
+    return context.get_current_parameters()["date"] + timedelta(
+        minutes=DEFAULT_SLOT_MINUTES
     )
 
 
-class Appointment(Base):
+class Appointment(Versioned, Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # поиск свободных слотов читает записи доктора по диапазону дат
+        Index("ix_appointments_doctor_id_date", "doctor_id", "date"),
+        # у доктора не может быть двух пересекающихся приёмов; равенство
+        # doctor_id записано через int4range, чтобы не требовать btree_gist
+        ExcludeConstraint(
+            (text("int4range(doctor_id, doctor_id, '[]')"), "="),
+            (text("tsrange(date, ends_at)"), "&&"),
+            name="appointments_doctor_no_overlap",
+            using="gist",
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    doctor_id = Column(Integer, ForeignKey("doctors.id"))
-    patient_id = Column(Integer, ForeignKey("patients.id"))
-    date = Column(DateTime)
-    doctor = relationship("Doctor", back_populates="appointments", lazy="selectin")
-    patient = relationship("Patient", back_populates="appointments", lazy="selectin")
+    # отдельный индекс по doctor_id не нужен: его покрывает (doctor_id, date)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"))
+    patient_id = Column(
+        Integer, ForeignKey("patients.id", ondelete="CASCADE"), index=True
+    )
+    date = Column(DateTime, index=True)
+    # конец приёма: сервисы берут длину слота доктора
+    ends_at = Column(DateTime, nullable=False, default=_default_ends_at)
+    doctor = relationship("Doctor", back_populates="appointments", lazy="raise")
+    patient = relationship("Patient", back_populates="appointments", lazy="raise")
+
+
+class WorkingHours(Base):
+    """Рабочее окно доктора в день недели (0 — понедельник).
+
+    Строки удаляются вместе с доктором на стороне БД (ON DELETE CASCADE).
+    """
+
+    __tablename__ = "working_hours"
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(
+        Integer,
+        ForeignKey("doctors.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    weekday = Column(Integer, nullable=False)
+    start = Column(Time, nullable=False)
+    end = Column(Time, nullable=False)
+
+
+class AppointmentDailyStats(Base):
+    """Сводка приёмов доктора за день для /stats (см. app/stats.py).
+
+    Не источник истины: таблица пересчитывается из appointments целиком
+    или за диапазон дней и может отставать до следующего пересчёта.
+    """
+
+    __tablename__ = "appointment_daily_stats"
+    doctor_id = Column(
+        Integer, ForeignKey("doctors.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True, index=True)
+    appointments = Column(Integer, nullable=False)
+    booked_minutes = Column(Integer, nullable=False)
+
+
+class ClinicPatientStats(Base):
+    """Число пациентов клиники для /stats (см. app/stats.py).
+
+    Пересчитывается целиком вместе с appointment_daily_stats; клиник
+    без пациентов в таблице нет.
+    """
+
+    __tablename__ = "clinic_patient_stats"
+    clinic_id = Column(
+        Integer, ForeignKey("clinics.id", ondelete="CASCADE"), primary_key=True
+    )
+    patients = Column(Integer, nullable=False)
+
+
+class ImportCheckpoint(Base):
+    """Сколько записей файла импорта уже загружено (см. app/importer.py)."""
+
+    __tablename__ = "import_checkpoints"
+    source = Column(String, primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+
+
+class PurgeJob(Base):
+    """Фоновое удаление поддерева: ход выполнения по таблицам (app/purge.py).
+
+    Задача хранится в БД, а не в памяти процесса, поэтому GET /purge/{job_id}
+    отвечает в любом воркере uvicorn, а не только в принявшем DELETE.
+    """
+
+    __tablename__ = "purge_jobs"
+    id = Column(String, primary_key=True)
+    target = Column(String, nullable=False)
+    target_id = Column(Integer, nullable=False)
+    # pending | running | done | failed
+    status = Column(String, nullable=False, default="pending")
+    # таблица -> сколько строк удалено
+    deleted = Column(JSONB, nullable=False, default=dict)
+    error = Column(String)
+    created_at = Column(
+        DateTime, nullable=False, server_default=func.timezone("utc", func.now())
+    )
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def snapshot(self) -> dict:
+        return {
+            column.name: getattr(self, column.name) for column in self.__table__.columns
+        }
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class PageParams:
+    """Параметры keyset-пагинации: размер страницы и id, после которого читать."""
+
+    limit: int = DEFAULT_PAGE_SIZE
+    after: Optional[int] = None
+
+
+def get_page_params(
+    limit: int = Query(
+        DEFAULT_PAGE_SIZE,
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description="Количество записей на странице",
+    ),
+    after: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Курсор: id последней записи предыдущей страницы (next_cursor)",
+    ),
+) -> PageParams:
+    return PageParams(limit=limit, after=after)
+
+
+def to_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """В БД даты хранятся без таймзоны, поэтому tzinfo отбрасываем."""
+    if value is not None and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
+def apply_date_range(
+    stmt: Select,
+    column,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+) -> Select:
+    """Фильтр по полуинтервалу [date_from, date_to)."""
+    date_from, date_to = to_naive(date_from), to_naive(date_to)
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(
+            status_code=400, detail="date_from must not be later than date_to"
+        )
+    if date_from is not None:
+        stmt = stmt.where(column >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(column < date_to)
+    return stmt
+
+
+def _selects_entity(stmt: Select) -> bool:
+    descriptions = stmt.column_descriptions
+    return len(descriptions) == 1 and isinstance(descriptions[0]["expr"], type)
+
+
+async def paginate(db: AsyncSession, stmt: Select, id_column, page: PageParams) -> dict:
+    """Выполнить запрос постранично по возрастанию id.
+
+    Читаем на одну запись больше лимита: если она есть, значит есть и
+    следующая страница, и её курсором служит id последнего элемента.
+    stmt может выбирать модель или колонки; во втором случае элементы —
+    строки Row с тем же доступом к полям по атрибутам.
+    """
+    if page.after is not None:
+        stmt = stmt.where(id_column > page.after)
+    stmt = stmt.order_by(id_column).limit(page.limit + 1)
+    result = await db.execute(stmt)
+    # select(Model) отдаёт ORM-объекты, select(колонки) — строки Row
+    rows = result.scalars().all() if _selects_entity(stmt) else result.all()
+    items = rows[: page.limit]
+    next_cursor = items[-1].id if len(rows) > page.limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,152 @@
+import logging
+from uuid import uuid4
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from .cache import clinic_cache, doctor_cache, mark_stale
+from .database import env_int
+from .models import Appointment, Clinic, Doctor, Patient, PurgeJob
+from .writes import insert_returning
+
+logger = logging.getLogger(__name__)
+
+# сколько строк удалять за одну транзакцию в фоновом режиме
+PURGE_BATCH_SIZE = env_int("PURGE_BATCH_SIZE", 10000)
+# сколько последних задач хранить для GET /purge/{job_id}
+PURGE_JOBS_KEEP = 1000
+
+
+async def register(db: AsyncSession, target: str, target_id: int) -> PurgeJob:
+    """Записать новую задачу и закоммитить до ответа 202.
+
+    Так любой воркер найдёт её в БД по GET /purge/{job_id}. Старые
+    задачи сверх PURGE_JOBS_KEEP удаляются тем же коммитом.
+    """
+    job = await insert_returning(
+        db, PurgeJob, {"id": uuid4().hex, "target": target, "target_id": target_id}
+    )
+    oldest = (
+        select(PurgeJob.id)
+        .order_by(PurgeJob.created_at.desc(), PurgeJob.id)
+        .offset(PURGE_JOBS_KEEP)
+    )
+    await db.execute(delete(PurgeJob).where(PurgeJob.id.in_(oldest.scalar_subquery())))
+    await db.commit()
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: str):
+    return await db.get(PurgeJob, job_id, populate_existing=True)
+
+
+async def save_job(db_engine: AsyncEngine, job_id: str, **values) -> None:
+    """Обновить задачу отдельной короткой транзакцией."""
+    async with AsyncSession(db_engine) as db:
+        await db.execute(update(PurgeJob).where(PurgeJob.id == job_id).values(values))
+        await db.commit()
+
+
+def clinic_steps(clinic_id: int) -> list:
+    """(модель, условие) в порядке удаления: от листьев к корню."""
+    doctors = select(Doctor.id).where(Doctor.clinic_id == clinic_id)
+    patients = select(Patient.id).where(
+        or_(Patient.clinic_id == clinic_id, Patient.doctor_id.in_(doctors))
+    )
+    return [
+        (
+            Appointment,
+            or_(
+                Appointment.doctor_id.in_(doctors),
+                Appointment.patient_id.in_(patients),
+            ),
+        ),
+        (Patient, Patient.id.in_(patients)),
+        (Doctor, Doctor.clinic_id == clinic_id),
+        (Clinic, Clinic.id == clinic_id),
+    ]
+
+
+def doctor_steps(doctor_id: int) -> list:
+    patients = select(Patient.id).where(Patient.doctor_id == doctor_id)
+    return [
+        (
+            Appointment,
+            or_(
+                Appointment.doctor_id == doctor_id,
+                Appointment.patient_id.in_(patients),
+            ),
+        ),
+        (Patient, Patient.doctor_id == doctor_id),
+        (Doctor, Doctor.id == doctor_id),
+    ]
+
+
+async def delete_in_batches(
+    db: AsyncSession, model, condition, batch_size: int = PURGE_BATCH_SIZE
+) -> int:
+    """Удалять строки порциями, коммитя каждую.
+
+    Короткие транзакции не держат блокировки и не копят WAL на всё
+    поддерево сразу, а прерванное удаление можно просто запустить снова.
+    """
+    total = 0
+    while True:
+        batch = select(model.id).where(condition).limit(batch_size)
+        result = await db.execute(
+            delete(model)
+            .where(model.id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+async def run_purge(job: PurgeJob, db_engine: AsyncEngine) -> None:
+    """Выполнить задачу удаления в отдельной сессии.
+
+    Ход выполнения пишется в purge_jobs после каждой таблицы.
+    """
+    steps = (clinic_steps if job.target == "clinic" else doctor_steps)(job.target_id)
+    now = func.timezone("utc", func.now())
+    deleted = {}
+    await save_job(db_engine, job.id, status="running", started_at=now)
+    try:
+        async with AsyncSession(db_engine, expire_on_commit=False) as db:
+            doctor_ids = [job.target_id]
+            if job.target == "clinic":
+                doctor_ids = (
+                    await db.scalars(
+                        select(Doctor.id).where(Doctor.clinic_id == job.target_id)
+                    )
+                ).all()
+            for model, condition in steps:
+                # кэш сбрасывается коммитом той порции, что удаляет саму запись
+                if model is Doctor:
+                    await mark_stale(db, doctor_cache, *doctor_ids)
+                elif model is Clinic:
+                    await mark_stale(db, clinic_cache, job.target_id)
+                deleted[model.__tablename__] = await delete_in_batches(
+                    db, model, condition
+                )
+                await save_job(db_engine, job.id, deleted=deleted)
+    except Exception as e:
+        logger.exception("Фоновое удаление %s id=%s упало", job.target, job.target_id)
+        await save_job(
+            db_engine, job.id, status="failed", error=str(e), finished_at=now
+        )
+    else:
+        await save_job(db_engine, job.id, status="done", finished_at=now)
+
+
+async def delete_row(db: AsyncSession, model, row_id: int) -> bool:
+    """Удалить строку одним DELETE без загрузки поддерева в сессию.
+
+    Дочерние строки удаляет сама БД по ON DELETE CASCADE. Сам объект,
+    если он был в сессии, убирается из неё по RETURNING без лишнего
+    запроса. Возвращает False, если строки не было.
+    """
+    result = await db.execute(
+        delete(model).where(model.id == row_id).returning(model.id)
+    )
+    return result.scalar_one_or_none() is not None
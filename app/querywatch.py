@@ -0,0 +1,183 @@
+"""Поиск N+1 и медленных запросов при разработке и в CI.
+
+Включается QUERY_WATCH=true. Обработчики событий SQLAlchemy из
+app/sqlhooks.py, общие с метриками, записывают каждый запрос к БД в
+журнал текущего HTTP-запроса, а QueryWatchMiddleware по нему отвечает
+заголовками:
+- X-Query-Count и X-Query-Time-Ms — число запросов и их время;
+- X-Query-Issues — `n+1=<число форм>; slow=<число запросов>`, если есть.
+Подробности (форма запроса, повторы, время) пишутся в лог предупреждением.
+
+N+1 — это один и тот же запрос с точностью до параметров, выполненный
+QUERY_WATCH_REPEATS раз и больше за один HTTP-запрос. Медленный —
+дольше QUERY_WATCH_SLOW_MS. Тот же журнал используют фикстуры
+sql_statements и query_budget в тестах.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+from .database import env_bool, env_int
+from .metrics import route_template
+from .sqlhooks import instrument_engines, on_query
+
+logger = logging.getLogger(__name__)
+
+QUERY_WATCH = env_bool("QUERY_WATCH", False)
+# запрос дольше этого, мс, считается медленным
+QUERY_WATCH_SLOW_MS = env_int("QUERY_WATCH_SLOW_MS", 100)
+# столько одинаковых запросов за HTTP-запрос считаются N+1
+QUERY_WATCH_REPEATS = env_int("QUERY_WATCH_REPEATS", 3)
+# длина SQL в логе
+SHAPE_LOG_LENGTH = 300
+
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACES = re.compile(r"\s+")
+
+
+def query_shape(statement: str) -> str:
+    """SQL без значений параметров: IN с разным числом id — одна форма."""
+    shape = _PLACEHOLDER.sub("?", statement)
+    shape = _PLACEHOLDER_LIST.sub("?, ...", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+@dataclass
+class Query:
+    statement: str
+    seconds: float
+    # пачки insertmanyvalues и executemany повторяются законно
+    executemany: bool = False
+
+
+@dataclass
+class QueryLog:
+    queries: list[Query] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    @property
+    def statements(self) -> list[str]:
+        return [query.statement for query in self.queries]
+
+    def clear(self) -> None:
+        """Начать счёт заново, например после подготовки данных в тесте."""
+        self.queries.clear()
+
+    def repeated(self, threshold: int = QUERY_WATCH_REPEATS) -> dict[str, int]:
+        """Формы запросов, выполненные threshold раз и больше."""
+        shapes = Counter(
+            query_shape(query.statement)
+            for query in self.queries
+            if not query.executemany
+        )
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    def slow(self, threshold_ms: int = QUERY_WATCH_SLOW_MS) -> list[Query]:
+        return [query for query in self.queries if query.seconds * 1000 > threshold_ms]
+
+
+_active_logs: ContextVar[tuple[QueryLog, ...]] = ContextVar(
+    "query_watch_logs", default=()
+)
+
+
+@on_query
+def _record_query(statement, seconds, cursor, executemany) -> None:
+    logs = _active_logs.get()
+    if not logs:
+        return
+    query = Query(statement, seconds, executemany)
+    for log in logs:
+        log.queries.append(query)
+
+
+@contextmanager
+def watch_queries() -> Iterator[QueryLog]:
+    """Журнал запросов к БД внутри блока; вложенные блоки видят свои запросы."""
+    instrument_engines()
+    log = QueryLog()
+    token = _active_logs.set((*_active_logs.get(), log))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+class QueryWatchMiddleware:
+    """Заголовки X-Query-* и предупреждения в лог по каждому HTTP-запросу.
+
+    Заголовки отражают запросы, сделанные до начала ответа; у потоковых
+    ответов остальные попадают только в лог.
+    """
+
+    def __init__(
+        self,
+        app,
+        slow_ms: int = QUERY_WATCH_SLOW_MS,
+        repeats: int = QUERY_WATCH_REPEATS,
+    ):
+        self.app = app
+        self.slow_ms = slow_ms
+        self.repeats = repeats
+
+    def _issues(self, log: QueryLog) -> str:
+        issues = []
+        repeated = log.repeated(self.repeats)
+        if repeated:
+            issues.append(f"n+1={len(repeated)}")
+        slow = log.slow(self.slow_ms)
+        if slow:
+            issues.append(f"slow={len(slow)}")
+        return "; ".join(issues)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with watch_queries() as log:
+
+            async def report(message):
+                if message["type"] == "http.response.start":
+                    # сообщение может быть общим с объединёнными запросами
+                    headers = [
+                        *message["headers"],
+                        (b"x-query-count", str(log.count).encode()),
+                        (b"x-query-time-ms", f"{log.seconds * 1000:.1f}".encode()),
+                    ]
+                    issues = self._issues(log)
+                    if issues:
+                        headers.append((b"x-query-issues", issues.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, report)
+        self._log(scope, log)
+
+    def _log(self, scope, log: QueryLog) -> None:
+        request = f"{scope['method']} {route_template(scope)}"
+        for shape, count in log.repeated(self.repeats).items():
+            logger.warning(
+                "N+1 в %s: %d одинаковых запросов: %s",
+                request,
+                count,
+                shape[:SHAPE_LOG_LENGTH],
+            )
+        for query in log.slow(self.slow_ms):
+            logger.warning(
+                "Медленный запрос в %s: %.0f мс: %s",
+                request,
+                query.seconds * 1000,
+                query_shape(query.statement)[:SHAPE_LOG_LENGTH],
+            )
@@ -0,0 +1,213 @@
+"""Чтение с реплик: GET-запросы идут на реплики, запись — на основной сервер.
+
+Реплики задаются DB_REPLICA_HOSTS (`host:port` через запятую, остальное
+подключение как у основного). ReplicaRoutingMiddleware выбирает для
+GET/HEAD и читающих POST-ручек (READ_POST_SUFFIXES, например batch-get)
+следующую по кругу здоровую реплику и кладёт её engine в
+database.session_engine, откуда его берёт async_get_db. Остальные
+запросы работают с основным сервером.
+
+Реплика отстаёт от основного сервера, поэтому после успешной записи
+клиент получает cookie, и его чтения ещё DB_READ_YOUR_WRITES_SECONDS
+идут на основной сервер: он сразу видит то, что записал. Здоровье
+реплик проверяется фоном `SELECT 1` раз в DB_REPLICA_CHECK_SECONDS;
+если живых реплик нет, чтения тоже идут на основной сервер.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from itertools import count
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from starlette.requests import HTTPConnection
+from .database import (
+    DB_NAME,
+    DB_PASSWORD,
+    DB_TYPE,
+    DB_USER,
+    engine_options,
+    env_int,
+    session_engine,
+    session_pinned,
+)
+
+logger = logging.getLogger(__name__)
+
+DB_REPLICA_HOSTS = [
+    host.strip()
+    for host in os.getenv("DB_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+# столько секунд после записи клиент читает с основного сервера
+DB_READ_YOUR_WRITES_SECONDS = env_int("DB_READ_YOUR_WRITES_SECONDS", 5)
+# период и таймаут проверки реплик, с
+DB_REPLICA_CHECK_SECONDS = env_int("DB_REPLICA_CHECK_SECONDS", 5)
+DB_REPLICA_CHECK_TIMEOUT = env_int("DB_REPLICA_CHECK_TIMEOUT", 2)
+
+READ_METHODS = ("GET", "HEAD")
+# POST-ручки, которые только читают: тело вместо строки запроса
+READ_POST_SUFFIXES = ("/batch-get",)
+# время (unix), до которого чтения клиента идут на основной сервер
+PRIMARY_COOKIE = "db_primary_until"
+
+
+def replica_url(host: str) -> str:
+    return f"postgresql{DB_TYPE}://{DB_USER}:{DB_PASSWORD}@{host}/{DB_NAME}"
+
+
+class ReplicaSet:
+    """Реплики по кругу среди тех, что прошли последнюю проверку.
+
+    Подойдёт любой объект с async-контекстом connect(), поэтому в тестах
+    вместо реплик можно подставить заглушки или второй engine той же БД.
+    """
+
+    def __init__(
+        self,
+        engines: list,
+        period: int = DB_REPLICA_CHECK_SECONDS,
+        timeout: int = DB_REPLICA_CHECK_TIMEOUT,
+    ):
+        self.engines = list(engines)
+        self.period = period
+        self.timeout = timeout
+        # до первой проверки реплики считаются живыми
+        self.healthy = list(self.engines)
+        self._turn = count()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_hosts(cls, hosts: list[str]) -> "ReplicaSet":
+        return cls(
+            [
+                create_async_engine(replica_url(host), **engine_options())
+                for host in hosts
+            ]
+        )
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Следующая живая реплика или None, если живых нет."""
+        healthy = self.healthy
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    async def _ping(self, replica) -> bool:
+        try:
+            async with replica.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), self.timeout)
+        except Exception as e:
+            logger.warning(
+                "Реплика %s недоступна: %s", getattr(replica, "url", replica), e
+            )
+            return False
+        return True
+
+    async def check(self) -> list:
+        """Проверить все реплики и оставить в ротации только живые."""
+        results = await asyncio.gather(
+            *(self._ping(replica) for replica in self.engines)
+        )
+        self.healthy = [
+            replica for replica, alive in zip(self.engines, results) if alive
+        ]
+        return self.healthy
+
+    async def start(self) -> None:
+        if not self.engines or self.period <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Чтение с реплик: %s", len(self.engines))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.engines:
+            await replica.dispose()
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.period)
+
+    def snapshot(self) -> dict:
+        return {
+            "replicas": len(self.engines),
+            "healthy": [str(replica.url.host) for replica in self.healthy],
+        }
+
+
+replica_set = ReplicaSet.from_hosts(DB_REPLICA_HOSTS)
+
+
+class ReplicaRoutingMiddleware:
+    """Чтения — на реплику, запись и чтения сразу после неё — на основной.
+
+    Выбор кладётся и в scope["db_read"], чтобы объединение одинаковых
+    GET-запросов не отдало закреплённому клиенту ответ с реплики, а
+    закрепление — в database.session_pinned, чтобы его чтения шли мимо
+    кэша (app/cache.py).
+    """
+
+    def __init__(
+        self, app, replicas=replica_set, window: int = DB_READ_YOUR_WRITES_SECONDS
+    ):
+        self.app = app
+        self.replicas = replicas
+        self.window = window
+
+    def _pinned(self, scope) -> bool:
+        until = HTTPConnection(scope).cookies.get(PRIMARY_COOKIE)
+        try:
+            return until is not None and float(until) > time.time()
+        except ValueError:
+            return False
+
+    def _is_read(self, scope) -> bool:
+        if scope["method"] in READ_METHODS:
+            return True
+        return scope["method"] == "POST" and scope["path"].rstrip("/").endswith(
+            READ_POST_SUFFIXES
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self._is_read(scope):
+            pinned = self._pinned(scope)
+            replica = None if pinned else self.replicas.choose()
+            scope["db_read"] = "primary" if replica is None else "replica"
+            token = session_engine.set(replica)
+            pinned_token = session_pinned.set(pinned)
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                session_pinned.reset(pinned_token)
+                session_engine.reset(token)
+
+        async def pin(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and self.window > 0
+            ):
+                cookie = (
+                    f"{PRIMARY_COOKIE}={time.time() + self.window:.3f}; "
+                    f"Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {
+                    **message,
+                    "headers": [*message["headers"], (b"set-cookie", cookie.encode())],
+                }
+            await send(message)
+
+        await self.app(scope, receive, pin)
@@ -1,28 +1,109 @@
 import logging
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import async_get_db
-from ..schemas import AppointmentSchema
+from ..schemas import (
+    AppointmentSchema,
+    AppointmentReadSchema,
+    BatchGetSchema,
+    BatchGetResult,
+    AppointmentPatchSchema,
+    AppointmentBulkSchema,
+    BulkResult,
+    Page,
+)
+from ..pagination import PageParams, get_page_params
+from ..export import ExportFormat, export_response
+from ..fastjson import page_response
+from ..fieldsets import (
+    Projection,
+    appointment_projection,
+    batch_response,
+    item_response,
+)
+from ..conditional import collection_etag, conditional, last_modified, resource_etag
 from ..services import appointmenr_services
 
 router = APIRouter(prefix="/appointemts", tags=["appointemts 📲"])
 logger = logging.getLogger(__name__)
 
 
-@router.get("/", response_model=list[AppointmentSchema])
-async def get_all_appointments(db: AsyncSession = Depends(async_get_db)):
-    return await appointmenr_services.get_all_patient(db)
+@router.get("/", response_model=Page[AppointmentReadSchema])
+async def get_all_appointments(
+    request: Request,
+    response: Response,
+    clinic_id: Optional[int] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(get_page_params),
+    projection: Projection = Depends(appointment_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    result = await appointmenr_services.get_all_patient(
+        db,
+        page,
+        clinic_id=clinic_id,
+        doctor_id=doctor_id,
+        date_from=date_from,
+        date_to=date_to,
+        projection=projection,
+    )
+    included = await projection.load_included(db, result["items"])
+    not_modified = conditional(
+        request,
+        response,
+        collection_etag(
+            result["items"], result["next_cursor"], projection.variant(included)
+        ),
+    )
+    return not_modified or page_response(result, response, projection, included)
+
+
+@router.get("/export")
+async def export_appointments(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    clinic_id: Optional[int] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Выгрузить записи на прием потоком в NDJSON или CSV."""
+    rows = appointmenr_services.export_appointments(
+        db,
+        format,
+        clinic_id=clinic_id,
+        doctor_id=doctor_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return export_response(rows, format, "appointments")
 
 
-@router.get("/{appointment_id}", response_model=AppointmentSchema)
+@router.get("/{appointment_id}", response_model=AppointmentReadSchema)
 async def read_appointment_by_id(
-    appointment_id: int, db: AsyncSession = Depends(async_get_db)
+    appointment_id: int,
+    request: Request,
+    response: Response,
+    projection: Projection = Depends(appointment_projection),
+    db: AsyncSession = Depends(async_get_db),
 ):
     """Получить запись на прием по ID."""
-    return await appointmenr_services.get_appointment_by_id(db, appointment_id)
+    appointment = await appointmenr_services.get_appointment_by_id(db, appointment_id)
+    included = await projection.load_included(db, [appointment])
+    not_modified = conditional(
+        request,
+        response,
+        resource_etag(appointment, projection.variant(included)),
+        last_modified([appointment, *projection.related(included)]),
+    )
+    return not_modified or item_response(appointment, response, projection, included)
 
 
-@router.post("/", response_model=AppointmentSchema)
+@router.post("/", response_model=AppointmentReadSchema)
 async def create_appointment(
     appointment: AppointmentSchema, db: AsyncSession = Depends(async_get_db)
 ):
@@ -30,7 +111,30 @@ async def create_appointment(
     return await appointmenr_services.create_new_appointment(db, appointment)
 
 
-@router.put("/{appointment_id}", response_model=AppointmentSchema)
+@router.post("/bulk", response_model=BulkResult[AppointmentReadSchema])
+async def bulk_upsert_appointments(
+    appointments: list[AppointmentBulkSchema], db: AsyncSession = Depends(async_get_db)
+):
+    """Создать или обновить записи на прием пачкой."""
+    return await appointmenr_services.bulk_upsert_appointments(db, appointments)
+
+
+@router.post("/batch-get", response_model=BatchGetResult[AppointmentReadSchema])
+async def batch_get_appointments(
+    batch: BatchGetSchema,
+    response: Response,
+    projection: Projection = Depends(appointment_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Несколько записей на прием по id одним запросом, в порядке ids."""
+    result = await appointmenr_services.get_appointments_by_ids(
+        db, batch.ids, projection
+    )
+    included = await projection.load_included(db, result["items"])
+    return batch_response(result, response, projection, included)
+
+
+@router.put("/{appointment_id}", response_model=AppointmentReadSchema)
 async def update_appointment(
     appointment_id: int,
     appointment: AppointmentSchema,
@@ -42,6 +146,18 @@ async def update_appointment(
     )
 
 
+@router.patch("/{appointment_id}", response_model=AppointmentReadSchema)
+async def patch_appointment(
+    appointment_id: int,
+    appointment: AppointmentPatchSchema,
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Изменить только переданные поля записи на прием."""
+    return await appointmenr_services.update_existing_appointment(
+        db, appointment_id, appointment, partial=True
+    )
+
+
 @router.delete("/{appointment_id}", response_model=dict)
 async def delete_appointment(
     appointment_id: int, db: AsyncSession = Depends(async_get_db)
@@ -1,43 +1,148 @@
 import logging
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import async_get_db
-from ..schemas import ClinicSchema
+from ..schemas import (
+    ClinicSchema,
+    ClinicReadSchema,
+    BatchGetSchema,
+    BatchGetResult,
+    ClinicPatchSchema,
+    ClinicBulkSchema,
+    SlotSchema,
+    BulkResult,
+    Page,
+)
+from ..pagination import PageParams, get_page_params
+from ..export import ExportFormat, export_response
+from ..availability import DEFAULT_SLOTS_LIMIT, MAX_SLOTS_LIMIT
+from ..fastjson import page_response
+from ..fieldsets import (
+    Projection,
+    clinic_projection,
+    batch_response,
+    item_response,
+)
+from ..conditional import collection_etag, conditional, last_modified, resource_etag
 
 # from ..models import Clinic
-from ..services import clinic_services
+from ..services import clinic_services, schedule_services
 
 router = APIRouter(prefix="/clinics", tags=["clinics 🏥"])
 logger = logging.getLogger(__name__)
 
 
 # вывод всех клиник
-@router.get("/", response_model=list[ClinicSchema])
-async def get_all_clinics(db: AsyncSession = Depends(async_get_db)):
-    return await clinic_services.get_all_clinics_from_db(db)
+@router.get("/", response_model=Page[ClinicReadSchema])
+async def get_all_clinics(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    projection: Projection = Depends(clinic_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    result = await clinic_services.get_all_clinics_from_db(
+        db, page, projection=projection
+    )
+    included = await projection.load_included(db, result["items"])
+    not_modified = conditional(
+        request,
+        response,
+        collection_etag(
+            result["items"], result["next_cursor"], projection.variant(included)
+        ),
+    )
+    return not_modified or page_response(result, response, projection, included)
+
 
+@router.get("/export")
+async def export_clinics(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Выгрузить все клиники потоком в NDJSON или CSV."""
+    rows = clinic_services.export_clinics(db, format)
+    return export_response(rows, format, "clinics")
 
-@router.get("/{clinic_id}", response_model=ClinicSchema)
-async def read_clinic_by_id(clinic_id: int, db: AsyncSession = Depends(async_get_db)):
+
+@router.get("/{clinic_id}", response_model=ClinicReadSchema)
+async def read_clinic_by_id(
+    clinic_id: int,
+    request: Request,
+    response: Response,
+    projection: Projection = Depends(clinic_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
     """Получить клинику по ID."""
-    return await clinic_services.get_clinic_by_id(db, clinic_id)
+    clinic = await clinic_services.get_cached_clinic(db, clinic_id)
+    included = await projection.load_included(db, [clinic])
+    not_modified = conditional(
+        request,
+        response,
+        resource_etag(clinic, projection.variant(included)),
+        last_modified([clinic, *projection.related(included)]),
+    )
+    return not_modified or item_response(clinic, response, projection, included)
 
 
-@router.get("/name/{clinic_name}", response_model=ClinicSchema)
+@router.get("/name/{clinic_name}", response_model=ClinicReadSchema)
 async def read_clinic_by_name(
-    clinic_name: str, db: AsyncSession = Depends(async_get_db)
+    clinic_name: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(async_get_db),
 ):
     """Получить клинику по имени."""
-    return await clinic_services.get_clinic_by_name(db, clinic_name)
+    clinic = await clinic_services.get_clinic_by_name(db, clinic_name)
+    not_modified = conditional(
+        request, response, resource_etag(clinic), clinic.updated_at
+    )
+    return not_modified or clinic
 
 
-@router.post("/", response_model=ClinicSchema)
+@router.get("/{clinic_id}/availability", response_model=list[SlotSchema])
+async def search_clinic_slots(
+    clinic_id: int,
+    date_from: datetime = Query(..., alias="from"),
+    date_to: datetime = Query(..., alias="to"),
+    limit: int = Query(DEFAULT_SLOTS_LIMIT, ge=1, le=MAX_SLOTS_LIMIT),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Ближайшие свободные слоты у всех докторов клиники."""
+    return await schedule_services.find_clinic_slots(
+        db, clinic_id, date_from, date_to, limit
+    )
+
+
+@router.post("/", response_model=ClinicReadSchema)
 async def create_clinic(clinic: ClinicSchema, db: AsyncSession = Depends(async_get_db)):
     """Создать новую клинику."""
     return await clinic_services.create_new_clinic(db, clinic)
 
 
-@router.put("/{clinic_id}", response_model=ClinicSchema)
+@router.post("/bulk", response_model=BulkResult[ClinicReadSchema])
+async def bulk_upsert_clinics(
+    clinics: list[ClinicBulkSchema], db: AsyncSession = Depends(async_get_db)
+):
+    """Создать или обновить клиники пачкой."""
+    return await clinic_services.bulk_upsert_clinics(db, clinics)
+
+
+@router.post("/batch-get", response_model=BatchGetResult[ClinicReadSchema])
+async def batch_get_clinics(
+    batch: BatchGetSchema,
+    response: Response,
+    projection: Projection = Depends(clinic_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Несколько клиник по id одним запросом, в порядке ids."""
+    result = await clinic_services.get_clinics_by_ids(db, batch.ids, projection)
+    included = await projection.load_included(db, result["items"])
+    return batch_response(result, response, projection, included)
+
+
+@router.put("/{clinic_id}", response_model=ClinicReadSchema)
 async def update_clinic(
     clinic_id: int, clinic: ClinicSchema, db: AsyncSession = Depends(async_get_db)
 ):
@@ -45,7 +150,32 @@ async def update_clinic(
     return await clinic_services.update_existing_clinic(db, clinic_id, clinic)
 
 
+@router.patch("/{clinic_id}", response_model=ClinicReadSchema)
+async def patch_clinic(
+    clinic_id: int,
+    clinic: ClinicPatchSchema,
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Изменить только переданные поля клиники."""
+    return await clinic_services.update_existing_clinic(
+        db, clinic_id, clinic, partial=True
+    )
+
+
 @router.delete("/{clinic_id}", response_model=dict)
-async def delete_clinic(clinic_id: int, db: AsyncSession = Depends(async_get_db)):
-    """Удалить клинику."""
+async def delete_clinic(
+    clinic_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Удалить клинику.
+
+    С background=true поддерево удаляется в фоне порциями: ответ 202 с
+    задачей, ход которой виден в GET /purge/{job_id}.
+    """
+    if background:
+        response.status_code = 202
+        return await clinic_services.start_clinic_purge(db, clinic_id, background_tasks)
     return await clinic_services.delete_clinic_by_id(db, clinic_id)
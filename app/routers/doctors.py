@@ -1,45 +1,189 @@
 import logging
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import async_get_db
-from ..schemas import DoctorSchema
-from ..services import doctor_services
+from ..schemas import (
+    DoctorSchema,
+    DoctorReadSchema,
+    BatchGetSchema,
+    BatchGetResult,
+    DoctorPatchSchema,
+    DoctorBulkSchema,
+    DoctorScheduleSchema,
+    SlotSchema,
+    BulkResult,
+    Page,
+)
+from ..pagination import PageParams, get_page_params
+from ..export import ExportFormat, export_response
+from ..fastjson import page_response
+from ..fieldsets import (
+    Projection,
+    doctor_projection,
+    batch_response,
+    item_response,
+)
+from ..conditional import collection_etag, conditional, last_modified, resource_etag
+from ..services import doctor_services, schedule_services
 
 router = APIRouter(prefix="/doctors", tags=["doctors 👨🏻‍🔬"])
 logger = logging.getLogger(__name__)
 
 
 # ручки
-@router.get("/", response_model=list[DoctorSchema])
-async def get_all_doctors(db: AsyncSession = Depends(async_get_db)):
-    return await doctor_services.get_all_doctors(db)
+@router.get("/", response_model=Page[DoctorReadSchema])
+async def get_all_doctors(
+    request: Request,
+    response: Response,
+    clinic_id: Optional[int] = Query(None),
+    page: PageParams = Depends(get_page_params),
+    projection: Projection = Depends(doctor_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    result = await doctor_services.get_all_doctors(
+        db, page, clinic_id=clinic_id, projection=projection
+    )
+    included = await projection.load_included(db, result["items"])
+    not_modified = conditional(
+        request,
+        response,
+        collection_etag(
+            result["items"], result["next_cursor"], projection.variant(included)
+        ),
+    )
+    return not_modified or page_response(result, response, projection, included)
+
+
+@router.get("/export")
+async def export_doctors(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    clinic_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(async_get_db),
+):
+    rows = doctor_services.export_doctors(db, format, clinic_id=clinic_id)
+    return export_response(rows, format, "doctors")
 
 
-@router.get("/{doctor_id}", response_model=DoctorSchema)
-async def read_doctor_by_id(doctor_id: int, db: AsyncSession = Depends(async_get_db)):
-    return await doctor_services.get_doctor_by_id(db, doctor_id)
+@router.get("/{doctor_id}", response_model=DoctorReadSchema)
+async def read_doctor_by_id(
+    doctor_id: int,
+    request: Request,
+    response: Response,
+    projection: Projection = Depends(doctor_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    doctor = await doctor_services.get_cached_doctor(db, doctor_id)
+    included = await projection.load_included(db, [doctor])
+    not_modified = conditional(
+        request,
+        response,
+        resource_etag(doctor, projection.variant(included)),
+        last_modified([doctor, *projection.related(included)]),
+    )
+    return not_modified or item_response(doctor, response, projection, included)
 
 
-@router.get("/name/{doctor_name}", response_model=DoctorSchema)
+@router.get("/name/{doctor_name}", response_model=DoctorReadSchema)
 async def read_doctor_by_name(
-    doctor_name: str, db: AsyncSession = Depends(async_get_db)
+    doctor_name: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(async_get_db),
+):
+    doctor = await doctor_services.get_doctor_by_name(db, doctor_name)
+    not_modified = conditional(
+        request, response, resource_etag(doctor), doctor.updated_at
+    )
+    return not_modified or doctor
+
+
+@router.get("/{doctor_id}/schedule", response_model=DoctorScheduleSchema)
+async def read_doctor_schedule(
+    doctor_id: int, db: AsyncSession = Depends(async_get_db)
+):
+    """Длина приёма и рабочие окна доктора."""
+    return await schedule_services.get_doctor_schedule(db, doctor_id)
+
+
+@router.put("/{doctor_id}/schedule", response_model=DoctorScheduleSchema)
+async def update_doctor_schedule(
+    doctor_id: int,
+    schedule: DoctorScheduleSchema,
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Заменить расписание доктора."""
+    return await schedule_services.set_doctor_schedule(db, doctor_id, schedule)
+
+
+@router.get("/{doctor_id}/availability", response_model=list[SlotSchema])
+async def read_doctor_availability(
+    doctor_id: int,
+    date_from: datetime = Query(..., alias="from"),
+    date_to: datetime = Query(..., alias="to"),
+    db: AsyncSession = Depends(async_get_db),
 ):
-    return await doctor_services.get_doctor_by_name(db, doctor_name)
+    """Свободные слоты доктора в диапазоне [from, to)."""
+    return await schedule_services.get_doctor_availability(
+        db, doctor_id, date_from, date_to
+    )
 
 
-@router.post("/", response_model=DoctorSchema)
+@router.post("/", response_model=DoctorReadSchema)
 async def create_doctor(doctor: DoctorSchema, db: AsyncSession = Depends(async_get_db)):
     return await doctor_services.create_doctor_in_db(db, doctor)
 
 
-@router.put("/{doctor_id}", response_model=DoctorSchema)
+@router.post("/bulk", response_model=BulkResult[DoctorReadSchema])
+async def bulk_upsert_doctors(
+    doctors: list[DoctorBulkSchema], db: AsyncSession = Depends(async_get_db)
+):
+    return await doctor_services.bulk_upsert_doctors(db, doctors)
+
+
+@router.post("/batch-get", response_model=BatchGetResult[DoctorReadSchema])
+async def batch_get_doctors(
+    batch: BatchGetSchema,
+    response: Response,
+    projection: Projection = Depends(doctor_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Несколько докторов по id одним запросом, в порядке ids."""
+    result = await doctor_services.get_doctors_by_ids(db, batch.ids, projection)
+    included = await projection.load_included(db, result["items"])
+    return batch_response(result, response, projection, included)
+
+
+@router.put("/{doctor_id}", response_model=DoctorReadSchema)
 async def update_doctor(
     doctor_id: int, doctor: DoctorSchema, db: AsyncSession = Depends(async_get_db)
 ):
     return await doctor_services.update_doctor_in_db(db, doctor_id, doctor)
 
 
+@router.patch("/{doctor_id}", response_model=DoctorReadSchema)
+async def patch_doctor(
+    doctor_id: int,
+    doctor: DoctorPatchSchema,
+    db: AsyncSession = Depends(async_get_db),
+):
+    return await doctor_services.update_doctor_in_db(
+        db, doctor_id, doctor, partial=True
+    )
+
+
 @router.delete("/{doctor_id}", response_model=dict)
-async def delete_doctor(doctor_id: int, db: AsyncSession = Depends(async_get_db)):
+async def delete_doctor(
+    doctor_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Удалить доктора; с background=true — в фоне, как и клинику."""
+    if background:
+        response.status_code = 202
+        return await doctor_services.start_doctor_purge(db, doctor_id, background_tasks)
     await doctor_services.delete_doctor_from_db(db, doctor_id)
     return {"detail": f"Doctor with id={doctor_id} deleted successfully"}
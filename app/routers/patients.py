@@ -1,10 +1,29 @@
 import logging
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from ..database import async_get_db
-from ..schemas import PatientSchema
-from ..models import Patient
+from ..schemas import (
+    PatientSchema,
+    PatientReadSchema,
+    BatchGetSchema,
+    BatchGetResult,
+    PatientPatchSchema,
+    PatientBulkSchema,
+    BulkResult,
+    Page,
+)
+from ..pagination import PageParams, get_page_params
+from ..export import ExportFormat, export_response
+from ..fastjson import page_response
+from ..fieldsets import (
+    Projection,
+    patient_projection,
+    batch_response,
+    item_response,
+)
+from ..conditional import collection_etag, conditional, last_modified, resource_etag
 from ..services import patient_services
 
 router = APIRouter(prefix="/patients", tags=["patients 🙆‍♂️"])
@@ -12,41 +31,134 @@ logger = logging.getLogger(__name__)
 
 
 # Ручки
-@router.get("/", response_model=list[PatientSchema])
-async def get_all_patients(db: AsyncSession = Depends(async_get_db)):
-    result = await db.execute(select(Patient))
-    patients = result.scalars().all()
-    return patients
+@router.get("/", response_model=Page[PatientReadSchema])
+async def get_all_patients(
+    request: Request,
+    response: Response,
+    clinic_id: Optional[int] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    page: PageParams = Depends(get_page_params),
+    projection: Projection = Depends(patient_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    result = await patient_services.get_all_patient(
+        db,
+        page,
+        clinic_id=clinic_id,
+        doctor_id=doctor_id,
+        date_from=date_from,
+        date_to=date_to,
+        projection=projection,
+    )
+    included = await projection.load_included(db, result["items"])
+    not_modified = conditional(
+        request,
+        response,
+        collection_etag(
+            result["items"], result["next_cursor"], projection.variant(included)
+        ),
+    )
+    return not_modified or page_response(result, response, projection, included)
+
+
+@router.get("/export")
+async def export_patients(
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    clinic_id: Optional[int] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(async_get_db),
+):
+    rows = patient_services.export_patients(
+        db,
+        format,
+        clinic_id=clinic_id,
+        doctor_id=doctor_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return export_response(rows, format, "patients")
 
 
-@router.get("/{patient_id}", response_model=PatientSchema)
+@router.get("/{patient_id}", response_model=PatientReadSchema)
 async def cread_patient_by_id(
-    patient_id: int, db: AsyncSession = Depends(async_get_db)
+    patient_id: int,
+    request: Request,
+    response: Response,
+    projection: Projection = Depends(patient_projection),
+    db: AsyncSession = Depends(async_get_db),
 ):
-    return await patient_services.get_patient_by_id(db, patient_id)
+    patient = await patient_services.get_patient_by_id(db, patient_id)
+    included = await projection.load_included(db, [patient])
+    not_modified = conditional(
+        request,
+        response,
+        resource_etag(patient, projection.variant(included)),
+        last_modified([patient, *projection.related(included)]),
+    )
+    return not_modified or item_response(patient, response, projection, included)
 
 
-@router.get("/name/{patient_name}", response_model=list[PatientSchema])
+@router.get("/name/{patient_name}", response_model=list[PatientReadSchema])
 async def read_patient_by_name(
-    patient_name: str, db: AsyncSession = Depends(async_get_db)
+    patient_name: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(async_get_db),
 ):
-    return await patient_services.get_patient_by_name(db, patient_name)
+    patients = await patient_services.get_patient_by_name(db, patient_name)
+    not_modified = conditional(request, response, collection_etag(patients))
+    return not_modified or patients
 
 
-@router.post("/", response_model=PatientSchema)
+@router.post("/", response_model=PatientReadSchema)
 async def create_patient(
     patient: PatientSchema, db: AsyncSession = Depends(async_get_db)
 ):
     return await patient_services.create_patient_in_db(db, patient)
 
 
-@router.put("/{patient_id}", response_model=PatientSchema)
+@router.post("/bulk", response_model=BulkResult[PatientReadSchema])
+async def bulk_upsert_patients(
+    patients: list[PatientBulkSchema], db: AsyncSession = Depends(async_get_db)
+):
+    return await patient_services.bulk_upsert_patients(db, patients)
+
+
+@router.post("/batch-get", response_model=BatchGetResult[PatientReadSchema])
+async def batch_get_patients(
+    batch: BatchGetSchema,
+    response: Response,
+    projection: Projection = Depends(patient_projection),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Несколько пациентов по id одним запросом, в порядке ids."""
+    result = await patient_services.get_patients_by_ids(db, batch.ids, projection)
+    included = await projection.load_included(db, result["items"])
+    return batch_response(result, response, projection, included)
+
+
+@router.put("/{patient_id}", response_model=PatientReadSchema)
 async def update_patient(
     patient_id: int, patient: PatientSchema, db: AsyncSession = Depends(async_get_db)
 ):
     return await patient_services.update_patient_in_db(db, patient_id, patient)
 
 
+@router.patch("/{patient_id}", response_model=PatientReadSchema)
+async def patch_patient(
+    patient_id: int,
+    patient: PatientPatchSchema,
+    db: AsyncSession = Depends(async_get_db),
+):
+    return await patient_services.update_patient_in_db(
+        db, patient_id, patient, partial=True
+    )
+
+
 @router.delete("/{patient_id}", response_model=dict)
 async def delete_patient(patient_id: int, db: AsyncSession = Depends(async_get_db)):
     await patient_services.delete_patient_from_db(db, patient_id)
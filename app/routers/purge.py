@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import async_get_db
+from ..purge import get_job
+
+router = APIRouter(prefix="/purge", tags=["purge 🧹"])
+
+
+@router.get("/{job_id}", response_model=dict)
+async def read_purge_job(job_id: str, db: AsyncSession = Depends(async_get_db)):
+    """Состояние фонового удаления: статус и число удалённых строк."""
+    job = await get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job.snapshot()
@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import async_get_db
+from ..schemas import SearchHitSchema
+from ..search import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    MIN_QUERY_LENGTH,
+    SearchKind,
+)
+from ..services import search_services
+
+router = APIRouter(prefix="/search", tags=["search 🔎"])
+
+
+@router.get("/", response_model=list[SearchHitSchema])
+async def search(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=100),
+    kinds: Optional[list[SearchKind]] = Query(None, alias="type"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Поиск по имени: префикс, без учёта регистра, с опечатками.
+
+    Результаты отсортированы по рангу; `type` ограничивает выборку.
+    """
+    return await search_services.search_by_name(db, q, kinds or list(SearchKind), limit)
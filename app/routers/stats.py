@@ -0,0 +1,63 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import async_get_db
+from ..schemas import ClinicPatientsSchema, DailyStatsSchema, DoctorLoadSchema
+from ..services import stats_services
+from ..stats import STATS_SOURCE, StatsSource, refresh_daily_stats
+
+router = APIRouter(prefix="/stats", tags=["stats 📊"])
+
+SOURCE_DESCRIPTION = "live — по appointments сейчас, summary — по сводной таблице"
+
+
+@router.get("/appointments-per-day", response_model=list[DailyStatsSchema])
+async def appointments_per_day(
+    date_from: date = Query(...),
+    date_to: date = Query(..., description="Не включая этот день"),
+    doctor_id: Optional[int] = Query(None),
+    clinic_id: Optional[int] = Query(None),
+    source: StatsSource = Query(STATS_SOURCE, description=SOURCE_DESCRIPTION),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Число приёмов и занятые минуты по доктору и дню."""
+    return await stats_services.appointments_per_day(
+        db, source, date_from, date_to, doctor_id=doctor_id, clinic_id=clinic_id
+    )
+
+
+@router.get("/doctor-load", response_model=list[DoctorLoadSchema])
+async def doctor_load(
+    date_from: date = Query(...),
+    date_to: date = Query(..., description="Не включая этот день"),
+    clinic_id: Optional[int] = Query(None),
+    source: StatsSource = Query(STATS_SOURCE, description=SOURCE_DESCRIPTION),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Нагрузка докторов за период с местом и долей внутри клиники."""
+    return await stats_services.doctor_load(
+        db, source, date_from, date_to, clinic_id=clinic_id
+    )
+
+
+@router.get("/patients-per-clinic", response_model=list[ClinicPatientsSchema])
+async def patients_per_clinic(
+    source: StatsSource = Query(STATS_SOURCE, description=SOURCE_DESCRIPTION),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Число пациентов в каждой клинике."""
+    return await stats_services.patients_per_clinic(db, source)
+
+
+@router.post("/refresh", response_model=dict)
+async def refresh_stats(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    db: AsyncSession = Depends(async_get_db),
+):
+    """Пересчитать сводную таблицу за диапазон дней (без границ — целиком)."""
+    rows = await refresh_daily_stats(db, date_from, date_to)
+    if rows is None:
+        raise HTTPException(status_code=409, detail="Refresh is already running")
+    return {"rows": rows}
@@ -1,6 +1,11 @@
-from typing import Optional
-from datetime import datetime
-from pydantic import BaseModel
+from typing import Generic, Optional, TypeVar
+from datetime import date, datetime, time
+from pydantic import BaseModel, Field
+from .availability import DEFAULT_SLOT_MINUTES, MAX_SLOT_MINUTES
+from .search import SearchKind
+
+T = TypeVar("T")
+
 
 class PatientSchema(BaseModel):
     name: str
@@ -11,6 +16,17 @@ class PatientSchema(BaseModel):
         from_attributes = True
 
 
+class VersionedSchema(BaseModel):
+    """Поля версии строки, по ним строятся ETag и Last-Modified."""
+
+    version: int = 1
+    updated_at: Optional[datetime] = None
+
+
+class PatientReadSchema(PatientSchema, VersionedSchema):
+    id: int
+
+
 class DoctorSchema(BaseModel):
     name: str
     clinic_id: Optional[int] = None
@@ -19,6 +35,11 @@ class DoctorSchema(BaseModel):
         from_attributes = True
 
 
+class DoctorReadSchema(DoctorSchema, VersionedSchema):
+    id: int
+    slot_minutes: int = DEFAULT_SLOT_MINUTES
+
+
 class ClinicSchema(BaseModel):
     name: str
     address: str
@@ -27,6 +48,10 @@ class ClinicSchema(BaseModel):
         from_attributes = True
 
 
+class ClinicReadSchema(ClinicSchema, VersionedSchema):
+    id: int
+
+
 class AppointmentSchema(BaseModel):
     doctor_id: int
     patient_id: int
@@ -34,3 +59,143 @@ class AppointmentSchema(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class AppointmentReadSchema(AppointmentSchema, VersionedSchema):
+    id: int
+    ends_at: Optional[datetime] = None
+
+
+class WorkingHoursSchema(BaseModel):
+    weekday: int = Field(ge=0, le=6, description="0 — понедельник")
+    start: time
+    end: time
+
+    class Config:
+        from_attributes = True
+
+
+class DoctorScheduleSchema(BaseModel):
+    """Длина приёма и рабочие окна доктора."""
+
+    slot_minutes: int = Field(DEFAULT_SLOT_MINUTES, ge=5, le=MAX_SLOT_MINUTES)
+    hours: list[WorkingHoursSchema] = []
+
+
+class SlotSchema(BaseModel):
+    doctor_id: int
+    start: datetime
+    end: datetime
+
+
+class SearchHitSchema(BaseModel):
+    type: SearchKind
+    id: int
+    name: str
+    score: float
+
+
+class DailyStatsSchema(BaseModel):
+    """Приёмы доктора за день; cumulative — нарастающий итог в диапазоне."""
+
+    doctor_id: int
+    day: date
+    appointments: int
+    booked_minutes: int
+    cumulative: int
+
+
+class ClinicPatientsSchema(BaseModel):
+    clinic_id: int
+    name: Optional[str] = None
+    patients: int
+    share: float = Field(description="Доля от всех пациентов с клиникой")
+    rank: int
+
+
+class DoctorLoadSchema(BaseModel):
+    doctor_id: int
+    name: Optional[str] = None
+    clinic_id: Optional[int] = None
+    appointments: int
+    booked_minutes: int
+    rank_in_clinic: int
+    share_of_clinic: Optional[float] = Field(
+        None, description="Доля приёмов доктора среди приёмов его клиники"
+    )
+
+
+class Page(BaseModel, Generic[T]):
+    """Страница списка; next_cursor передаётся в `after` для следующей."""
+
+    items: list[T]
+    next_cursor: Optional[int] = None
+
+
+class PatientBulkSchema(PatientSchema):
+    """Элемент пакетной записи: без id создаётся, с id обновляется."""
+
+    id: Optional[int] = None
+
+
+class DoctorBulkSchema(DoctorSchema):
+    id: Optional[int] = None
+
+
+class ClinicBulkSchema(ClinicSchema):
+    id: Optional[int] = None
+
+
+class AppointmentBulkSchema(AppointmentSchema):
+    id: Optional[int] = None
+
+
+# Схемы PATCH: меняются только переданные поля. У полей, которые не могут
+# быть пустыми, тип без Optional — явный null отклоняется с 422.
+
+
+class PatientPatchSchema(BaseModel):
+    name: str = None
+    doctor_id: Optional[int] = None
+    clinic_id: Optional[int] = None
+
+
+class DoctorPatchSchema(BaseModel):
+    name: str = None
+    clinic_id: Optional[int] = None
+
+
+class ClinicPatchSchema(BaseModel):
+    name: str = None
+    address: str = None
+
+
+class AppointmentPatchSchema(BaseModel):
+    doctor_id: int = None
+    patient_id: int = None
+    date: datetime = None
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkResult(BaseModel, Generic[T]):
+    """Сохранённые элементы в порядке запроса и ошибки по индексам."""
+
+    items: list[T]
+    errors: list[BulkItemError] = []
+
+
+class BatchGetSchema(BaseModel):
+    """Запрос нескольких записей по id за один раз."""
+
+    ids: list[int]
+
+
+class BatchGetResult(BaseModel, Generic[T]):
+    """Найденные записи в порядке запроса и id, которых нет."""
+
+    items: list[T]
+    missing: list[int] = []
@@ -0,0 +1,78 @@
+import os
+import re
+from enum import Enum
+from typing import Iterable
+from .database import env_int
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+MIN_QUERY_LENGTH = 2
+# порог похожести как у pg_trgm.similarity_threshold по умолчанию
+SIMILARITY_THRESHOLD = 0.3
+# бонус к рангу за совпадение с начала имени
+PREFIX_BONUS = 1.0
+LIKE_ESCAPE = "/"
+# бюджет времени на запрос поиска, мс (statement_timeout)
+SEARCH_TIMEOUT_MS = env_int("SEARCH_TIMEOUT_MS", 200)
+# trgm — индексы pg_trgm, memory — ранжирование в процессе (для тестов),
+# auto — trgm, если расширение установлено в БД
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+
+class SearchKind(str, Enum):
+    PATIENTS = "patients"
+    DOCTORS = "doctors"
+    CLINICS = "clinics"
+
+
+def trigrams(value: str) -> set[str]:
+    """Триграммы строки по правилам pg_trgm.
+
+    Строка приводится к нижнему регистру и режется на слова из букв и
+    цифр; каждое слово дополняется двумя пробелами слева и одним справа.
+    """
+    result = set()
+    for word in re.findall(r"\w+", value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(left: str, right: str) -> float:
+    """Аналог similarity() из pg_trgm: доля общих триграмм."""
+    a, b = trigrams(left), trigrams(right)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def rank(name: str, query: str) -> float:
+    """Ранг совпадения; 0 — имя не подходит под запрос.
+
+    Та же формула, что и в SQL: похожесть плюс бонус за префикс.
+    """
+    score = similarity(name, query)
+    is_prefix = name.lower().startswith(query.lower())
+    if not is_prefix and score < SIMILARITY_THRESHOLD:
+        return 0.0
+    return score + (PREFIX_BONUS if is_prefix else 0.0)
+
+
+def rank_in_memory(
+    rows: Iterable[tuple[str, int, str]], query: str, limit: int
+) -> list[dict]:
+    """Отранжировать строки (тип, id, имя) и вернуть первые limit."""
+    hits = []
+    for kind, row_id, name in rows:
+        score = rank(name or "", query)
+        if score > 0:
+            hits.append({"type": kind, "id": row_id, "name": name, "score": score})
+    hits.sort(key=lambda hit: (-hit["score"], hit["name"], hit["id"]))
+    return hits[:limit]
+
+
+def escape_like(value: str) -> str:
+    """Экранировать спецсимволы LIKE символом LIKE_ESCAPE."""
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
@@ -1,13 +1,72 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import HTTPException
+from sqlalchemy import Select, case, exists, literal, literal_column
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from ..models import Patient, Doctor, Appointment
-
-
-async def get_all_patient(db: AsyncSession):
-    """Получить список всех Записей к врачу."""
-    result = await db.execute(select(Appointment))
-    return result.scalars().all()
+from ..schemas import AppointmentReadSchema
+from ..pagination import PageParams, apply_date_range, paginate, to_naive
+from ..fastjson import list_select
+from ..fieldsets import Projection
+from ..export import ExportFormat, stream_rows
+from ..bulk import BulkBatch, SkipConflicts, fetch_ids, fetch_map, fetch_in_order
+from ..purge import delete_row
+from ..writes import BOOKED_DETAIL, insert_returning, update_returning
+from .doctor_services import validate_doctor_exists
+
+
+async def get_all_patient(
+    db: AsyncSession,
+    page: PageParams,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    projection: Optional[Projection] = None,
+):
+    """Получить страницу списка записей к врачу."""
+    stmt = list_select(Appointment, AppointmentReadSchema, projection=projection)
+    stmt = filter_appointments(stmt, clinic_id, doctor_id, date_from, date_to)
+    return await paginate(db, stmt, Appointment.id, page)
+
+
+def export_appointments(
+    db: AsyncSession,
+    fmt: ExportFormat,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """Потоковая выгрузка записей к врачу."""
+    stmt = select(
+        Appointment.id, Appointment.doctor_id, Appointment.patient_id, Appointment.date
+    ).order_by(Appointment.id)
+    stmt = filter_appointments(stmt, clinic_id, doctor_id, date_from, date_to)
+    return stream_rows(db, stmt, fmt)
+
+
+def filter_appointments(
+    stmt: Select,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> Select:
+    """Общие фильтры списка записей; клиника определяется через доктора."""
+    if clinic_id is not None:
+        stmt = stmt.where(
+            Appointment.doctor_id.in_(
+                select(Doctor.id).where(Doctor.clinic_id == clinic_id)
+            )
+        )
+    if doctor_id is not None:
+        stmt = stmt.where(Appointment.doctor_id == doctor_id)
+    return apply_date_range(stmt, Appointment.date, date_from, date_to)
 
 
 async def get_appointment_by_id(db: AsyncSession, appointment_id: int):
@@ -18,90 +77,150 @@ async def get_appointment_by_id(db: AsyncSession, appointment_id: int):
     return appointment
 
 
+async def get_appointments_by_ids(
+    db: AsyncSession, ids: list[int], projection: Projection
+) -> dict:
+    """Несколько записей по id одним запросом, в порядке ids."""
+    return await fetch_in_order(db, projection.select(), Appointment.id, ids)
+
+
 async def create_new_appointment(db: AsyncSession, appointment_data):
-    """Создать новую запись на прием."""
-    doctor = await db.get(Doctor, appointment_data.doctor_id)
-    if not doctor:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Doctor with id={appointment_data.doctor_id} not found",
-        )
+    """Создать новую запись на прием: один INSERT ... RETURNING.
+
+    Пересечение приёмов проверяет ограничение EXCLUDE в БД (409), а
+    несуществующего пациента — внешний ключ (404).
+    """
+    doctor = await validate_doctor_exists(db, appointment_data.doctor_id)
+    date = to_naive(appointment_data.date)
+    values = {
+        "doctor_id": appointment_data.doctor_id,
+        "patient_id": appointment_data.patient_id,
+        "date": date,
+        "ends_at": date + timedelta(minutes=doctor.slot_minutes),
+    }
+    db_appointment = await insert_returning(db, Appointment, values)
+    await db.commit()
+    return db_appointment
 
-    patient = await db.get(Patient, appointment_data.patient_id)
-    if not patient:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Patient with id={appointment_data.patient_id} not found",
-        )
 
-    appointment_date_naive = (
-        appointment_data.date.replace(tzinfo=None)
-        if appointment_data.date.tzinfo is not None
-        else appointment_data.date
+def _no_overlap():
+    """Обновлённый приём (excluded) не пересечётся с другими приёмами доктора.
+
+    Колонки excluded записаны текстом: подзапрос внутри ON CONFLICT
+    иначе добавил бы excluded во FROM как обычную таблицу.
+    """
+    other = aliased(Appointment)
+    excluded = {
+        name: literal_column(f"excluded.{name}")
+        for name in ("id", "doctor_id", "date", "ends_at")
+    }
+    return ~exists().where(
+        other.doctor_id == excluded["doctor_id"],
+        other.id != excluded["id"],
+        other.date < excluded["ends_at"],
+        other.ends_at > excluded["date"],
     )
 
-    db_appointment = Appointment(
-        doctor_id=appointment_data.doctor_id,
-        patient_id=appointment_data.patient_id,
-        date=appointment_date_naive,
+
+# пересечения с приёмами в БД пропускаются построчно, а не отменяют пачку
+SKIP_OVERLAPS = SkipConflicts(
+    constraint="appointments_doctor_no_overlap",
+    detail=BOOKED_DETAIL,
+    key=("doctor_id", "date"),
+    guard=_no_overlap(),
+)
+
+
+async def bulk_upsert_appointments(db: AsyncSession, appointments: list):
+    """Создать или обновить записи на прием пачкой.
+
+    Доктора и пациенты проверяются одним запросом на таблицу.
+    Пересечения внутри пачки отклоняются по индексу ещё до записи,
+    пересечения с приёмами в БД — пропуском строки на ON CONFLICT;
+    остальные элементы пачки сохраняются.
+    """
+    batch = BulkBatch(appointments)
+    known = await fetch_ids(db, Appointment.id, (a.id for a in appointments))
+    doctors = await fetch_map(
+        db, Doctor.id, Doctor.slot_minutes, (a.doctor_id for a in appointments)
     )
-    db.add(db_appointment)
-    await db.commit()
-    await db.refresh(db_appointment)
-    return db_appointment
+    patients = await fetch_ids(db, Patient.id, (a.patient_id for a in appointments))
+    # принятые приёмы пачки по докторам: непересекающиеся (начало, конец)
+    booked: dict[int, list[tuple[datetime, datetime]]] = defaultdict(list)
+    for index, appointment in enumerate(appointments):
+        if appointment.id is not None and appointment.id not in known:
+            batch.reject(index, f"Appointment with id={appointment.id} not found")
+            continue
+        if appointment.doctor_id not in doctors:
+            batch.reject(index, f"Doctor with id={appointment.doctor_id} not found")
+            continue
+        if appointment.patient_id not in patients:
+            batch.reject(index, f"Patient with id={appointment.patient_id} not found")
+            continue
+        date = to_naive(appointment.date)
+        ends_at = date + timedelta(minutes=doctors[appointment.doctor_id])
+        intervals = booked[appointment.doctor_id]
+        pos = bisect_left(intervals, (date, ends_at))
+        if (pos > 0 and intervals[pos - 1][1] > date) or (
+            pos < len(intervals) and intervals[pos][0] < ends_at
+        ):
+            batch.reject(index, BOOKED_DETAIL)
+            continue
+        batch.accept(
+            index,
+            {
+                "id": appointment.id,
+                "doctor_id": appointment.doctor_id,
+                "patient_id": appointment.patient_id,
+                "date": date,
+                "ends_at": ends_at,
+            },
+        )
+        # повтор id в пачке отклоняется в accept и времени не занимает
+        if index in batch.rows:
+            intervals.insert(pos, (date, ends_at))
+    return await batch.save(db, Appointment, skip=SKIP_OVERLAPS)
 
 
 async def update_existing_appointment(
-    db: AsyncSession, appointment_id: int, appointment_data
+    db: AsyncSession, appointment_id: int, appointment_data, partial: bool = False
 ):
-    """Обновить существующую запись на прием."""
-    db_appointment = await db.get(Appointment, appointment_id)
-    if not db_appointment:
+    """Обновить запись на прием одним UPDATE ... RETURNING.
+
+    Длительность приёма сохраняется, пока не сменился доктор; она
+    считается в самом UPDATE по старым значениям строки.
+    """
+    values = appointment_data.model_dump(exclude_unset=partial)
+    if not values:
+        return await get_appointment_by_id(db, appointment_id)
+    if "date" in values:
+        values["date"] = to_naive(values["date"])
+    duration = Appointment.ends_at - Appointment.date
+    if "doctor_id" in values:
+        doctor = await validate_doctor_exists(db, values["doctor_id"])
+        duration = case(
+            (Appointment.doctor_id == values["doctor_id"], duration),
+            else_=literal(timedelta(minutes=doctor.slot_minutes)),
+        )
+    if "date" in values or "doctor_id" in values:
+        values["ends_at"] = values.get("date", Appointment.date) + duration
+
+    db_appointment = await update_returning(db, Appointment, appointment_id, values)
+    if db_appointment is None:
         raise HTTPException(
             status_code=404,
             detail=f"Appointment with id={appointment_id} not found",
         )
-
-    if appointment_data.doctor_id != db_appointment.doctor_id:
-        doctor = await db.get(Doctor, appointment_data.doctor_id)
-        if not doctor:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Doctor with id={appointment_data.doctor_id} not found",
-            )
-
-    if appointment_data.patient_id != db_appointment.patient_id:
-        patient = await db.get(Patient, appointment_data.patient_id)
-        if not patient:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Patient with id={appointment_data.patient_id} not found",
-            )
-
-    appointment_date_naive = (
-        appointment_data.date.replace(tzinfo=None)
-        if appointment_data.date.tzinfo is not None
-        else appointment_data.date
-    )
-
-    db_appointment.doctor_id = appointment_data.doctor_id
-    db_appointment.patient_id = appointment_data.patient_id
-    db_appointment.date = appointment_date_naive
-
     await db.commit()
-    await db.refresh(db_appointment)
     return db_appointment
 
 
 async def delete_appointment_by_id(db: AsyncSession, appointment_id: int):
     """Удалить запись на прием."""
-    db_appointment = await db.get(Appointment, appointment_id)
-    if not db_appointment:
+    if not await delete_row(db, Appointment, appointment_id):
         raise HTTPException(
             status_code=404,
             detail=f"Appointment with id={appointment_id} not found",
         )
-
-    await db.delete(db_appointment)
     await db.commit()
     return {"detail": f"Appointment with id={appointment_id} deleted successfully"}
@@ -1,13 +1,33 @@
-from fastapi import HTTPException
+from typing import Optional
+from fastapi import BackgroundTasks, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from ..models import Clinic
-
-
-async def get_all_clinics_from_db(db: AsyncSession):
-    """Получить список всех клиник."""
-    result = await db.execute(select(Clinic))
-    return result.scalars().all()
+from ..models import Clinic, Doctor
+from ..schemas import ClinicReadSchema
+from ..cache import clinic_cache, doctor_cache, mark_stale
+from ..pagination import PageParams, paginate
+from ..fastjson import list_select
+from ..fieldsets import Projection
+from ..export import ExportFormat, stream_rows
+from ..bulk import BulkBatch, fetch_ids, fetch_in_order
+from ..purge import delete_row, register, run_purge
+from ..writes import insert_returning, update_returning
+
+
+async def get_all_clinics_from_db(
+    db: AsyncSession,
+    page: PageParams,
+    projection: Optional[Projection] = None,
+):
+    """Получить страницу списка клиник."""
+    stmt = list_select(Clinic, ClinicReadSchema, projection=projection)
+    return await paginate(db, stmt, Clinic.id, page)
+
+
+def export_clinics(db: AsyncSession, fmt: ExportFormat):
+    """Потоковая выгрузка всех клиник."""
+    stmt = select(Clinic.id, Clinic.name, Clinic.address).order_by(Clinic.id)
+    return stream_rows(db, stmt, fmt)
 
 
 async def get_clinic_by_id(db: AsyncSession, clinic_id: int):
@@ -18,6 +38,31 @@ async def get_clinic_by_id(db: AsyncSession, clinic_id: int):
     return clinic
 
 
+async def get_clinics_by_ids(
+    db: AsyncSession, ids: list[int], projection: Projection
+) -> dict:
+    """Несколько записей по id одним запросом, в порядке ids."""
+    return await fetch_in_order(db, projection.select(), Clinic.id, ids)
+
+
+async def get_cached_clinic(db: AsyncSession, clinic_id: int) -> ClinicReadSchema:
+    """Получить клинику по ID через кэш (404, если её нет)."""
+
+    async def load():
+        return ClinicReadSchema.model_validate(await get_clinic_by_id(db, clinic_id))
+
+    return await clinic_cache.get_or_load(clinic_id, load)
+
+
+async def validate_clinic_exists(db: AsyncSession, clinic_id: int) -> ClinicReadSchema:
+    try:
+        return await get_cached_clinic(db, clinic_id)
+    except HTTPException:
+        raise HTTPException(
+            status_code=404, detail=f"Clinic with id={clinic_id} not found"
+        )
+
+
 async def get_clinic_by_name(db: AsyncSession, clinic_name: str):
     """Получить клинику по имени."""
     result = await db.execute(select(Clinic).filter(Clinic.name == clinic_name))
@@ -28,35 +73,74 @@ async def get_clinic_by_name(db: AsyncSession, clinic_name: str):
 
 
 async def create_new_clinic(db: AsyncSession, clinic_data):
-    """Создать новую клинику."""
-    db_clinic = Clinic(name=clinic_data.name, address=clinic_data.address)
-    db.add(db_clinic)
+    """Создать новую клинику: один INSERT ... RETURNING."""
+    db_clinic = await insert_returning(db, Clinic, clinic_data.model_dump())
     await db.commit()
-    await db.refresh(db_clinic)
     return db_clinic
 
 
-async def update_existing_clinic(db: AsyncSession, clinic_id: int, clinic_data):
-    """Обновить информацию о клинике."""
-    db_clinic = await db.get(Clinic, clinic_id)
-    if not db_clinic:
+async def bulk_upsert_clinics(db: AsyncSession, clinics: list):
+    """Создать или обновить клиники пачкой."""
+    batch = BulkBatch(clinics)
+    known = await fetch_ids(db, Clinic.id, (clinic.id for clinic in clinics))
+    for index, clinic in enumerate(clinics):
+        if clinic.id is not None and clinic.id not in known:
+            batch.reject(index, f"Clinic with id={clinic.id} not found")
+            continue
+        batch.accept(
+            index, {"id": clinic.id, "name": clinic.name, "address": clinic.address}
+        )
+    await mark_stale(
+        db,
+        clinic_cache,
+        *(row["id"] for row in batch.rows.values() if row["id"] is not None),
+    )
+    return await batch.save(db, Clinic)
+
+
+async def update_existing_clinic(
+    db: AsyncSession, clinic_id: int, clinic_data, partial: bool = False
+):
+    """Обновить информацию о клинике: один UPDATE ... RETURNING.
+
+    partial=True (PATCH) меняет только переданные поля.
+    """
+    values = clinic_data.model_dump(exclude_unset=partial)
+    if not values:
+        return await get_clinic_by_id(db, clinic_id)
+    db_clinic = await update_returning(db, Clinic, clinic_id, values)
+    if db_clinic is None:
         raise HTTPException(status_code=404, detail="Clinic not found")
 
-    db_clinic.name = clinic_data.name
-    db_clinic.address = clinic_data.address
-
+    await mark_stale(db, clinic_cache, clinic_id)
     await db.commit()
-    await db.refresh(db_clinic)
     return db_clinic
 
 
 async def delete_clinic_by_id(db: AsyncSession, clinic_id: int):
-    """Удалить клинику."""
-    db_clinic = await db.get(Clinic, clinic_id)
-    if not db_clinic:
+    """Удалить клинику.
+
+    Поддерево (доктора, пациенты, записи) удаляет БД каскадом, в сессию
+    ничего не загружается; отдельно читаются только id докторов для кэша.
+    """
+    doctor_ids = (
+        await db.scalars(select(Doctor.id).where(Doctor.clinic_id == clinic_id))
+    ).all()
+    if not await delete_row(db, Clinic, clinic_id):
         raise HTTPException(status_code=404, detail="Clinic not found")
 
-    await db.delete(db_clinic)
+    await mark_stale(db, clinic_cache, clinic_id)
+    await mark_stale(db, doctor_cache, *doctor_ids)
     await db.commit()
 
     return {"detail": f"Clinic with id={clinic_id} deleted successfully"}
+
+
+async def start_clinic_purge(
+    db: AsyncSession, clinic_id: int, background_tasks: BackgroundTasks
+) -> dict:
+    """Поставить удаление клиники в фон порциями; вернуть состояние задачи."""
+    await get_clinic_by_id(db, clinic_id)
+    job = await register(db, "clinic", clinic_id)
+    background_tasks.add_task(run_purge, job, db.bind)
+    return job.snapshot()
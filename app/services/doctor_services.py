@@ -1,14 +1,41 @@
-from fastapi import HTTPException
+from typing import Optional
+from fastapi import BackgroundTasks, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from ..models import Doctor, Clinic
-from ..schemas import DoctorSchema
+from ..schemas import DoctorSchema, DoctorBulkSchema, DoctorReadSchema
+from ..cache import doctor_cache, mark_stale
+from .clinic_services import validate_clinic_exists
+from ..pagination import PageParams, paginate
+from ..fastjson import list_select
+from ..fieldsets import Projection
+from ..export import ExportFormat, stream_rows
+from ..bulk import BulkBatch, fetch_ids, fetch_in_order
+from ..purge import delete_row, register, run_purge
+from ..writes import insert_returning, update_returning
 
 
-async def get_all_doctors(db: AsyncSession):
-    """Получить список всех докторов."""
-    result = await db.execute(select(Doctor))
-    return result.scalars().all()
+async def get_all_doctors(
+    db: AsyncSession,
+    page: PageParams,
+    clinic_id: Optional[int] = None,
+    projection: Optional[Projection] = None,
+):
+    """Получить страницу списка докторов."""
+    stmt = list_select(Doctor, DoctorReadSchema, projection=projection)
+    if clinic_id is not None:
+        stmt = stmt.where(Doctor.clinic_id == clinic_id)
+    return await paginate(db, stmt, Doctor.id, page)
+
+
+def export_doctors(
+    db: AsyncSession, fmt: ExportFormat, clinic_id: Optional[int] = None
+):
+    """Потоковая выгрузка докторов."""
+    stmt = select(Doctor.id, Doctor.name, Doctor.clinic_id).order_by(Doctor.id)
+    if clinic_id is not None:
+        stmt = stmt.where(Doctor.clinic_id == clinic_id)
+    return stream_rows(db, stmt, fmt)
 
 
 async def get_doctor_by_id(db: AsyncSession, doctor_id: int) -> Doctor:
@@ -18,6 +45,13 @@ async def get_doctor_by_id(db: AsyncSession, doctor_id: int) -> Doctor:
     return doctor
 
 
+async def get_doctors_by_ids(
+    db: AsyncSession, ids: list[int], projection: Projection
+) -> dict:
+    """Несколько записей по id одним запросом, в порядке ids."""
+    return await fetch_in_order(db, projection.select(), Doctor.id, ids)
+
+
 async def get_doctor_by_name(db: AsyncSession, doctor_name: str) -> Doctor:
     result = await db.execute(select(Doctor).filter(Doctor.name == doctor_name))
     doctor = result.scalars().one_or_none()
@@ -26,38 +60,87 @@ async def get_doctor_by_name(db: AsyncSession, doctor_name: str) -> Doctor:
     return doctor
 
 
-async def validate_clinic_exists(db: AsyncSession, clinic_id: int) -> Clinic:
-    clinic = await db.get(Clinic, clinic_id)
-    if not clinic:
+async def get_cached_doctor(db: AsyncSession, doctor_id: int) -> DoctorReadSchema:
+    """Получить доктора по ID через кэш (404, если его нет)."""
+
+    async def load():
+        return DoctorReadSchema.model_validate(await get_doctor_by_id(db, doctor_id))
+
+    return await doctor_cache.get_or_load(doctor_id, load)
+
+
+async def validate_doctor_exists(db: AsyncSession, doctor_id: int) -> DoctorReadSchema:
+    try:
+        return await get_cached_doctor(db, doctor_id)
+    except HTTPException:
         raise HTTPException(
-            status_code=404, detail=f"Clinic with id={clinic_id} not found"
+            status_code=404, detail=f"Doctor with id={doctor_id} not found"
         )
-    return clinic
 
 
 async def create_doctor_in_db(db: AsyncSession, doctor: DoctorSchema) -> Doctor:
     if doctor.clinic_id:
         await validate_clinic_exists(db, doctor.clinic_id)
-    db_doctor = Doctor(name=doctor.name, clinic_id=doctor.clinic_id)
-    db.add(db_doctor)
+    db_doctor = await insert_returning(db, Doctor, doctor.model_dump())
     await db.commit()
-    await db.refresh(db_doctor)
     return db_doctor
 
 
+async def bulk_upsert_doctors(db: AsyncSession, doctors: list[DoctorBulkSchema]):
+    """Создать или обновить докторов пачкой.
+
+    Ссылки на клиники проверяются одним запросом на всю пачку.
+    """
+    batch = BulkBatch(doctors)
+    known = await fetch_ids(db, Doctor.id, (doctor.id for doctor in doctors))
+    clinics = await fetch_ids(db, Clinic.id, (doctor.clinic_id for doctor in doctors))
+    for index, doctor in enumerate(doctors):
+        if doctor.id is not None and doctor.id not in known:
+            batch.reject(index, f"Doctor with id={doctor.id} not found")
+        elif doctor.clinic_id is not None and doctor.clinic_id not in clinics:
+            batch.reject(index, f"Clinic with id={doctor.clinic_id} not found")
+        else:
+            batch.accept(
+                index,
+                {"id": doctor.id, "name": doctor.name, "clinic_id": doctor.clinic_id},
+            )
+    await mark_stale(
+        db,
+        doctor_cache,
+        *(row["id"] for row in batch.rows.values() if row["id"] is not None),
+    )
+    return await batch.save(db, Doctor)
+
+
 async def update_doctor_in_db(
-    db: AsyncSession, doctor_id: int, doctor: DoctorSchema
+    db: AsyncSession, doctor_id: int, doctor, partial: bool = False
 ) -> Doctor:
-    db_doctor = await get_doctor_by_id(db, doctor_id)
-    db_doctor.name = doctor.name
-    db_doctor.clinic_id = doctor.clinic_id
+    """Обновить доктора одним UPDATE ... RETURNING; PATCH — только переданное."""
+    values = doctor.model_dump(exclude_unset=partial)
+    if not values:
+        return await get_doctor_by_id(db, doctor_id)
+    db_doctor = await update_returning(db, Doctor, doctor_id, values)
+    if db_doctor is None:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    await mark_stale(db, doctor_cache, doctor_id)
     await db.commit()
-    await db.refresh(db_doctor)
     return db_doctor
 
 
 async def delete_doctor_from_db(db: AsyncSession, doctor_id: int) -> None:
-    db_doctor = await get_doctor_by_id(db, doctor_id)
-    await db.delete(db_doctor)
+    # пациентов, записи и расписание доктора удаляет БД каскадом
+    if not await delete_row(db, Doctor, doctor_id):
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    await mark_stale(db, doctor_cache, doctor_id)
     await db.commit()
     return {"detail": f"Doctor with id={doctor_id} has been deleted."}
+
+
+async def start_doctor_purge(
+    db: AsyncSession, doctor_id: int, background_tasks: BackgroundTasks
+) -> dict:
+    """Поставить удаление доктора в фон порциями; вернуть состояние задачи."""
+    await get_doctor_by_id(db, doctor_id)
+    job = await register(db, "doctor", doctor_id)
+    background_tasks.add_task(run_purge, job, db.bind)
+    return job.snapshot()
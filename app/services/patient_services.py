@@ -1,14 +1,69 @@
+from datetime import datetime
+from typing import Optional
 from fastapi import HTTPException
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from ..models import Patient, Doctor, Clinic
-from ..schemas import PatientSchema
-
-
-async def get_all_patient(db: AsyncSession):
-    """Получить список всех пациентов."""
-    result = await db.execute(select(Patient))
-    return result.scalars().all()
+from ..schemas import PatientSchema, PatientBulkSchema, PatientReadSchema
+from ..pagination import PageParams, apply_date_range, paginate
+from ..fastjson import list_select
+from ..fieldsets import Projection
+from ..export import ExportFormat, stream_rows
+from ..bulk import BulkBatch, fetch_ids, fetch_map, fetch_in_order
+from ..purge import delete_row
+from ..writes import insert_returning, update_returning
+from .doctor_services import validate_doctor_exists
+
+
+async def get_all_patient(
+    db: AsyncSession,
+    page: PageParams,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    projection: Optional[Projection] = None,
+):
+    """Получить страницу списка пациентов."""
+    stmt = list_select(Patient, PatientReadSchema, projection=projection)
+    stmt = filter_patients(stmt, clinic_id, doctor_id, date_from, date_to)
+    return await paginate(db, stmt, Patient.id, page)
+
+
+def export_patients(
+    db: AsyncSession,
+    fmt: ExportFormat,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """Потоковая выгрузка пациентов."""
+    stmt = select(
+        Patient.id,
+        Patient.name,
+        Patient.doctor_id,
+        Patient.clinic_id,
+        Patient.appointment_time,
+    ).order_by(Patient.id)
+    stmt = filter_patients(stmt, clinic_id, doctor_id, date_from, date_to)
+    return stream_rows(db, stmt, fmt)
+
+
+def filter_patients(
+    stmt: Select,
+    clinic_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> Select:
+    """Общие фильтры списка; диапазон дат применяется к appointment_time."""
+    if clinic_id is not None:
+        stmt = stmt.where(Patient.clinic_id == clinic_id)
+    if doctor_id is not None:
+        stmt = stmt.where(Patient.doctor_id == doctor_id)
+    return apply_date_range(stmt, Patient.appointment_time, date_from, date_to)
 
 
 async def get_patient_by_id(db: AsyncSession, patient_id: int) -> Patient:
@@ -18,6 +73,13 @@ async def get_patient_by_id(db: AsyncSession, patient_id: int) -> Patient:
     return patient
 
 
+async def get_patients_by_ids(
+    db: AsyncSession, ids: list[int], projection: Projection
+) -> dict:
+    """Несколько записей по id одним запросом, в порядке ids."""
+    return await fetch_in_order(db, projection.select(), Patient.id, ids)
+
+
 async def get_patient_by_name(db: AsyncSession, patient_name: str) -> list[Patient]:
     result = await db.execute(select(Patient).filter(Patient.name == patient_name))
     patients = result.scalars().all()
@@ -26,24 +88,6 @@ async def get_patient_by_name(db: AsyncSession, patient_name: str) -> list[Patie
     return patients
 
 
-async def validate_doctor_exists(db: AsyncSession, doctor_id: int) -> Doctor:
-    doctor = await db.get(Doctor, doctor_id)
-    if not doctor:
-        raise HTTPException(
-            status_code=404, detail=f"Doctor with id={doctor_id} not found"
-        )
-    return doctor
-
-
-async def validate_clinic_exists(db: AsyncSession, clinic_id: int) -> Clinic:
-    clinic = await db.get(Clinic, clinic_id)
-    if not clinic:
-        raise HTTPException(
-            status_code=404, detail=f"Clinic with id={clinic_id} not found"
-        )
-    return clinic
-
-
 async def create_patient_in_db(db: AsyncSession, patient: PatientSchema) -> Patient:
     if patient.doctor_id is not None:
         doctor = await validate_doctor_exists(db, patient.doctor_id)
@@ -53,39 +97,84 @@ async def create_patient_in_db(db: AsyncSession, patient: PatientSchema) -> Pati
                 detail=f"Doctor with id={patient.doctor_id} is not associated with clinic id={patient.clinic_id}",
             )
 
-    db_patient = Patient(
-        name=patient.name,
-        doctor_id=patient.doctor_id,
-        clinic_id=patient.clinic_id
+    values = {
+        "name": patient.name,
+        "doctor_id": patient.doctor_id,
+        "clinic_id": patient.clinic_id
         or (doctor.clinic_id if patient.doctor_id else None),
-    )
-    db.add(db_patient)
+    }
+    db_patient = await insert_returning(db, Patient, values)
     await db.commit()
-    await db.refresh(db_patient)
     return db_patient
 
 
-async def update_patient_in_db(
-    db: AsyncSession, patient_id: int, patient: PatientSchema
-) -> Patient:
-    db_patient = await get_patient_by_id(db, patient_id)
-
-    if patient.doctor_id is not None and patient.doctor_id != db_patient.doctor_id:
-        await validate_doctor_exists(db, patient.doctor_id)
+async def bulk_upsert_patients(db: AsyncSession, patients: list[PatientBulkSchema]):
+    """Создать или обновить пациентов пачкой.
 
-    if patient.clinic_id is not None and patient.clinic_id != db_patient.clinic_id:
-        await validate_clinic_exists(db, patient.clinic_id)
+    Правила те же, что у create_patient_in_db, но доктора и клиники
+    проверяются одним запросом на таблицу, а ошибка в одном элементе
+    не отменяет остальные.
+    """
+    batch = BulkBatch(patients)
+    known = await fetch_ids(db, Patient.id, (patient.id for patient in patients))
+    doctors = await fetch_map(
+        db, Doctor.id, Doctor.clinic_id, (patient.doctor_id for patient in patients)
+    )
+    clinics = await fetch_ids(
+        db, Clinic.id, (patient.clinic_id for patient in patients)
+    )
+    for index, patient in enumerate(patients):
+        clinic_id = patient.clinic_id
+        if patient.id is not None and patient.id not in known:
+            batch.reject(index, f"Patient with id={patient.id} not found")
+            continue
+        if patient.doctor_id is not None:
+            if patient.doctor_id not in doctors:
+                batch.reject(index, f"Doctor with id={patient.doctor_id} not found")
+                continue
+            doctor_clinic_id = doctors[patient.doctor_id]
+            if clinic_id is not None and doctor_clinic_id != clinic_id:
+                batch.reject(
+                    index,
+                    f"Doctor with id={patient.doctor_id} is not associated with clinic id={clinic_id}",
+                )
+                continue
+            clinic_id = clinic_id or doctor_clinic_id
+        elif clinic_id is not None and clinic_id not in clinics:
+            batch.reject(index, f"Clinic with id={clinic_id} not found")
+            continue
+        batch.accept(
+            index,
+            {
+                "id": patient.id,
+                "name": patient.name,
+                "doctor_id": patient.doctor_id,
+                "clinic_id": clinic_id,
+            },
+        )
+    return await batch.save(db, Patient)
 
-    db_patient.name = patient.name
-    db_patient.doctor_id = patient.doctor_id
-    db_patient.clinic_id = patient.clinic_id
 
+async def update_patient_in_db(
+    db: AsyncSession, patient_id: int, patient, partial: bool = False
+) -> Patient:
+    """Обновить пациента одним UPDATE ... RETURNING; PATCH — только переданное.
+
+    Ссылки на доктора и клинику отдельно не проверяются: несуществующий
+    id отклоняет внешний ключ, и это превращается в 404.
+    """
+    values = patient.model_dump(exclude_unset=partial)
+    if not values:
+        return await get_patient_by_id(db, patient_id)
+    db_patient = await update_returning(db, Patient, patient_id, values)
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
     await db.commit()
-    await db.refresh(db_patient)
     return db_patient
 
 
 async def delete_patient_from_db(db: AsyncSession, patient_id: int) -> None:
-    db_patient = await get_patient_by_id(db, patient_id)
-    await db.delete(db_patient)
+    # записи пациента удаляет БД каскадом
+    if not await delete_row(db, Patient, patient_id):
+        raise HTTPException(status_code=404, detail="Patient not found")
     await db.commit()
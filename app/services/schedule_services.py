@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from ..models import Appointment, Doctor, WorkingHours
+from ..schemas import DoctorScheduleSchema
+from ..cache import doctor_cache, mark_stale
+from ..pagination import to_naive
+from ..availability import (
+    MAX_AVAILABILITY_DAYS,
+    MAX_SLOT_MINUTES,
+    DoctorSchedule,
+    Interval,
+    WorkingWindow,
+    earliest_slots,
+    free_slots,
+)
+from .clinic_services import validate_clinic_exists
+from .doctor_services import get_doctor_by_id
+
+
+async def load_schedules(db: AsyncSession, condition) -> list[DoctorSchedule]:
+    """Расписания докторов, подходящих под условие, одним запросом."""
+    stmt = (
+        select(
+            Doctor.id,
+            Doctor.slot_minutes,
+            WorkingHours.weekday,
+            WorkingHours.start,
+            WorkingHours.end,
+        )
+        .outerjoin(WorkingHours, WorkingHours.doctor_id == Doctor.id)
+        .where(condition)
+        .order_by(Doctor.id)
+    )
+    result = await db.execute(stmt)
+    schedules = []
+    for doctor_id, rows in groupby(result.all(), key=lambda row: row.id):
+        rows = list(rows)
+        schedules.append(
+            DoctorSchedule(
+                doctor_id=doctor_id,
+                slot=timedelta(minutes=rows[0].slot_minutes),
+                windows=[
+                    WorkingWindow(row.weekday, row.start, row.end)
+                    for row in rows
+                    if row.weekday is not None
+                ],
+            )
+        )
+    return schedules
+
+
+async def get_doctor_schedule(db: AsyncSession, doctor_id: int) -> dict:
+    """Получить длину приёма и рабочие окна доктора."""
+    schedules = await load_schedules(db, Doctor.id == doctor_id)
+    if not schedules:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    schedule = schedules[0]
+    return {
+        "slot_minutes": schedule.slot // timedelta(minutes=1),
+        "hours": sorted(
+            schedule.windows, key=lambda window: (window.weekday, window.start)
+        ),
+    }
+
+
+def validate_hours(schedule: DoctorScheduleSchema) -> None:
+    """Окна должны быть непустыми и не пересекаться в пределах дня."""
+    hours = sorted(schedule.hours, key=lambda window: (window.weekday, window.start))
+    for window in hours:
+        if window.start >= window.end:
+            raise HTTPException(
+                status_code=400, detail="Working hours start must be before end"
+            )
+    for previous, window in zip(hours, hours[1:]):
+        if previous.weekday == window.weekday and window.start < previous.end:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Working hours overlap on weekday {window.weekday}",
+            )
+
+
+async def set_doctor_schedule(
+    db: AsyncSession, doctor_id: int, schedule: DoctorScheduleSchema
+) -> dict:
+    """Заменить расписание доктора целиком."""
+    validate_hours(schedule)
+    doctor = await get_doctor_by_id(db, doctor_id)
+    doctor.slot_minutes = schedule.slot_minutes
+    await db.execute(delete(WorkingHours).where(WorkingHours.doctor_id == doctor_id))
+    if schedule.hours:
+        await db.execute(
+            insert(WorkingHours),
+            [
+                {"doctor_id": doctor_id, **window.model_dump()}
+                for window in schedule.hours
+            ],
+        )
+    await mark_stale(db, doctor_cache, doctor_id)
+    await db.commit()
+    return await get_doctor_schedule(db, doctor_id)
+
+
+def check_range(date_from: datetime, date_to: datetime) -> tuple[datetime, datetime]:
+    date_from, date_to = to_naive(date_from), to_naive(date_to)
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="from must be earlier than to")
+    if date_to - date_from > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must not exceed {MAX_AVAILABILITY_DAYS} days",
+        )
+    return date_from, date_to
+
+
+async def load_busy(
+    db: AsyncSession,
+    schedules: list[DoctorSchedule],
+    date_from: datetime,
+    date_to: datetime,
+) -> dict[int, list[Interval]]:
+    """Интервалы записей докторов в диапазоне: один запрос по (doctor_id, date).
+
+    Нижняя граница по date сдвинута на максимальную длину приёма, чтобы
+    индекс ограничивал диапазон и учитывались записи, начавшиеся раньше.
+    """
+    if not schedules:
+        return {}
+    stmt = (
+        select(Appointment.doctor_id, Appointment.date, Appointment.ends_at)
+        .where(
+            Appointment.doctor_id.in_([schedule.doctor_id for schedule in schedules]),
+            Appointment.date > date_from - timedelta(minutes=MAX_SLOT_MINUTES),
+            Appointment.date < date_to,
+            Appointment.ends_at > date_from,
+        )
+        .order_by(Appointment.doctor_id, Appointment.date)
+    )
+    result = await db.execute(stmt)
+    return {
+        doctor_id: [(row.date, row.ends_at) for row in rows]
+        for doctor_id, rows in groupby(result.all(), key=lambda row: row.doctor_id)
+    }
+
+
+async def get_doctor_availability(
+    db: AsyncSession, doctor_id: int, date_from: datetime, date_to: datetime
+) -> list[dict]:
+    """Свободные слоты доктора в диапазоне [date_from, date_to)."""
+    date_from, date_to = check_range(date_from, date_to)
+    schedules = await load_schedules(db, Doctor.id == doctor_id)
+    if not schedules:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    busy = await load_busy(db, schedules, date_from, date_to)
+    return [
+        {"doctor_id": doctor_id, "start": start, "end": end}
+        for start, end in free_slots(
+            schedules[0], busy.get(doctor_id, ()), date_from, date_to
+        )
+    ]
+
+
+async def find_clinic_slots(
+    db: AsyncSession,
+    clinic_id: int,
+    date_from: datetime,
+    date_to: datetime,
+    limit: int,
+) -> list[dict]:
+    """Ближайшие limit свободных слотов среди всех докторов клиники."""
+    date_from, date_to = check_range(date_from, date_to)
+    await validate_clinic_exists(db, clinic_id)
+    schedules = await load_schedules(db, Doctor.clinic_id == clinic_id)
+    busy = await load_busy(db, schedules, date_from, date_to)
+    return [
+        {"doctor_id": doctor_id, "start": start, "end": end}
+        for doctor_id, start, end in earliest_slots(
+            schedules, busy, date_from, date_to, limit
+        )
+    ]
@@ -0,0 +1,119 @@
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import case, desc, func, literal, or_, text, union_all
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from ..models import Clinic, Doctor, Patient
+from ..search import (
+    LIKE_ESCAPE,
+    PREFIX_BONUS,
+    SEARCH_BACKEND,
+    SEARCH_TIMEOUT_MS,
+    SearchKind,
+    escape_like,
+    rank_in_memory,
+)
+
+MODELS = {
+    SearchKind.PATIENTS: Patient,
+    SearchKind.DOCTORS: Doctor,
+    SearchKind.CLINICS: Clinic,
+}
+
+# SQLSTATE query_canceled: сработал statement_timeout
+QUERY_CANCELED = "57014"
+
+# установлен ли pg_trgm в БД; проверяется один раз на процесс
+_trgm_installed: Optional[bool] = None
+
+
+async def use_trgm(db: AsyncSession) -> bool:
+    """Искать через индексы pg_trgm или ранжировать в памяти."""
+    global _trgm_installed
+    if SEARCH_BACKEND != "auto":
+        return SEARCH_BACKEND == "trgm"
+    if _trgm_installed is None:
+        installed = await db.scalar(
+            text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'")
+        )
+        _trgm_installed = bool(installed)
+    return _trgm_installed
+
+
+def trgm_select(kind: SearchKind, query: str, limit: int):
+    """Подзапрос по одной таблице, использующий GIN-индекс gin_trgm_ops.
+
+    Под индекс попадают и ILIKE по префиксу, и оператор похожести %.
+    """
+    model = MODELS[kind]
+    is_prefix = model.name.ilike(escape_like(query) + "%", escape=LIKE_ESCAPE)
+    score = func.similarity(model.name, query) + case(
+        (is_prefix, PREFIX_BONUS), else_=0.0
+    )
+    return (
+        select(
+            literal(kind.value).label("type"),
+            model.id,
+            model.name,
+            score.label("score"),
+        )
+        .where(or_(is_prefix, model.name.op("%")(query)))
+        .order_by(desc("score"))
+        .limit(limit)
+    )
+
+
+async def search_trgm(
+    db: AsyncSession, query: str, kinds: list[SearchKind], limit: int
+) -> list[dict]:
+    stmt = (
+        union_all(*(trgm_select(kind, query, limit) for kind in kinds))
+        .order_by(desc("score"), "name", "id")
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def search_in_memory(
+    db: AsyncSession, query: str, kinds: list[SearchKind], limit: int
+) -> list[dict]:
+    """Запасной вариант без pg_trgm: все имена читаются и ранжируются здесь.
+
+    Подходит для тестов и небольших БД, но не для миллионов пациентов.
+    """
+    stmt = union_all(
+        *(
+            select(
+                literal(kind.value).label("type"), MODELS[kind].id, MODELS[kind].name
+            )
+            for kind in kinds
+        )
+    )
+    result = await db.execute(stmt)
+    return rank_in_memory(result.tuples().all(), query, limit)
+
+
+async def search_by_name(
+    db: AsyncSession, query: str, kinds: list[SearchKind], limit: int
+) -> list[dict]:
+    """Поиск по имени среди пациентов, докторов и клиник.
+
+    Запрос ограничен statement_timeout на время транзакции; при
+    превышении бюджета возвращается 503, а не подвисший ответ.
+    """
+    query = query.strip()
+    search = search_trgm if await use_trgm(db) else search_in_memory
+    await db.execute(
+        select(func.set_config("statement_timeout", str(SEARCH_TIMEOUT_MS), True))
+    )
+    try:
+        return await search(db, query, kinds, limit)
+    except DBAPIError as e:
+        await db.rollback()
+        if getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+            raise HTTPException(
+                status_code=503, detail="Search exceeded its latency budget"
+            ) from e
+        raise
@@ -0,0 +1,151 @@
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import Float, Integer, cast, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from ..models import AppointmentDailyStats, Clinic, ClinicPatientStats, Doctor
+from ..stats import MAX_STATS_DAYS, StatsSource, live_clinic_patients, live_daily
+
+
+def check_days(date_from: date, date_to: date) -> None:
+    if date_from >= date_to:
+        raise HTTPException(
+            status_code=400, detail="date_from must be earlier than date_to"
+        )
+    if (date_to - date_from).days > MAX_STATS_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Range must not exceed {MAX_STATS_DAYS} days"
+        )
+
+
+def daily_rows(
+    source: StatsSource,
+    date_from: date,
+    date_to: date,
+    doctor_id: Optional[int] = None,
+    clinic_id: Optional[int] = None,
+):
+    """Подзапрос (doctor_id, day, appointments, booked_minutes) из источника.
+
+    Фильтры по доктору и клинике применяются внутри, чтобы запрос шёл
+    по индексу (doctor_id, date) или первичному ключу сводки.
+    """
+    if source is StatsSource.SUMMARY:
+        table = AppointmentDailyStats
+        stmt = select(
+            table.doctor_id, table.day, table.appointments, table.booked_minutes
+        ).where(table.day >= date_from, table.day < date_to)
+    else:
+        stmt = live_daily(date_from, date_to)
+    doctor_column = stmt.selected_columns.doctor_id
+    if doctor_id is not None:
+        stmt = stmt.where(doctor_column == doctor_id)
+    if clinic_id is not None:
+        stmt = stmt.where(
+            doctor_column.in_(select(Doctor.id).where(Doctor.clinic_id == clinic_id))
+        )
+    return stmt.subquery("daily")
+
+
+async def appointments_per_day(
+    db: AsyncSession,
+    source: StatsSource,
+    date_from: date,
+    date_to: date,
+    doctor_id: Optional[int] = None,
+    clinic_id: Optional[int] = None,
+) -> list[dict]:
+    """Приёмы по доктору и дню с нарастающим итогом по доктору."""
+    check_days(date_from, date_to)
+    daily = daily_rows(source, date_from, date_to, doctor_id, clinic_id)
+    cumulative = func.sum(daily.c.appointments).over(
+        partition_by=daily.c.doctor_id, order_by=daily.c.day
+    )
+    stmt = select(
+        daily.c.doctor_id,
+        daily.c.day,
+        daily.c.appointments,
+        daily.c.booked_minutes,
+        cast(cumulative, Integer).label("cumulative"),
+    ).order_by(daily.c.doctor_id, daily.c.day)
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def doctor_load(
+    db: AsyncSession,
+    source: StatsSource,
+    date_from: date,
+    date_to: date,
+    clinic_id: Optional[int] = None,
+) -> list[dict]:
+    """Нагрузка докторов за период: место и доля внутри своей клиники.
+
+    Доктора без приёмов тоже попадают в ответ, с нулями.
+    """
+    check_days(date_from, date_to)
+    daily = daily_rows(source, date_from, date_to, clinic_id=clinic_id)
+    totals = (
+        select(
+            daily.c.doctor_id,
+            func.sum(daily.c.appointments).label("appointments"),
+            func.sum(daily.c.booked_minutes).label("booked_minutes"),
+        )
+        .group_by(daily.c.doctor_id)
+        .subquery("totals")
+    )
+    appointments = cast(func.coalesce(totals.c.appointments, 0), Integer)
+    clinic_total = func.sum(appointments).over(partition_by=Doctor.clinic_id)
+    stmt = (
+        select(
+            Doctor.id.label("doctor_id"),
+            Doctor.name,
+            Doctor.clinic_id,
+            appointments.label("appointments"),
+            cast(func.coalesce(totals.c.booked_minutes, 0), Integer).label(
+                "booked_minutes"
+            ),
+            func.rank()
+            .over(partition_by=Doctor.clinic_id, order_by=appointments.desc())
+            .label("rank_in_clinic"),
+            (cast(appointments, Float) / func.nullif(clinic_total, 0)).label(
+                "share_of_clinic"
+            ),
+        )
+        .outerjoin(totals, totals.c.doctor_id == Doctor.id)
+        .order_by(Doctor.clinic_id, "rank_in_clinic", Doctor.id)
+    )
+    if clinic_id is not None:
+        stmt = stmt.where(Doctor.clinic_id == clinic_id)
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def patients_per_clinic(db: AsyncSession, source: StatsSource) -> list[dict]:
+    """Пациенты по клиникам: доля и место среди всех клиник.
+
+    live — GROUP BY по всей таблице patients, summary — по сводке,
+    в которой строк не больше, чем клиник.
+    """
+    if source is StatsSource.SUMMARY:
+        counts = select(ClinicPatientStats.clinic_id, ClinicPatientStats.patients)
+    else:
+        counts = live_clinic_patients()
+    counts = counts.subquery("counts")
+    patients = func.coalesce(counts.c.patients, 0)
+    stmt = (
+        select(
+            Clinic.id.label("clinic_id"),
+            Clinic.name,
+            cast(patients, Integer).label("patients"),
+            func.coalesce(
+                cast(patients, Float) / func.nullif(func.sum(patients).over(), 0), 0.0
+            ).label("share"),
+            func.rank().over(order_by=patients.desc()).label("rank"),
+        )
+        .outerjoin(counts, counts.c.clinic_id == Clinic.id)
+        .order_by(Clinic.id)
+    )
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings().all()]
@@ -0,0 +1,41 @@
+"""Общие обработчики событий курсора SQLAlchemy для всех engine процесса.
+
+Время каждого запроса к БД меряется здесь один раз и передаётся
+подписчикам: счётчикам метрик (app/metrics.py) и журналу запросов
+(app/querywatch.py). Подписчик — функция
+`sink(statement, seconds, cursor, executemany)`, она вызывается в том же
+потоке сразу после выполнения запроса и должна быть дешёвой.
+"""
+
+import time
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QuerySink = Callable[[str, float, object, bool], None]
+
+_sinks: list[QuerySink] = []
+
+
+def on_query(sink: QuerySink) -> QuerySink:
+    """Подписать функцию на каждый выполненный запрос; годится как декоратор."""
+    if sink not in _sinks:
+        _sinks.append(sink)
+    return sink
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    for sink in _sinks:
+        sink(statement, elapsed, cursor, executemany)
+
+
+def instrument_engines() -> None:
+    """Подписаться на события всех engine процесса (основной, тестовые)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,147 @@
+"""Сводка приёмов по доктору и дню и её пересчёт.
+
+Дневные агрегаты для /stats можно считать на лету из appointments или
+читать из appointment_daily_stats, а число пациентов клиник — из
+patients или clinic_patient_stats. Сводки пересчитываются DELETE +
+INSERT ... SELECT ... GROUP BY в одной транзакции (дневная — за диапазон
+дней, по клиникам — целиком), поэтому читатели видят либо старую, либо
+новую сводку.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Optional
+from sqlalchemy import Date, Integer, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from .database import env_int
+from .models import Appointment, AppointmentDailyStats, ClinicPatientStats, Patient
+
+logger = logging.getLogger(__name__)
+
+# самый длинный диапазон дней в одном запросе /stats
+MAX_STATS_DAYS = 366
+# ключ pg_advisory_xact_lock: пересчёт из нескольких воркеров не идёт параллельно
+STATS_LOCK_KEY = 727_002
+# период фонового пересчёта сводки, с; 0 — только POST /stats/refresh
+STATS_REFRESH_SECONDS = env_int("STATS_REFRESH_SECONDS", 0)
+# фоновый пересчёт охватывает столько дней до и после сегодняшнего
+STATS_REFRESH_DAYS = env_int("STATS_REFRESH_DAYS", 30)
+
+
+class StatsSource(str, Enum):
+    LIVE = "live"  # агрегаты по appointments в момент запроса
+    SUMMARY = "summary"  # appointment_daily_stats, актуальна на момент пересчёта
+
+
+STATS_SOURCE = StatsSource(os.getenv("STATS_SOURCE", StatsSource.LIVE.value))
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time())
+
+
+def live_daily(date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Агрегаты по (доктор, день) из appointments за [date_from, date_to)."""
+    day = cast(Appointment.date, Date)
+    minutes = func.extract("epoch", Appointment.ends_at - Appointment.date) / 60
+    stmt = select(
+        Appointment.doctor_id,
+        day.label("day"),
+        func.count().label("appointments"),
+        cast(func.sum(minutes), Integer).label("booked_minutes"),
+    ).group_by(Appointment.doctor_id, day)
+    if date_from is not None:
+        stmt = stmt.where(Appointment.date >= day_start(date_from))
+    if date_to is not None:
+        stmt = stmt.where(Appointment.date < day_start(date_to))
+    return stmt
+
+
+def live_clinic_patients():
+    """Число пациентов по клиникам из patients."""
+    return (
+        select(Patient.clinic_id, func.count().label("patients"))
+        .where(Patient.clinic_id.is_not(None))
+        .group_by(Patient.clinic_id)
+    )
+
+
+async def refresh_daily_stats(
+    db: AsyncSession, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> Optional[int]:
+    """Пересчитать сводку за [date_from, date_to) (без границ — целиком).
+
+    Сводка по клиникам не делится по дням и пересчитывается целиком.
+    Возвращает число строк дневной сводки или None, если пересчёт уже
+    идёт в другом процессе.
+    """
+    locked = await db.scalar(select(func.pg_try_advisory_xact_lock(STATS_LOCK_KEY)))
+    if not locked:
+        await db.rollback()
+        return None
+    stale = delete(AppointmentDailyStats)
+    if date_from is not None:
+        stale = stale.where(AppointmentDailyStats.day >= date_from)
+    if date_to is not None:
+        stale = stale.where(AppointmentDailyStats.day < date_to)
+    await db.execute(stale)
+    result = await db.execute(
+        insert(AppointmentDailyStats).from_select(
+            ["doctor_id", "day", "appointments", "booked_minutes"],
+            live_daily(date_from, date_to),
+        )
+    )
+    await db.execute(delete(ClinicPatientStats))
+    await db.execute(
+        insert(ClinicPatientStats).from_select(
+            ["clinic_id", "patients"], live_clinic_patients()
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+def refresh_window(today: Optional[date] = None) -> tuple[date, date]:
+    """Диапазон фонового пересчёта вокруг сегодняшнего дня (UTC)."""
+    today = today or datetime.utcnow().date()
+    return (
+        today - timedelta(days=STATS_REFRESH_DAYS),
+        today + timedelta(days=STATS_REFRESH_DAYS + 1),
+    )
+
+
+class DailyStatsRefresher:
+    """Периодический пересчёт сводки за окно вокруг сегодняшнего дня."""
+
+    def __init__(self, db_engine: AsyncEngine, period: int = STATS_REFRESH_SECONDS):
+        self.engine = db_engine
+        self.period = period
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.period <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Пересчёт сводки /stats каждые %s с", self.period)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with AsyncSession(self.engine) as db:
+                    await refresh_daily_stats(db, *refresh_window())
+            except Exception:
+                logger.exception("Пересчёт сводки /stats упал")
+            await asyncio.sleep(self.period)
@@ -0,0 +1,87 @@
+import logging
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE foreign_key_violation: ссылка на несуществующую строку
+FOREIGN_KEY_VIOLATION = "23503"
+# SQLSTATE exclusion_violation: пересечение с другим приёмом доктора
+EXCLUSION_VIOLATION = "23P01"
+BOOKED_DETAIL = "Doctor is already booked at this time"
+# остальные нарушения ограничений: текст ошибки БД клиенту не отдаётся
+CONFLICT_DETAIL = "Conflict"
+
+
+def _entity_name(table) -> str:
+    for mapper in Base.registry.mappers:
+        if mapper.local_table is table:
+            return mapper.class_.__name__
+    return table.name
+
+
+def integrity_error(model, values: dict, e: IntegrityError) -> HTTPException:
+    """Ошибку ограничения БД перевести в ответ API.
+
+    Внешние ключи не проверяются отдельным SELECT перед записью: если
+    ссылка битая, INSERT/UPDATE падает, и по имени ограничения (в PG
+    `<таблица>_<колонка>_fkey`) получается тот же 404, что и раньше.
+    Прочие ошибки пишутся в лог, а клиент получает 409 без подробностей:
+    в тексте PostgreSQL есть имена ограничений и значения колонок.
+    """
+    sqlstate = getattr(e.orig, "sqlstate", None)
+    if sqlstate == EXCLUSION_VIOLATION:
+        return HTTPException(status_code=409, detail=BOOKED_DETAIL)
+    if sqlstate == FOREIGN_KEY_VIOLATION:
+        constraint = getattr(e.orig.__cause__, "constraint_name", None)
+        for column in model.__table__.columns:
+            if constraint != f"{model.__tablename__}_{column.name}_fkey":
+                continue
+            for key in column.foreign_keys:
+                name = _entity_name(key.column.table)
+                if column.name not in values:
+                    return HTTPException(status_code=404, detail=f"{name} not found")
+                return HTTPException(
+                    status_code=404,
+                    detail=f"{name} with id={values[column.name]} not found",
+                )
+    logger.warning("Нарушено ограничение %s: %s", model.__tablename__, e.orig)
+    return HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+
+
+async def _returning(db: AsyncSession, model, values: dict, stmt):
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError as e:
+        await db.rollback()
+        raise integrity_error(model, values, e) from e
+    return result.scalar_one_or_none()
+
+
+async def insert_returning(db: AsyncSession, model, values: dict):
+    """INSERT ... RETURNING: новая строка целиком за один запрос.
+
+    Серверные значения (id, version, updated_at, ...) приходят в том же
+    ответе, поэтому refresh после коммита не нужен.
+    """
+    stmt = insert(model).values(values).returning(model)
+    return await _returning(db, model, values, stmt)
+
+
+async def update_returning(db: AsyncSession, model, row_id: int, values: dict):
+    """UPDATE ... WHERE id = ... RETURNING; None, если строки нет.
+
+    Меняются только переданные колонки (плюс onupdate версии), объект
+    в сессии, если он там есть, перезаписывается значениями из ответа.
+    """
+    stmt = (
+        update(model)
+        .where(model.id == row_id)
+        .values(values)
+        .returning(model)
+        .execution_options(populate_existing=True)
+    )
+    return await _returning(db, model, values, stmt)
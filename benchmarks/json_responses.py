@@ -0,0 +1,95 @@
+"""Бенчмарк ответа списка: путь через schemas.py против быстрого пути.
+
+Запуск (нужна БД со схемой приложения, настройки берутся из .env):
+    python -m benchmarks.json_responses --iterations 500
+
+Страница пациентов собирается двумя способами, вместе с запросом в БД:
+- schemas: ORM-объекты, валидация по Page[PatientReadSchema] и
+  json-представление, как это делает FastAPI для response_model, затем
+  JSONResponse на stdlib json;
+- fast: колонки схемы строками Row и FastJSONResponse на orjson.
+Если пациентов меньше самой большой страницы, недостающие создаются в
+клинике с адресом-меткой этого прогона (RUN_ADDRESS). В конце удаляется
+только она, а пациенты уходят каскадом, поэтому настоящие записи не
+задеваются. Печатается число страниц в секунду.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, func, insert, select
+from app.database import AsyncSessionLocal, engine
+from app.fastjson import list_select, page_response
+from app.models import Clinic, Patient
+from app.pagination import MAX_PAGE_SIZE, PageParams, paginate
+from app.schemas import Page, PatientReadSchema
+from benchmarks.seed import ADDRESS_PREFIX
+
+PAGE_SIZES = (50, MAX_PAGE_SIZE)
+PAGE_ADAPTER = TypeAdapter(Page[PatientReadSchema])
+# уникальная метка клиники этого прогона: по ней и только по ней удаляем
+RUN_ADDRESS = f"{ADDRESS_PREFIX}json {uuid4().hex}"
+
+
+async def schemas_path(db, page: PageParams) -> bytes:
+    result = await paginate(db, select(Patient), Patient.id, page)
+    value = PAGE_ADAPTER.validate_python(result)
+    return JSONResponse(PAGE_ADAPTER.dump_python(value, mode="json")).body
+
+
+async def fast_path(db, page: PageParams) -> bytes:
+    stmt = list_select(Patient, PatientReadSchema)
+    result = await paginate(db, stmt, Patient.id, page)
+    return page_response(result, Response()).body
+
+
+async def rate(build, page: PageParams, iterations: int) -> float:
+    async with AsyncSessionLocal() as db:
+        await build(db, page)  # прогрев
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await build(db, page)
+            # ORM-путь не должен переиспользовать объекты из identity map
+            db.expunge_all()
+        return iterations / (time.perf_counter() - started)
+
+
+async def main(iterations: int) -> None:
+    async with AsyncSessionLocal() as db:
+        missing = max(PAGE_SIZES) - await db.scalar(select(func.count(Patient.id)))
+        if missing > 0:
+            clinic_id = await db.scalar(
+                insert(Clinic)
+                .values(name="Bench", address=RUN_ADDRESS)
+                .returning(Clinic.id)
+            )
+            await db.execute(
+                insert(Patient),
+                [
+                    {"name": f"Bench {i}", "clinic_id": clinic_id}
+                    for i in range(missing)
+                ],
+            )
+            await db.commit()
+    try:
+        print(f"{'page size':<10}{'schemas, op/s':>15}{'fast, op/s':>12}{'gain':>8}")
+        for size in PAGE_SIZES:
+            page = PageParams(limit=size)
+            before = await rate(schemas_path, page, iterations)
+            after = await rate(fast_path, page, iterations)
+            print(f"{size:<10}{before:>15.0f}{after:>12.0f}{after / before:>7.2f}x")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Clinic).where(Clinic.address == RUN_ADDRESS))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    asyncio.run(main(parser.parse_args().iterations))
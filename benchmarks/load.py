@@ -0,0 +1,356 @@
+"""Нагрузочный бенчмарк всех роутеров: пропускная способность и p50/p95/p99.
+
+Запуск (нужна БД со схемой приложения, настройки берутся из .env):
+    python -m benchmarks.load --requests 500 --concurrency 20 --output run.json
+    python -m benchmarks.load --url http://localhost:8000 --output run.json
+    python -m benchmarks.load --baseline main.json --threshold 0.2
+
+Перед прогоном benchmarks.seed создаёт данные заданного объёма, после —
+удаляет их (`--keep` оставляет). Без --url приложение вызывается в том же
+процессе через httpx.ASGITransport, без сети и lifespan; с --url запросы
+идут в запущенный uvicorn, который должен смотреть в ту же БД.
+
+Каждый сценарий — один тип запроса со случайными, но воспроизводимыми
+при том же --seed id. Результат печатается таблицей и пишется в JSON.
+С --baseline сценарии сравниваются с прошлым прогоном: рост p95 или
+падение числа запросов в секунду больше чем на --threshold, а также
+любые ответы с неожиданным статусом считаются регрессией, и процесс
+завершается с кодом 1.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import quote
+import httpx
+from app.database import AsyncSessionLocal, engine
+from benchmarks.seed import Dataset, add_volume_arguments, drop, seed, volumes_from
+
+# ids в одном запросе batch-get
+BATCH_SIZE = 20
+# доля запросов сценария, которые выполняются до замера
+WARMUP_SHARE = 0.1
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    # (rng, данные) -> (путь, тело запроса или None)
+    build: Callable[[random.Random, Dataset], tuple[str, Optional[dict]]]
+    expected: tuple[int, ...] = (200,)
+
+
+def get(path: Callable[[random.Random, Dataset], str]):
+    return lambda rng, data: (path(rng, data), None)
+
+
+def day_range(rng: random.Random, data: Dataset, days: int = 1) -> str:
+    span = max((data.last_day - data.first_day).days, 1)
+    start = data.first_day + timedelta(days=rng.randrange(span))
+    end = start + timedelta(days=days)
+    return f"from={start.isoformat()}&to={end.isoformat()}"
+
+
+def stats_range(data: Dataset) -> str:
+    end = data.last_day.date() + timedelta(days=1)
+    return f"date_from={data.first_day.date()}&date_to={end}"
+
+
+SCENARIOS = [
+    Scenario("clinics.list", "GET", get(lambda rng, data: "/clinics/?limit=50")),
+    Scenario(
+        "clinics.get",
+        "GET",
+        get(lambda rng, data: f"/clinics/{rng.choice(data.clinic_ids)}"),
+    ),
+    Scenario(
+        "clinics.by_name",
+        "GET",
+        get(
+            lambda rng, data: "/clinics/name/"
+            + quote(rng.choice(data.clinic_names), safe="")
+        ),
+    ),
+    Scenario(
+        "clinics.availability",
+        "GET",
+        get(
+            lambda rng, data: f"/clinics/{rng.choice(data.clinic_ids)}/availability?"
+            + day_range(rng, data)
+        ),
+    ),
+    Scenario("doctors.list", "GET", get(lambda rng, data: "/doctors/?limit=50")),
+    Scenario(
+        "doctors.get",
+        "GET",
+        get(lambda rng, data: f"/doctors/{rng.choice(data.doctor_ids)}"),
+    ),
+    Scenario(
+        "doctors.schedule",
+        "GET",
+        get(lambda rng, data: f"/doctors/{rng.choice(data.doctor_ids)}/schedule"),
+    ),
+    Scenario(
+        "doctors.availability",
+        "GET",
+        get(
+            lambda rng, data: f"/doctors/{rng.choice(data.doctor_ids)}/availability?"
+            + day_range(rng, data, days=7)
+        ),
+    ),
+    Scenario("patients.list", "GET", get(lambda rng, data: "/patients/?limit=50")),
+    Scenario(
+        "patients.list_include",
+        "GET",
+        get(lambda rng, data: "/patients/?limit=50&include=doctor,clinic"),
+    ),
+    Scenario(
+        "patients.get",
+        "GET",
+        get(lambda rng, data: f"/patients/{rng.choice(data.patient_ids)}"),
+    ),
+    Scenario(
+        "patients.by_name",
+        "GET",
+        get(
+            lambda rng, data: "/patients/name/"
+            + quote(rng.choice(data.patient_names), safe="")
+        ),
+    ),
+    Scenario(
+        "patients.batch_get",
+        "POST",
+        lambda rng, data: (
+            "/patients/batch-get",
+            {"ids": rng.sample(data.patient_ids, BATCH_SIZE)},
+        ),
+    ),
+    Scenario(
+        "patients.patch",
+        "PATCH",
+        lambda rng, data: (
+            f"/patients/{rng.choice(data.patient_ids)}",
+            {"name": rng.choice(data.patient_names)},
+        ),
+    ),
+    Scenario(
+        "appointments.list", "GET", get(lambda rng, data: "/appointemts/?limit=50")
+    ),
+    Scenario(
+        "appointments.get",
+        "GET",
+        get(lambda rng, data: f"/appointemts/{rng.choice(data.appointment_ids)}"),
+    ),
+    Scenario(
+        "search",
+        "GET",
+        get(
+            lambda rng, data: "/search/?q="
+            + quote(rng.choice(data.patient_names).split()[0][:4])
+        ),
+    ),
+    Scenario(
+        "stats.appointments_per_day",
+        "GET",
+        get(
+            lambda rng, data: "/stats/appointments-per-day?"
+            + f"doctor_id={rng.choice(data.doctor_ids)}&{stats_range(data)}"
+        ),
+    ),
+    Scenario(
+        "stats.doctor_load",
+        "GET",
+        get(
+            lambda rng, data: "/stats/doctor-load?"
+            + f"clinic_id={rng.choice(data.clinic_ids)}&{stats_range(data)}"
+        ),
+    ),
+    Scenario(
+        "stats.patients_per_clinic",
+        "GET",
+        get(lambda rng, data: "/stats/patients-per-clinic"),
+    ),
+    # неизвестная задача: роутер и один поиск по первичному ключу
+    Scenario(
+        "purge.status",
+        "GET",
+        get(lambda rng, data: f"/purge/{rng.getrandbits(64):x}"),
+        expected=(404,),
+    ),
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    data: Dataset,
+    requests: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict:
+    plan = [scenario.build(rng, data) for _ in range(requests)]
+    for path, body in plan[: max(1, int(requests * WARMUP_SHARE))]:
+        await client.request(scenario.method, path, json=body)
+
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(plan)
+
+    async def worker():
+        nonlocal errors
+        for path, body in pending:
+            started = time.perf_counter()
+            response = await client.request(scenario.method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code not in scenario.expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Регрессии относительно прошлого прогона.
+
+    Ошибки (ответы с неожиданным статусом) — регрессия в любом сценарии,
+    даже если их было столько же: быстрые ответы 500 не проходят
+    проверку. Время и пропускная способность сравниваются только для
+    сценариев, которые есть в обоих прогонах.
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if result["errors"]:
+            before_errors = before.get("errors", 0) if before else 0
+            regressions.append(f"{name}: ошибок {before_errors} -> {result['errors']}")
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} мс"
+            )
+        if result["rps"] < before["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {before['rps']:.0f} -> {result['rps']:.0f} запросов/с"
+            )
+    return regressions
+
+
+def make_client(url: Optional[str]) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60)
+    from app.main import app
+
+    return httpx.AsyncClient(
+        base_url="http://bench", transport=httpx.ASGITransport(app=app), timeout=60
+    )
+
+
+def print_table(results: dict) -> None:
+    print(
+        f"{'scenario':<28}{'req/s':>9}{'p50, ms':>10}{'p95, ms':>10}"
+        f"{'p99, ms':>10}{'errors':>8}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<28}{result['rps']:>9.0f}{result['p50_ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            f"{result['errors']:>8}"
+        )
+
+
+async def main(args: argparse.Namespace) -> int:
+    volumes = volumes_from(args)
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.only or scenario.name.startswith(tuple(args.only))
+    ]
+    try:
+        async with AsyncSessionLocal() as db:
+            await drop(db)
+            data = await seed(db, volumes, args.seed)
+        results = {}
+        try:
+            async with make_client(args.url) as client:
+                for scenario in scenarios:
+                    # свой генератор на сценарий: порядок и --only не влияют на пути
+                    rng = random.Random(f"{args.seed}:{scenario.name}")
+                    results[scenario.name] = await run_scenario(
+                        client, scenario, data, args.requests, args.concurrency, rng
+                    )
+        finally:
+            if not args.keep:
+                async with AsyncSessionLocal() as db:
+                    await drop(db)
+    finally:
+        await engine.dispose()
+
+    print_table(results)
+    run = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "target": args.url or "asgi",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "volumes": volumes.__dict__,
+            "python": platform.python_version(),
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(run, file, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline["meta"]["target"] != run["meta"]["target"]:
+            print(f"внимание: прошлый прогон шёл в {baseline['meta']['target']}")
+        regressions = compare(run, baseline, args.threshold)
+        for line in regressions:
+            print(f"регрессия: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="адрес запущенного uvicorn; без него — ASGI")
+    parser.add_argument("--requests", type=int, default=200, help="на сценарий")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="префиксы имён сценариев")
+    parser.add_argument("--output", help="куда записать результаты в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--keep", action="store_true", help="не удалять данные")
+    add_volume_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,90 @@
+"""Микробенчмарк кэша подготовленных выражений asyncpg.
+
+Запуск (нужна БД со схемой приложения, настройки берутся из .env):
+    python -m benchmarks.prepared_statements --iterations 2000
+
+Каждая горячая выборка выполняется подряд на одном соединении дважды:
+с выключенным кэшем (каждый раз parse/plan) и с кэшем размера
+DB_PREPARED_STATEMENT_CACHE_SIZE. Печатается число операций в секунду.
+"""
+
+import argparse
+import asyncio
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import DATABASE_URL, DB_PREPARED_STATEMENT_CACHE_SIZE, connect_args
+from app.models import Clinic, Doctor, Patient
+from app.services import clinic_services, doctor_services, patient_services
+
+CASES = {
+    "get_doctor_by_id": lambda db, s: doctor_services.get_doctor_by_id(db, s.doctor),
+    "get_patient_by_id": lambda db, s: patient_services.get_patient_by_id(
+        db, s.patient
+    ),
+    "get_clinic_by_name": lambda db, s: clinic_services.get_clinic_by_name(
+        db, s.clinic_name
+    ),
+    "get_doctor_by_name": lambda db, s: doctor_services.get_doctor_by_name(
+        db, s.doctor_name
+    ),
+    "get_patient_by_name": lambda db, s: patient_services.get_patient_by_name(
+        db, s.patient_name
+    ),
+}
+
+
+class Sample:
+    """Существующие записи, по которым идут выборки."""
+
+    async def load(self, db: AsyncSession) -> "Sample":
+        clinic = await db.scalar(select(Clinic).limit(1))
+        doctor = await db.scalar(select(Doctor).limit(1))
+        patient = await db.scalar(select(Patient).limit(1))
+        if not (clinic and doctor and patient):
+            raise SystemExit("Нужна хотя бы одна клиника, доктор и пациент")
+        self.clinic_name = clinic.name
+        self.doctor, self.doctor_name = doctor.id, doctor.name
+        self.patient, self.patient_name = patient.id, patient.name
+        return self
+
+
+async def measure(cache_size: int, iterations: int) -> dict[str, float]:
+    engine = create_async_engine(
+        DATABASE_URL, pool_size=1, connect_args=connect_args(cache_size)
+    )
+    session_factory = sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+    results = {}
+    try:
+        async with session_factory() as db:
+            sample = await Sample().load(db)
+            for name, case in CASES.items():
+                await case(db, sample)  # прогрев
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    await case(db, sample)
+                    # иначе db.get отвечает из identity map без запроса
+                    db.expunge_all()
+                results[name] = iterations / (time.perf_counter() - started)
+    finally:
+        await engine.dispose()
+    return results
+
+
+async def main(iterations: int) -> None:
+    cached_size = DB_PREPARED_STATEMENT_CACHE_SIZE or 500
+    uncached = await measure(0, iterations)
+    cached = await measure(cached_size, iterations)
+    print(f"{'endpoint':<22}{'no cache, op/s':>16}{'cache, op/s':>14}{'gain':>8}")
+    for name in CASES:
+        gain = cached[name] / uncached[name]
+        print(f"{name:<22}{uncached[name]:>16.0f}{cached[name]:>14.0f}{gain:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,191 @@
+"""Генератор тестовых данных для бенчмарков на Faker.
+
+Запуск (нужна БД со схемой приложения, настройки берутся из .env):
+    python -m benchmarks.seed --clinics 20 --doctors 10 --patients 50
+
+Объёмы задаются на родителя: докторов на клинику, пациентов на доктора,
+приёмов на пациента. При одном и том же --seed получаются одни и те же
+имена, адреса и расписание. Приёмы доктора идут подряд без пересечений
+по рабочим дням с 9:00, у каждого доктора рабочие окна пн–пт 9:00–18:00.
+Данные удаляются `--drop` одним DELETE клиник: остальное удаляет
+ON DELETE CASCADE.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, time as day_time, timedelta
+from faker import Faker
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.availability import DEFAULT_SLOT_MINUTES
+from app.database import AsyncSessionLocal, engine
+from app.models import Appointment, Clinic, Doctor, Patient, WorkingHours
+
+# приёмы раскладываются по будням начиная с этого понедельника
+FIRST_DAY = datetime(2025, 1, 6)
+DAY_START = day_time(9)
+DAY_END = day_time(18)
+SLOTS_PER_DAY = (DAY_END.hour - DAY_START.hour) * 60 // DEFAULT_SLOT_MINUTES
+# строк в одном INSERT
+CHUNK_SIZE = 5000
+# по этому префиксу адреса находятся клиники бенчмарка
+ADDRESS_PREFIX = "bench: "
+
+
+@dataclass
+class Volumes:
+    clinics: int = 10
+    doctors: int = 10  # на клинику
+    patients: int = 20  # на доктора
+    appointments: int = 2  # на пациента
+
+
+@dataclass
+class Dataset:
+    """id созданных записей: из них бенчмарк выбирает пути запросов."""
+
+    clinic_ids: list[int] = field(default_factory=list)
+    doctor_ids: list[int] = field(default_factory=list)
+    patient_ids: list[int] = field(default_factory=list)
+    appointment_ids: list[int] = field(default_factory=list)
+    clinic_names: list[str] = field(default_factory=list)
+    patient_names: list[str] = field(default_factory=list)
+    first_day: datetime = FIRST_DAY
+    last_day: datetime = FIRST_DAY
+
+
+def slot_start(index: int) -> datetime:
+    """Начало index-го приёма доктора: подряд по будням с DAY_START."""
+    day, slot = divmod(index, SLOTS_PER_DAY)
+    week, weekday = divmod(day, 5)
+    return datetime.combine(
+        FIRST_DAY.date() + timedelta(weeks=week, days=weekday), DAY_START
+    ) + timedelta(minutes=slot * DEFAULT_SLOT_MINUTES)
+
+
+async def insert_ids(db: AsyncSession, model, rows: list[dict]) -> list[int]:
+    ids = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        result = await db.execute(stmt, rows[start : start + CHUNK_SIZE])
+        ids.extend(result.scalars().all())
+    return ids
+
+
+async def seed(db: AsyncSession, volumes: Volumes, seed: int = 42) -> Dataset:
+    """Создать клиники, докторов, пациентов и приёмы и вернуть их id."""
+    fake = Faker("ru_RU")
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    data = Dataset()
+
+    clinics = [
+        {"name": fake.company(), "address": ADDRESS_PREFIX + fake.address()}
+        for _ in range(volumes.clinics)
+    ]
+    data.clinic_ids = await insert_ids(db, Clinic, clinics)
+    data.clinic_names = [row["name"] for row in clinics]
+
+    doctors = [
+        {"name": fake.name(), "clinic_id": clinic_id}
+        for clinic_id in data.clinic_ids
+        for _ in range(volumes.doctors)
+    ]
+    data.doctor_ids = await insert_ids(db, Doctor, doctors)
+    hours = [
+        {"doctor_id": doctor_id, "weekday": weekday, "start": DAY_START, "end": DAY_END}
+        for doctor_id in data.doctor_ids
+        for weekday in range(5)
+    ]
+    for start in range(0, len(hours), CHUNK_SIZE):
+        await db.execute(insert(WorkingHours), hours[start : start + CHUNK_SIZE])
+
+    patients = [
+        {"name": fake.name(), "doctor_id": doctor_id, "clinic_id": doctor["clinic_id"]}
+        for doctor_id, doctor in zip(data.doctor_ids, doctors)
+        for _ in range(volumes.patients)
+    ]
+    data.patient_ids = await insert_ids(db, Patient, patients)
+    data.patient_names = [row["name"] for row in patients]
+
+    # у каждого доктора свои слоты подряд, пациенты в них перемешаны
+    slots_used: dict[int, int] = {}
+    appointments = []
+    for patient_id, row in zip(data.patient_ids, patients):
+        for _ in range(volumes.appointments):
+            index = slots_used.get(row["doctor_id"], 0)
+            slots_used[row["doctor_id"]] = index + 1
+            appointments.append((row["doctor_id"], index, patient_id))
+    rng.shuffle(appointments)
+    rows = []
+    for doctor_id, index, patient_id in appointments:
+        starts = slot_start(index)
+        rows.append(
+            {
+                "doctor_id": doctor_id,
+                "patient_id": patient_id,
+                "date": starts,
+                "ends_at": starts + timedelta(minutes=DEFAULT_SLOT_MINUTES),
+            }
+        )
+    data.appointment_ids = await insert_ids(db, Appointment, rows)
+    data.last_day = max((row["ends_at"] for row in rows), default=FIRST_DAY)
+    await db.commit()
+    return data
+
+
+async def drop(db: AsyncSession) -> int:
+    """Удалить клиники бенчмарка вместе со всем, что к ним относится."""
+    result = await db.execute(
+        delete(Clinic).where(Clinic.address.startswith(ADDRESS_PREFIX))
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def main(volumes: Volumes, seed_value: int, drop_only: bool) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            print(f"удалено клиник: {await drop(db)}")
+            if drop_only:
+                return
+            started = time.perf_counter()
+            data = await seed(db, volumes, seed_value)
+        counts = {
+            name: len(value)
+            for name, value in asdict(data).items()
+            if name.endswith("_ids")
+        }
+        print(f"создано за {time.perf_counter() - started:.1f} с: {counts}")
+    finally:
+        await engine.dispose()
+
+
+def add_volume_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Volumes()
+    parser.add_argument("--clinics", type=int, default=defaults.clinics)
+    parser.add_argument(
+        "--doctors", type=int, default=defaults.doctors, help="на клинику"
+    )
+    parser.add_argument(
+        "--patients", type=int, default=defaults.patients, help="на доктора"
+    )
+    parser.add_argument(
+        "--appointments", type=int, default=defaults.appointments, help="на пациента"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def volumes_from(args: argparse.Namespace) -> Volumes:
+    return Volumes(args.clinics, args.doctors, args.patients, args.appointments)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_volume_arguments(parser)
+    parser.add_argument("--drop", action="store_true", help="только удалить данные")
+    args = parser.parse_args()
+    asyncio.run(main(volumes_from(args), args.seed, args.drop))
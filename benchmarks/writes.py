@@ -0,0 +1,107 @@
+"""Бенчмарк записи: commit + refresh против INSERT/UPDATE ... RETURNING.
+
+Запуск (нужна БД со схемой приложения, настройки берутся из .env):
+    python -m benchmarks.writes --iterations 2000
+
+Для каждой операции сначала выполняется прежний путь (add или get,
+commit, затем refresh отдельным SELECT), потом текущие сервисы, которые
+получают строку из RETURNING. Печатается число записей в секунду.
+Созданные клиники помечены адресом этого прогона (RUN_ADDRESS) и в
+конце удаляются только по нему: имена вида "Bench ..." могут быть и у
+настоящих клиник, а удаление клиники каскадом уносит её докторов,
+пациентов и приёмы.
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, engine
+from app.models import Clinic
+from app.schemas import ClinicPatchSchema, ClinicSchema
+from app.services import clinic_services
+from benchmarks.seed import ADDRESS_PREFIX
+
+# уникальная метка строк этого прогона: по ней и только по ней они удаляются
+RUN_ADDRESS = f"{ADDRESS_PREFIX}writes {uuid4().hex}"
+
+
+async def create_with_refresh(db: AsyncSession, i: int) -> Clinic:
+    clinic = Clinic(name=f"Bench {i}", address=RUN_ADDRESS)
+    db.add(clinic)
+    await db.commit()
+    await db.refresh(clinic)
+    return clinic
+
+
+async def update_with_refresh(db: AsyncSession, clinic_id: int, i: int) -> Clinic:
+    clinic = await db.get(Clinic, clinic_id)
+    clinic.name = f"Bench {i}"
+    clinic.address = RUN_ADDRESS
+    await db.commit()
+    await db.refresh(clinic)
+    return clinic
+
+
+async def create_returning(db: AsyncSession, i: int) -> Clinic:
+    data = ClinicSchema(name=f"Bench {i}", address=RUN_ADDRESS)
+    return await clinic_services.create_new_clinic(db, data)
+
+
+async def update_returning(db: AsyncSession, clinic_id: int, i: int) -> Clinic:
+    data = ClinicSchema(name=f"Bench {i}", address=RUN_ADDRESS)
+    return await clinic_services.update_existing_clinic(db, clinic_id, data)
+
+
+async def patch_returning(db: AsyncSession, clinic_id: int, i: int) -> Clinic:
+    data = ClinicPatchSchema(name=f"Bench {i}")
+    return await clinic_services.update_existing_clinic(
+        db, clinic_id, data, partial=True
+    )
+
+
+async def rate(operation, iterations: int, *args) -> float:
+    async with AsyncSessionLocal() as db:
+        await operation(db, *args, 0)  # прогрев
+        started = time.perf_counter()
+        for i in range(iterations):
+            await operation(db, *args, i)
+            # иначе db.get отвечает из identity map без запроса
+            db.expunge_all()
+        return iterations / (time.perf_counter() - started)
+
+
+async def main(iterations: int) -> None:
+    async with AsyncSessionLocal() as db:
+        target = await create_with_refresh(db, -1)
+    try:
+        results = {
+            "create": (
+                await rate(create_with_refresh, iterations),
+                await rate(create_returning, iterations),
+            ),
+            "update (PUT)": (
+                await rate(update_with_refresh, iterations, target.id),
+                await rate(update_returning, iterations, target.id),
+            ),
+            "update (PATCH)": (
+                await rate(update_with_refresh, iterations, target.id),
+                await rate(patch_returning, iterations, target.id),
+            ),
+        }
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Clinic).where(Clinic.address == RUN_ADDRESS))
+            await db.commit()
+        await engine.dispose()
+    print(f"{'operation':<16}{'refresh, op/s':>15}{'returning, op/s':>17}{'gain':>8}")
+    for name, (before, after) in results.items():
+        print(f"{name:<16}{before:>15.0f}{after:>17.0f}{after / before:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -1,56 +1,138 @@
 from typing import AsyncGenerator
 import asyncio
+import os
+from contextlib import contextmanager
+from uuid import uuid4
 import pytest
 import pytest_asyncio
-import pytest_postgresql
-import pytest_postgresql.janitor
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from pytest_postgresql import factories
+from pytest_postgresql.executor import PostgreSQLExecutor
+from pytest_postgresql.janitor import DatabaseJanitor
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.pool import NullPool
 from httpx import AsyncClient, ASGITransport
 
 from dotenv import load_dotenv
 
 from app.database import Base, async_get_db
+from app import cache
+from app.querywatch import QUERY_WATCH_REPEATS, QueryLog, watch_queries
 from app.main import app 
 
 load_dotenv()
 
+# воркер pytest-xdist (gw0, gw1, ...) или None при обычном запуске
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
 
-# Создаем асинхронный engine с использованием pytest-postgresql
-@pytest.fixture(scope="function")
-def async_engine(postgresql: pytest_postgresql.janitor):
-    engine = create_async_engine(
-        url=str(postgresql.url()), echo=True, poolclass=NullPool
+RESET_SEQUENCES = text(
+    "SELECT setval(oid, 1, false) FROM pg_class WHERE relkind = 'S'"
+)
+
+# тесты с этими фикстурами считают запросы: SAVEPOINT изоляции им мешают
+COMMITTING_FIXTURES = {"sql_statements", "query_budget"}
+
+
+def load_schema(host, port, user, dbname, password):
+    """Схема моделей в шаблонной БД, из которой клонируются тестовые."""
+    engine = create_engine(
+        f"postgresql+psycopg://{user}:{password}@{host}:{port}/{dbname}",
+        poolclass=NullPool,
+    )
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+
+# Сервер PostgreSQL на сессию; схема создаётся один раз в шаблонной БД.
+# Под xdist у каждого воркера свой сервер на свободном порту.
+postgresql_proc = factories.postgresql_proc(
+    port=None if XDIST_WORKER else -1, load=[load_schema]
+)
+
+
+def database_url(proc: PostgreSQLExecutor, dbname: str) -> str:
+    return (
+        f"postgresql+asyncpg://{proc.user}:{proc.password}"
+        f"@{proc.host}:{proc.port}/{dbname}"
     )
-    yield engine
-    asyncio.run(engine.dispose())
 
 
-# Фикстура для создания и удаления таблиц
+@contextmanager
+def cloned_database(proc: PostgreSQLExecutor, dbname: str):
+    """БД-клон шаблона со схемой: CREATE DATABASE ... TEMPLATE, без DDL."""
+    with DatabaseJanitor(
+        user=proc.user,
+        host=proc.host,
+        port=proc.port,
+        version=proc.version,
+        dbname=dbname,
+        template_dbname=proc.template_dbname,
+        password=proc.password,
+    ):
+        yield database_url(proc, dbname)
+
+
+def make_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url=url, echo=True, poolclass=NullPool)
+
+
+# Одна БД на сессию (на воркер xdist) и engine к ней
+@pytest.fixture(scope="session")
+def async_engine(postgresql_proc: PostgreSQLExecutor):
+    dbname = f"{postgresql_proc.dbname}_{XDIST_WORKER or 'main'}"
+    with cloned_database(postgresql_proc, dbname) as url:
+        engine = make_engine(url)
+        yield engine
+        asyncio.run(engine.dispose())
+
+
+# Отдельная БД на тест для тех, кто меняет саму схему (миграции)
+@pytest.fixture
+def isolated_engine(postgresql_proc: PostgreSQLExecutor):
+    dbname = f"{postgresql_proc.dbname}_{uuid4().hex[:12]}"
+    with cloned_database(postgresql_proc, dbname) as url:
+        engine = make_engine(url)
+        yield engine
+        asyncio.run(engine.dispose())
+
+
+def is_committing(request: pytest.FixtureRequest) -> bool:
+    """Тест коммитит по-настоящему, а не внутри откатываемой транзакции."""
+    return request.node.get_closest_marker("committing") is not None or bool(
+        COMMITTING_FIXTURES & set(request.fixturenames)
+    )
+
+
+# id в каждом тесте начинаются с 1; после коммитящего теста таблицы очищаются
 @pytest_asyncio.fixture(
     scope="function", autouse=True
 )  
-async def create_test_database(async_engine):
-    try:
+async def create_test_database(async_engine, request):
+    async with async_engine.begin() as conn:
+        await conn.execute(RESET_SEQUENCES)
+    yield
+    if is_committing(request):
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
         async with async_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        yield
-    finally:
-        async with async_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)
+            await conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
 
 
-# Фикстура для асинхронной сессии
+# Фикстура для асинхронной сессии: по умолчанию весь тест идёт во внешней
+# транзакции, commit сессии — это RELEASE SAVEPOINT, в конце всё откатывается
 @pytest_asyncio.fixture
-async def test_db(async_engine) -> AsyncGenerator[AsyncSession, None]:
-    TestAsyncSessionLocal = sessionmaker(
-        bind=async_engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with TestAsyncSessionLocal() as session:
-        yield session
-        await session.rollback()  # Откат изменений после каждого теста
-
+async def test_db(async_engine, request) -> AsyncGenerator[AsyncSession, None]:
+    if is_committing(request):
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+            await session.rollback()
+        return
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        async with AsyncSession(
+            bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+        ) as session:
+            yield session
+        await transaction.rollback()  # Откат изменений после каждого теста
 
 
 @pytest_asyncio.fixture
@@ -62,3 +144,37 @@ async def async_client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, Non
         app.dependency_overrides[async_get_db] = lambda: test_db
         yield client
         app.dependency_overrides.clear()
+
+
+# Журнал SQL-запросов теста (app/querywatch.py): count, statements, clear()
+@pytest.fixture
+def sql_statements() -> QueryLog:
+    with watch_queries() as log:
+        yield log
+
+
+# Бюджет запросов к БД внутри блока:
+#     with query_budget(2):
+#         await async_client.get("/patients/")
+# Падает, если запросов больше max_queries или есть повторы формы (N+1)
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(max_queries: int, repeats: int = QUERY_WATCH_REPEATS):
+        with watch_queries() as log:
+            yield log
+        assert log.count <= max_queries, (
+            f"{log.count} queries, budget {max_queries}: {log.statements}"
+        )
+        repeated = log.repeated(repeats)
+        assert not repeated, f"N+1: {repeated}"
+
+    return budget
+
+
+# Кэш общий для процесса, а id в тестовой БД повторяются от теста к тесту
+@pytest.fixture(autouse=True)
+def clear_caches():
+    cache.clear_all()
+    yield
+    cache.clear_all()
@@ -0,0 +1,149 @@
+from datetime import datetime, time, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.availability import (
+    DoctorSchedule,
+    WorkingWindow,
+    free_slots,
+    merge_intervals,
+)
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.querywatch import QueryLog
+
+# 2025-01-06 — понедельник
+MONDAY = datetime(2025, 1, 6)
+
+
+def test_merge_intervals():
+    t = [MONDAY + timedelta(hours=h) for h in range(6)]
+    assert merge_intervals([(t[0], t[2]), (t[1], t[3]), (t[3], t[4])]) == [(t[0], t[4])]
+    assert merge_intervals([(t[0], t[1]), (t[2], t[3])]) == [
+        (t[0], t[1]),
+        (t[2], t[3]),
+    ]
+
+
+def test_free_slots_skip_busy_and_partial_overlap():
+    schedule = DoctorSchedule(
+        doctor_id=1,
+        slot=timedelta(minutes=30),
+        windows=[WorkingWindow(0, time(9), time(11))],
+    )
+    busy = [
+        (MONDAY.replace(hour=9), MONDAY.replace(hour=9, minute=30)),
+        (MONDAY.replace(hour=10, minute=15), MONDAY.replace(hour=10, minute=45)),
+    ]
+    slots = list(free_slots(schedule, busy, MONDAY, MONDAY + timedelta(days=7)))
+    assert [start.strftime("%H:%M") for start, _ in slots] == ["09:30"]
+    # следующий понедельник в полуинтервал [from, to) не входит
+    assert all(start.date() == MONDAY.date() for start, _ in slots)
+
+
+async def create_clinic_with_doctors(db: AsyncSession, count: int = 2):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctors = [Doctor(name=f"Doctor {i}", clinic_id=clinic.id) for i in range(count)]
+    db.add_all(doctors)
+    await db.commit()
+    return clinic, doctors
+
+
+@pytest.mark.asyncio
+async def test_doctor_availability(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    _, (doctor, _) = await create_clinic_with_doctors(test_db)
+    response = await async_client.put(
+        f"/doctors/{doctor.id}/schedule",
+        json={
+            "slot_minutes": 60,
+            "hours": [{"weekday": 0, "start": "09:00", "end": "12:00"}],
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["hours"][0]["end"] == "12:00:00"
+
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    test_db.add(patient)
+    await test_db.flush()
+    test_db.add(
+        Appointment(
+            doctor_id=doctor.id, patient_id=patient.id, date=MONDAY.replace(hour=10)
+        )
+    )
+    await test_db.commit()
+    test_db.expunge_all()
+
+    sql_statements.clear()
+    response = await async_client.get(
+        f"/doctors/{doctor.id}/availability",
+        params={
+            "from": MONDAY.isoformat(),
+            "to": (MONDAY + timedelta(days=1)).isoformat(),
+        },
+    )
+    assert response.status_code == 200
+    assert [slot["start"] for slot in response.json()] == [
+        "2025-01-06T09:00:00",
+        "2025-01-06T11:00:00",
+    ]
+    # расписание и записи — по одному запросу
+    assert sql_statements.count == 2
+
+
+@pytest.mark.asyncio
+async def test_clinic_earliest_slots(async_client: AsyncClient, test_db: AsyncSession):
+    clinic, doctors = await create_clinic_with_doctors(test_db)
+    for doctor, start in zip(doctors, ("10:00", "09:00")):
+        await async_client.put(
+            f"/doctors/{doctor.id}/schedule",
+            json={
+                "slot_minutes": 30,
+                "hours": [{"weekday": 0, "start": start, "end": "12:00"}],
+            },
+        )
+
+    response = await async_client.get(
+        f"/clinics/{clinic.id}/availability",
+        params={
+            "from": MONDAY.isoformat(),
+            "to": (MONDAY + timedelta(days=7)).isoformat(),
+            "limit": 4,
+        },
+    )
+    assert response.status_code == 200
+    assert [(slot["doctor_id"], slot["start"][11:16]) for slot in response.json()] == [
+        (doctors[1].id, "09:00"),
+        (doctors[1].id, "09:30"),
+        (doctors[0].id, "10:00"),
+        (doctors[1].id, "10:00"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_schedule_validation(async_client: AsyncClient, test_db: AsyncSession):
+    _, (doctor, _) = await create_clinic_with_doctors(test_db)
+    response = await async_client.put(
+        f"/doctors/{doctor.id}/schedule",
+        json={
+            "hours": [
+                {"weekday": 1, "start": "09:00", "end": "12:00"},
+                {"weekday": 1, "start": "11:00", "end": "13:00"},
+            ]
+        },
+    )
+    assert response.status_code == 400
+
+    response = await async_client.get(
+        f"/doctors/{doctor.id}/availability",
+        params={"from": "2025-01-01T00:00:00", "to": "2025-03-01T00:00:00"},
+    )
+    assert response.status_code == 400
+
+    response = await async_client.get(
+        "/doctors/999/availability",
+        params={"from": "2025-01-01T00:00:00", "to": "2025-01-02T00:00:00"},
+    )
+    assert response.status_code == 404
@@ -0,0 +1,60 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bulk import MAX_BATCH_GET_SIZE
+from app.querywatch import QueryLog
+from .test_query_counts import create_test_graph
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("resource", ["clinics", "doctors", "patients", "appointemts"])
+async def test_batch_get_keeps_requested_order(
+    async_client: AsyncClient,
+    test_db: AsyncSession,
+    sql_statements: QueryLog,
+    resource: str,
+):
+    await create_test_graph(test_db, size=2)
+    sql_statements.clear()
+
+    response = await async_client.post(
+        f"/{resource}/batch-get", json={"ids": [2, 99, 1, 2]}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    expected = [2, 1] if resource != "clinics" else [1]
+    assert [item["id"] for item in body["items"]] == expected
+    assert body["missing"] == ([99] if resource != "clinics" else [2, 99])
+    assert sql_statements.count == 1, sql_statements.statements
+
+
+@pytest.mark.asyncio
+async def test_batch_get_with_fields_and_include(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    await create_test_graph(test_db, size=2)
+    sql_statements.clear()
+    response = await async_client.post(
+        "/patients/batch-get",
+        params={"fields": "name", "include": "doctor"},
+        json={"ids": [3, 1]},
+    )
+    items = response.json()["items"]
+    assert [(item["id"], item["name"]) for item in items] == [
+        (3, "Patient 1-0"),
+        (1, "Patient 0-0"),
+    ]
+    assert set(items[0]) == {"id", "name", "doctor"}
+    assert [item["doctor"]["name"] for item in items] == ["Doctor 1", "Doctor 0"]
+    # IN по пациентам + IN по их докторам
+    assert sql_statements.count == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_get_size_is_capped(async_client: AsyncClient):
+    ids = list(range(MAX_BATCH_GET_SIZE + 1))
+    response = await async_client.post("/doctors/batch-get", json={"ids": ids})
+    assert response.status_code == 413
+    response = await async_client.post("/doctors/batch-get", json={"ids": []})
+    assert response.json() == {"items": [], "missing": []}
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.database import async_get_db
+from app.main import app
+from app.models import Appointment, Clinic, Doctor, Patient
+
+BOOKINGS = 200
+
+
+async def create_doctor_and_patient(db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctor = Doctor(name="Doctor", clinic_id=clinic.id)
+    db.add(doctor)
+    await db.flush()
+    patient = Patient(name="Patient", doctor_id=doctor.id, clinic_id=clinic.id)
+    db.add(patient)
+    await db.commit()
+    return doctor, patient
+
+
+@pytest.mark.asyncio
+async def test_overlapping_booking_conflicts(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    doctor, patient = await create_doctor_and_patient(test_db)
+    booking = {
+        "doctor_id": doctor.id,
+        "patient_id": patient.id,
+        "date": "2025-01-01T10:00:00",
+    }
+    response = await async_client.post("/appointemts/", json=booking)
+    assert response.status_code == 200
+    assert response.json()["ends_at"] == "2025-01-01T10:30:00"
+
+    response = await async_client.post(
+        "/appointemts/", json=dict(booking, date="2025-01-01T10:15:00")
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Doctor is already booked at this time"
+
+    # приём сразу после предыдущего не пересекается с ним
+    response = await async_client.post(
+        "/appointemts/", json=dict(booking, date="2025-01-01T10:30:00")
+    )
+    assert response.status_code == 200
+
+    response = await async_client.put(
+        f"/appointemts/{response.json()['id']}",
+        json=dict(booking, date="2025-01-01T10:20:00"),
+    )
+    assert response.status_code == 409
+
+
+# доктор и пациент должны быть видны соединениям других сессий
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_parallel_bookings_exactly_one_wins(
+    async_client: AsyncClient, test_db: AsyncSession, async_engine
+):
+    """Сотни одновременных записей на пересекающееся время: проходит одна."""
+    doctor, patient = await create_doctor_and_patient(test_db)
+
+    # у каждого запроса своя сессия и соединение, как в рабочем приложении
+    engine = create_async_engine(async_engine.url, pool_size=20, max_overflow=0)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[async_get_db] = get_db
+    start = datetime(2025, 1, 1, 10)
+    try:
+        responses = await asyncio.gather(
+            *(
+                async_client.post(
+                    "/appointemts/",
+                    json={
+                        "doctor_id": doctor.id,
+                        "patient_id": patient.id,
+                        # все начала в пределах одного 30-минутного приёма
+                        "date": (start + timedelta(minutes=i % 30)).isoformat(),
+                    },
+                )
+                for i in range(BOOKINGS)
+            )
+        )
+    finally:
+        await engine.dispose()
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == 1
+    assert statuses.count(409) == BOOKINGS - 1
+    count = await test_db.scalar(select(func.count()).select_from(Appointment))
+    assert count == 1
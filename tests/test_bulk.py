@@ -0,0 +1,128 @@
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import bulk
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.querywatch import QueryLog
+
+
+async def create_test_doctor(db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctor = Doctor(name="Doctor", clinic_id=clinic.id)
+    db.add(doctor)
+    await db.commit()
+    return clinic, doctor
+
+
+@pytest.mark.asyncio
+async def test_bulk_patients_with_item_errors(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    clinic, doctor = await create_test_doctor(test_db)
+    payload = [
+        {"name": "Patient 1", "doctor_id": doctor.id},
+        {"name": "Patient 2", "doctor_id": 999},
+        {"name": "Patient 3", "doctor_id": doctor.id, "clinic_id": clinic.id + 1},
+        {"name": "Patient 4", "doctor_id": None, "clinic_id": clinic.id},
+    ]
+    sql_statements.clear()
+
+    response = await async_client.post("/patients/bulk", json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["name"] for item in data["items"]] == ["Patient 1", "Patient 4"]
+    assert data["items"][0]["clinic_id"] == clinic.id
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    # id пациентов нет, их проверка пропускается: доктора, клиники и один INSERT
+    assert sql_statements.count == 3, sql_statements.statements
+    count = await test_db.scalar(select(func.count()).select_from(Patient))
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_appointments_upsert(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    _, doctor = await create_test_doctor(test_db)
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    test_db.add(patient)
+    await test_db.commit()
+    item = {
+        "doctor_id": doctor.id,
+        "patient_id": patient.id,
+        "date": "2025-01-01T10:00:00+03:00",
+    }
+
+    items = [dict(item, date=f"2025-01-0{day}T10:00:00+03:00") for day in (1, 2, 3)]
+    response = await async_client.post("/appointemts/bulk", json=items)
+    created = response.json()["items"]
+    assert len(created) == 3
+    assert created[0]["ends_at"] == "2025-01-01T10:30:00"
+
+    # пересечения отклоняются поштучно: с приёмом в БД (0), внутри пачки (2)
+    # и при переносе существующего приёма на чужое время (3)
+    items = [
+        item,
+        dict(item, date="2025-01-04T10:00:00+03:00"),
+        dict(item, date="2025-01-04T10:15:00+03:00"),
+        dict(item, id=created[1]["id"], date="2025-01-03T10:10:00+03:00"),
+    ]
+    response = await async_client.post("/appointemts/bulk", json=items)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [a["date"] for a in data["items"]] == ["2025-01-04T10:00:00"]
+    assert data["errors"] == [
+        {"index": i, "detail": "Doctor is already booked at this time"}
+        for i in (0, 2, 3)
+    ]
+
+    update = dict(item, id=created[0]["id"], date="2025-02-01T10:00:00")
+    response = await async_client.post(
+        "/appointemts/bulk", json=[update, dict(item, id=12345)]
+    )
+    data = response.json()
+    assert data["items"][0]["date"] == "2025-02-01T10:00:00"
+    assert data["errors"][0]["index"] == 1
+    test_db.expunge_all()
+    appointment = await test_db.get(Appointment, created[0]["id"])
+    assert appointment.date.month == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_duplicate_ids(async_client: AsyncClient, test_db: AsyncSession):
+    clinic, _ = await create_test_doctor(test_db)
+    payload = [
+        {"id": clinic.id, "name": "A", "address": "A"},
+        {"id": clinic.id, "name": "B", "address": "B"},
+    ]
+    response = await async_client.post("/clinics/bulk", json=payload)
+    data = response.json()
+    assert [item["name"] for item in data["items"]] == ["A"]
+    assert data["errors"] == [
+        {"index": 1, "detail": f"Duplicate id={clinic.id} in batch"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_size_limit(async_client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(bulk, "MAX_BULK_SIZE", 2)
+    payload = [{"name": "Clinic", "address": "Address"}] * 3
+    response = await async_client.post("/clinics/bulk", json=payload)
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_bulk_constraint_error_reported_like_single_writes(
+    test_db: AsyncSession,
+):
+    # ссылка пропала между проверкой пачки и записью
+    batch = bulk.BulkBatch([{}])
+    batch.accept(0, {"name": "Patient", "doctor_id": 999, "clinic_id": None})
+    with pytest.raises(HTTPException) as info:
+        await batch.save(test_db, Patient)
+    assert (info.value.status_code, info.value.detail) == (404, "Doctor not found")
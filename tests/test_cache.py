@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import cache
+from app.cache import AsyncCache
+from app.models import Clinic
+from app.querywatch import QueryLog
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_lru():
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    test_cache = AsyncCache("test", maxsize=2, ttl=60)
+    results = await asyncio.gather(
+        *(test_cache.get_or_load(1, loader) for _ in range(10))
+    )
+    assert results == [1] * 10
+    assert calls == 1
+
+    await test_cache.get_or_load(2, loader)
+    await test_cache.get_or_load(1, loader)  # 1 становится свежее 2
+    await test_cache.get_or_load(3, loader)  # вытесняет 2
+    assert calls == 3
+    await test_cache.get_or_load(1, loader)
+    assert calls == 3
+    await test_cache.get_or_load(2, loader)
+    assert calls == 4
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_errors_not_cached():
+    test_cache = AsyncCache("test", ttl=0)
+
+    async def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await test_cache.get_or_load(1, failing)
+
+    async def loader():
+        return "value"
+
+    assert await test_cache.get_or_load(1, loader) == "value"
+    # ttl=0: запись сразу устаревает
+    assert test_cache.misses == 2
+    await test_cache.get_or_load(1, loader)
+    assert test_cache.misses == 3
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_is_not_stored():
+    test_cache = AsyncCache("test")
+
+    async def loader():
+        test_cache.invalidate(1)
+        return "stale"
+
+    assert await test_cache.get_or_load(1, loader) == "stale"
+
+    async def fresh():
+        return "fresh"
+
+    assert await test_cache.get_or_load(1, fresh) == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_read_through_and_invalidation_on_update(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    clinic = Clinic(name="Clinic", address="Address")
+    test_db.add(clinic)
+    await test_db.commit()
+    test_db.expunge_all()
+
+    sql_statements.clear()
+    for _ in range(3):
+        response = await async_client.get(f"/clinics/{clinic.id}")
+        assert response.json()["name"] == "Clinic"
+    assert sql_statements.count == 1
+
+    await async_client.put(
+        f"/clinics/{clinic.id}", json={"name": "Renamed", "address": "Address"}
+    )
+    assert clinic.id not in cache.clinic_cache._data
+    response = await async_client.get(f"/clinics/{clinic.id}")
+    assert response.json()["name"] == "Renamed"
+
+
+def test_notify_payload_invalidates():
+    cache.doctor_cache._store(5, "doctor")
+    cache._on_notify(None, 0, "cache", "doctors:5")
+    assert 5 not in cache.doctor_cache._data
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_mark_stale_notifies_in_one_statement(
+    async_engine, test_db: AsyncSession, sql_statements: QueryLog, monkeypatch
+):
+    monkeypatch.setattr(cache, "CACHE_NOTIFY_CHANNEL", "cache_test")
+    listener = cache.InvalidationListener(async_engine, channel="cache_test")
+    await listener.start()
+    try:
+        for key in (1, 2, 3):
+            cache.doctor_cache._store(key, "doctor")
+        sql_statements.clear()
+        await cache.mark_stale(test_db, cache.doctor_cache, 1, 2, 3)
+        assert sql_statements.count == 1
+        # сбросить локально после коммита должен только другой воркер
+        test_db.sync_session.info.pop("stale_cache_keys")
+        await test_db.commit()
+        for _ in range(50):
+            if not cache.doctor_cache._data:
+                break
+            await asyncio.sleep(0.02)
+        assert not cache.doctor_cache._data
+    finally:
+        await listener.stop()
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_listener_reconnects_after_termination(async_engine):
+    listener = cache.InvalidationListener(
+        async_engine, channel="cache_test", retry_seconds=0.05
+    )
+    await listener.start()
+    try:
+        dropped = listener._conn
+        raw = await dropped.get_raw_connection()
+        pid = raw.driver_connection.get_server_pid()
+        async with async_engine.begin() as conn:
+            await conn.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if listener._conn not in (None, dropped):
+                break
+        raw = await listener._conn.get_raw_connection()
+        assert raw.driver_connection.get_server_pid() != pid
+
+        cache.clinic_cache._store(7, "clinic")
+        async with async_engine.begin() as conn:
+            await conn.execute(text("SELECT pg_notify('cache_test', 'clinics:7')"))
+        for _ in range(50):
+            if 7 not in cache.clinic_cache._data:
+                break
+            await asyncio.sleep(0.02)
+        assert 7 not in cache.clinic_cache._data
+    finally:
+        await listener.stop()
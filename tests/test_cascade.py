@@ -0,0 +1,111 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import purge
+from app.models import Appointment, Clinic, Doctor, Patient, PurgeJob
+from app.purge import delete_in_batches
+from app.querywatch import QueryLog
+from .test_query_counts import create_test_graph
+
+
+async def count_rows(db: AsyncSession) -> dict:
+    return {
+        model.__tablename__: await db.scalar(select(func.count()).select_from(model))
+        for model in (Clinic, Doctor, Patient, Appointment)
+    }
+
+
+@pytest.mark.asyncio
+async def test_delete_clinic_is_one_statement(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    """Поддерево удаляет БД: ни одного SELECT по детям и DELETE по строке."""
+    clinic = await create_test_graph(test_db, size=3)
+    sql_statements.clear()
+    response = await async_client.delete(f"/clinics/{clinic.id}")
+    assert response.status_code == 200
+    deletes = [s for s in sql_statements.statements if s.lstrip().startswith("DELETE")]
+    assert len(deletes) == 1, sql_statements.statements
+    assert await count_rows(test_db) == {
+        "clinics": 0,
+        "doctors": 0,
+        "patients": 0,
+        "appointments": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_delete_doctor_keeps_other_doctors(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    await create_test_graph(test_db, size=2)
+    response = await async_client.delete("/doctors/1")
+    assert response.status_code == 200
+    assert await count_rows(test_db) == {
+        "clinics": 1,
+        "doctors": 1,
+        "patients": 2,
+        "appointments": 2,
+    }
+    assert (await async_client.delete("/doctors/1")).status_code == 404
+    assert (await async_client.delete("/patients/1")).status_code == 404
+    assert (await async_client.delete("/appointemts/1")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_background_purge(async_client: AsyncClient, test_db: AsyncSession):
+    clinic = await create_test_graph(test_db, size=3)
+    response = await async_client.delete(f"/clinics/{clinic.id}?background=true")
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    # httpx дожидается фоновых задач вместе с ответом
+    response = await async_client.get(f"/purge/{job_id}")
+    assert response.status_code == 200
+    job = response.json()
+    assert job["status"] == "done", job
+    assert job["deleted"] == {
+        "appointments": 9,
+        "patients": 9,
+        "doctors": 3,
+        "clinics": 1,
+    }
+    assert (await count_rows(test_db))["clinics"] == 0
+    assert (await async_client.get(f"/clinics/{clinic.id}")).status_code == 404
+    assert (await async_client.get("/purge/unknown")).status_code == 404
+
+
+# задачу читает сессия другого соединения, как воркер, не принимавший DELETE
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_purge_job_is_visible_to_other_workers(
+    async_engine, async_client: AsyncClient, test_db: AsyncSession, monkeypatch
+):
+    await create_test_graph(test_db, size=1)
+    monkeypatch.setattr(purge, "PURGE_JOBS_KEEP", 1)
+    first = (await async_client.delete("/doctors/1?background=true")).json()
+    await create_test_graph(test_db, size=1)
+    second = (await async_client.delete("/doctors/2?background=true")).json()
+
+    async with AsyncSession(async_engine) as other_worker:
+        jobs = (await other_worker.scalars(select(PurgeJob))).all()
+    assert [(job.id, job.status) for job in jobs] == [(second["id"], "done")]
+    assert jobs[0].deleted == {"appointments": 1, "patients": 1, "doctors": 1}
+    assert first["id"] != second["id"]
+
+
+@pytest.mark.asyncio
+async def test_background_purge_of_missing_doctor(async_client: AsyncClient):
+    response = await async_client.delete("/doctors/1?background=true")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_delete_in_batches(test_db: AsyncSession):
+    await create_test_graph(test_db, size=3)
+    deleted = await delete_in_batches(
+        test_db, Appointment, Appointment.doctor_id.in_([1, 2]), batch_size=4
+    )
+    assert deleted == 6
+    assert (await count_rows(test_db))["appointments"] == 3
@@ -41,7 +41,7 @@ async def test_get_all_clinics(async_client: AsyncClient, test_db: AsyncSession)
 
     response = await async_client.get("/clinics/")
     assert response.status_code == 200
-    clinics = response.json()
+    clinics = response.json()["items"]
     assert len(clinics) >= 2
 
 
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.coalescing import CoalescingMiddleware, coalescing_stats
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.querywatch import QueryLog
+from app.services import appointmenr_services
+
+
+async def create_test_appointment(db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctor = Doctor(name="Doctor", clinic_id=clinic.id)
+    db.add(doctor)
+    await db.flush()
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    db.add(patient)
+    await db.flush()
+    db.add(
+        Appointment(
+            doctor_id=doctor.id, patient_id=patient.id, date=datetime(2025, 1, 1)
+        )
+    )
+    await db.commit()
+    return doctor
+
+
+@pytest.mark.asyncio
+async def test_identical_gets_share_one_query(
+    async_client: AsyncClient,
+    test_db: AsyncSession,
+    sql_statements: QueryLog,
+    monkeypatch,
+):
+    doctor = await create_test_appointment(test_db)
+    get_all = appointmenr_services.get_all_patient
+
+    async def slow_get_all(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await get_all(*args, **kwargs)
+
+    monkeypatch.setattr(appointmenr_services, "get_all_patient", slow_get_all)
+    before = coalescing_stats.snapshot()
+    sql_statements.clear()
+
+    responses = await asyncio.gather(
+        *(
+            async_client.get(
+                "/appointemts/",
+                params=(
+                    {"doctor_id": doctor.id, "limit": 10}
+                    if i % 2
+                    else {"limit": 10, "doctor_id": doctor.id}
+                ),
+            )
+            for i in range(20)
+        )
+    )
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert sql_statements.count == 1
+    after = coalescing_stats.snapshot()
+    assert after["coalesced"] - before["coalesced"] == 19
+    assert after["max_waiters"] >= 19
+    assert after["waiting"] == 0
+
+
+def test_coalescing_key():
+    middleware = CoalescingMiddleware(app=None)
+
+    def scope(path, query=b"", method="GET", headers=()):
+        return {
+            "method": method,
+            "path": path,
+            "query_string": query,
+            "headers": list(headers),
+        }
+
+    key = middleware._key(scope("/doctors/1", b"a=1&b=2"))
+    assert key == middleware._key(scope("/doctors/1", b"b=2&a=1"))
+    assert key != middleware._key(scope("/doctors/1", b"a=1&b=3"))
+    assert key != middleware._key(
+        scope("/doctors/1", b"a=1&b=2", headers=[(b"if-none-match", b'"1"')])
+    )
+    assert middleware._key(scope("/doctors/1", method="POST")) is None
+    assert middleware._key(scope("/doctors/export")) is None
+    assert middleware._key(scope("/health/pool")) is None
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app import database
+from app.models import Clinic
+
+
+def test_env_parsing(monkeypatch):
+    monkeypatch.setenv("TEST_INT", "7")
+    monkeypatch.setenv("TEST_BOOL", "Yes")
+    assert database.env_int("TEST_INT", 1) == 7
+    assert database.env_int("TEST_MISSING", 1) == 1
+    assert database.env_bool("TEST_BOOL", False) is True
+    assert database.env_bool("TEST_MISSING", True) is True
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(async_engine):
+    engine = create_async_engine(
+        async_engine.url,
+        poolclass=database.InstrumentedPool,
+        pool_size=1,
+        max_overflow=1,
+    )
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            stats = database.pool_stats(engine)
+            assert stats["checked_out"] == 2
+            assert stats["overflow"] == 1
+            assert stats["max_overflow"] == 1
+        stats = database.pool_stats(engine)
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["wait_max_ms"] >= 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_route(async_client):
+    response = await async_client.get("/health/pool")
+    assert response.status_code == 200
+    assert "checked_out" in response.json()
+
+
+def test_connect_args_for_pgbouncer():
+    args = database.connect_args(statement_cache_size=100, pgbouncer=True)
+    assert args["prepared_statement_cache_size"] == 100
+    assert args["statement_cache_size"] == 0
+    name_func = args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+    args = database.connect_args(statement_cache_size=100, pgbouncer=False)
+    assert "prepared_statement_name_func" not in args
+
+
+async def count_clinics_elsewhere(async_engine) -> int:
+    async with async_engine.connect() as conn:
+        return await conn.scalar(select(func.count(Clinic.id)))
+
+
+@pytest.mark.asyncio
+async def test_db_commits_stay_inside_test_transaction(
+    async_engine, test_db: AsyncSession
+):
+    test_db.add(Clinic(name="Clinic", address="Address"))
+    await test_db.commit()
+    test_db.add(Clinic(name="Rolled back", address="Address"))
+    await test_db.flush()
+    await test_db.rollback()
+
+    # rollback сессии откатывает только свою SAVEPOINT
+    assert await test_db.scalar(select(func.count(Clinic.id))) == 1
+    assert await test_db.scalar(select(Clinic.id)) == 1
+    assert await count_clinics_elsewhere(async_engine) == 0
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_committing_test_db_is_visible_to_other_connections(
+    async_engine, test_db: AsyncSession
+):
+    test_db.add(Clinic(name="Clinic", address="Address"))
+    await test_db.commit()
+
+    assert await count_clinics_elsewhere(async_engine) == 1
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Clinic, Doctor
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_by_id(async_client: AsyncClient, test_db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    test_db.add(clinic)
+    await test_db.commit()
+
+    response = await async_client.get(f"/clinics/{clinic.id}")
+    assert response.json()["version"] == 1
+    etag = response.headers["etag"]
+    modified = response.headers["last-modified"]
+
+    response = await async_client.get(
+        f"/clinics/{clinic.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await async_client.get(
+        f"/clinics/{clinic.id}", headers={"If-Modified-Since": modified}
+    )
+    assert response.status_code == 304
+
+    response = await async_client.put(
+        f"/clinics/{clinic.id}", json={"name": "Renamed", "address": "Address"}
+    )
+    assert response.json()["version"] == 2
+
+    response = await async_client.get(
+        f"/clinics/{clinic.id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_bumps_version(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    clinic = Clinic(name="Clinic", address="Address")
+    test_db.add(clinic)
+    await test_db.commit()
+
+    response = await async_client.post(
+        "/clinics/bulk", json=[{"id": clinic.id, "name": "New", "address": "A"}]
+    )
+    assert response.json()["items"][0]["version"] == 2
+
+
+@pytest.mark.asyncio
+async def test_collection_etag(async_client: AsyncClient, test_db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    test_db.add(clinic)
+    await test_db.commit()
+    test_db.add(Doctor(name="Doctor", clinic_id=clinic.id))
+    await test_db.commit()
+
+    response = await async_client.get("/doctors/")
+    etag = response.headers["etag"]
+    response = await async_client.get("/doctors/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    # другая страница — другой ETag
+    response = await async_client.get(
+        "/doctors/", params={"after": 1}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    await async_client.post("/doctors/", json={"name": "Second"})
+    response = await async_client.get("/doctors/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_collection_ignores_if_modified_since_after_delete(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    first, second = Doctor(name="First"), Doctor(name="Second")
+    test_db.add_all([first, second])
+    await test_db.commit()
+
+    response = await async_client.get("/doctors/")
+    assert "last-modified" not in response.headers
+    since = format_datetime(
+        datetime.now(timezone.utc) + timedelta(hours=1), usegmt=True
+    )
+
+    # самая поздняя дата на странице не меняется, а список — меняется
+    await test_db.delete(first)
+    await test_db.commit()
+    response = await async_client.get("/doctors/", headers={"If-Modified-Since": since})
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["items"]] == ["Second"]
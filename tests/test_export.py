@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import export
+from app.models import Appointment, Clinic, Doctor, Patient
+
+
+async def create_test_appointments(db: AsyncSession, count: int):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctor = Doctor(name="Doctor", clinic_id=clinic.id)
+    db.add(doctor)
+    await db.flush()
+    patient = Patient(name="Patient", doctor_id=doctor.id, clinic_id=clinic.id)
+    db.add(patient)
+    await db.flush()
+    db.add_all(
+        Appointment(
+            doctor_id=doctor.id, patient_id=patient.id, date=datetime(2025, 1, 1, i)
+        )
+        for i in range(count)
+    )
+    await db.commit()
+    return doctor
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_in_batches(
+    async_client: AsyncClient, test_db: AsyncSession, monkeypatch
+):
+    # маленькая порция, чтобы ответ собирался из нескольких чанков
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+    doctor = await create_test_appointments(test_db, 10)
+
+    response = await async_client.get("/appointemts/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 10
+    assert rows[0]["doctor_id"] == doctor.id
+    assert rows[0]["date"] == "2025-01-01T00:00:00"
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_export_csv_with_filters(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    await create_test_appointments(test_db, 5)
+
+    response = await async_client.get(
+        "/appointemts/export",
+        params={"format": "csv", "date_from": "2025-01-01T02:00:00"},
+    )
+
+    assert response.status_code == 200
+    assert "appointments.csv" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "doctor_id", "patient_id", "date"]
+    assert len(rows) == 1 + 3
+
+
+@pytest.mark.asyncio
+async def test_export_clinics(async_client: AsyncClient, test_db: AsyncSession):
+    test_db.add(Clinic(name="Clinic, Main", address="Address"))
+    await test_db.commit()
+
+    response = await async_client.get("/clinics/export", params={"format": "csv"})
+
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[1][1:] == ["Clinic, Main", "Address"]
@@ -0,0 +1,40 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.schemas import (
+    AppointmentReadSchema,
+    ClinicReadSchema,
+    DoctorReadSchema,
+    Page,
+    PatientReadSchema,
+)
+from .test_query_counts import create_test_graph
+
+LISTS = [
+    ("/clinics/", Clinic, ClinicReadSchema),
+    ("/doctors/", Doctor, DoctorReadSchema),
+    ("/patients/", Patient, PatientReadSchema),
+    ("/appointemts/", Appointment, AppointmentReadSchema),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path,model,schema", LISTS)
+async def test_fast_path_matches_schema_path(
+    async_client: AsyncClient, test_db: AsyncSession, path: str, model, schema
+):
+    """Быстрый путь отдаёт то же, что response_model по ORM-объектам."""
+    await create_test_graph(test_db, size=2)
+    response = await async_client.get(path, params={"limit": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["etag"]
+
+    objects = (await test_db.scalars(select(model).order_by(model.id))).all()
+    next_cursor = objects[1].id if len(objects) > 2 else None
+    expected = Page[schema].model_validate(
+        {"items": objects[:2], "next_cursor": next_cursor}
+    )
+    assert response.json() == expected.model_dump(mode="json")
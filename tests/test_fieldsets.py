@@ -0,0 +1,86 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.querywatch import QueryLog
+from .test_query_counts import create_test_graph
+
+
+@pytest.mark.asyncio
+async def test_fields_select_only_requested_columns(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    await create_test_graph(test_db, size=2)
+    sql_statements.clear()
+
+    response = await async_client.get("/patients/", params={"fields": "name"})
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0] == {"id": 1, "name": "Patient 0-0"}
+    assert sql_statements.count == 1
+    assert "appointment_time" not in sql_statements.statements[0]
+
+
+@pytest.mark.asyncio
+async def test_include_loads_related_in_one_query_per_relation(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    await create_test_graph(test_db, size=3)
+    sql_statements.clear()
+
+    response = await async_client.get(
+        "/patients/", params={"fields": "id,name", "include": "doctor,clinic"}
+    )
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == 9
+    assert items[0]["doctor"]["name"] == "Doctor 0"
+    assert items[-1]["doctor"]["name"] == "Doctor 2"
+    assert items[0]["clinic"]["name"] == "Clinic"
+    assert set(items[0]) == {"id", "name", "doctor", "clinic"}
+    # страница + по запросу на каждую связь
+    assert sql_statements.count == 3, sql_statements.statements
+
+
+@pytest.mark.asyncio
+async def test_projection_has_its_own_etag(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    await create_test_graph(test_db, size=1)
+    full = await async_client.get("/patients/1")
+    trimmed = await async_client.get("/patients/1", params={"fields": "name"})
+    included = await async_client.get("/patients/1", params={"include": "doctor"})
+    etags = {r.headers["etag"] for r in (full, trimmed, included)}
+    assert len(etags) == 3
+    assert trimmed.json() == {"id": 1, "name": "Patient 0-0"}
+    assert included.json()["doctor"]["id"] == 1
+
+    # представление с доктором устаревает вместе с доктором
+    etag = included.headers["etag"]
+    response = await async_client.get(
+        "/patients/1", params={"include": "doctor"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    await async_client.patch("/doctors/1", json={"name": "Renamed"})
+    response = await async_client.get(
+        "/patients/1", params={"include": "doctor"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["doctor"]["name"] == "Renamed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path,params",
+    [
+        ("/doctors/", {"fields": "name,unknown"}),
+        ("/clinics/", {"include": "doctor"}),
+        ("/appointemts/1", {"include": "clinic"}),
+    ],
+)
+async def test_unknown_names_are_rejected(
+    async_client: AsyncClient, path: str, params: dict
+):
+    response = await async_client.get(path, params=params)
+    assert response.status_code == 400
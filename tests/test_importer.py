@@ -0,0 +1,204 @@
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import importer
+from app.models import Appointment, Clinic, Doctor, Patient
+
+
+async def create_test_doctor(db: AsyncSession):
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    doctor = Doctor(name="Doctor", clinic_id=clinic.id)
+    db.add(doctor)
+    await db.commit()
+    return clinic, doctor
+
+
+async def count(db: AsyncSession, model) -> int:
+    return await db.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_import_patients_csv(async_engine, test_db: AsyncSession, tmp_path):
+    clinic, doctor = await create_test_doctor(test_db)
+    path = tmp_path / "patients.csv"
+    path.write_text(
+        "name,doctor_id,clinic_id\n"
+        f"Patient 1,{doctor.id},\n"
+        "Patient 2,999,\n"
+        f"Patient 3,,{clinic.id}\n"
+        f"Patient 4,{doctor.id},{clinic.id}\n"
+    )
+    rejects = tmp_path / "rejects.jsonl"
+
+    stats = await importer.run_import(
+        "patients", path, batch_size=2, db_engine=async_engine, rejects=rejects
+    )
+
+    assert (stats.imported, stats.rejected) == (3, 1)
+    assert json.loads(rejects.read_text())["record"] == 1
+    patient = await test_db.scalar(select(Patient).where(Patient.name == "Patient 1"))
+    assert patient.clinic_id == clinic.id
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_import_appointments_resumes(
+    async_engine, test_db: AsyncSession, tmp_path, monkeypatch
+):
+    _, doctor = await create_test_doctor(test_db)
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    test_db.add(patient)
+    await test_db.commit()
+    path = tmp_path / "appointments.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "doctor_id": doctor.id,
+                    "patient_id": patient.id,
+                    "date": f"2025-01-{day:02d}T10:00:00",
+                }
+            )
+            + "\n"
+            for day in range(1, 6)
+        )
+    )
+
+    # падаем на второй порции: первая уже закоммичена вместе с чекпоинтом
+    build_record = importer.appointment_record
+    calls = 0
+
+    def failing_record(*args):
+        nonlocal calls
+        calls += 1
+        if calls > 2:
+            raise RuntimeError("boom")
+        return build_record(*args)
+
+    monkeypatch.setitem(
+        importer.TARGETS,
+        "appointments",
+        (Appointment, importer.TARGETS["appointments"][1], failing_record),
+    )
+    with pytest.raises(RuntimeError):
+        await importer.run_import(
+            "appointments", path, batch_size=2, db_engine=async_engine
+        )
+    assert await count(test_db, Appointment) == 2
+
+    monkeypatch.undo()
+    stats = await importer.run_import(
+        "appointments", path, batch_size=2, db_engine=async_engine
+    )
+    assert stats.skipped == 2
+    assert stats.imported == 3
+    assert await count(test_db, Appointment) == 5
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_import_rejects_malformed_lines_once(
+    async_engine, test_db: AsyncSession, tmp_path, monkeypatch
+):
+    _, doctor = await create_test_doctor(test_db)
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    test_db.add(patient)
+    await test_db.commit()
+
+    def line(doctor_id: int, day: int) -> str:
+        data = {
+            "doctor_id": doctor_id,
+            "patient_id": patient.id,
+            "date": f"2025-01-{day:02d}T10:00:00",
+        }
+        return json.dumps(data) + "\n"
+
+    path = tmp_path / "appointments.jsonl"
+    path.write_text(
+        line(doctor.id, 1)
+        + '{"doctor_id": \n'
+        + line(999, 2)
+        + line(doctor.id, 3)
+        + line(doctor.id, 4)
+    )
+    rejects = tmp_path / "rejects.jsonl"
+
+    # вторая порция падает после того, как отклонила запись с доктором 999
+    build_record = importer.appointment_record
+    calls = 0
+
+    def failing_record(*args):
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            raise RuntimeError("boom")
+        return build_record(*args)
+
+    monkeypatch.setitem(
+        importer.TARGETS,
+        "appointments",
+        (Appointment, importer.TARGETS["appointments"][1], failing_record),
+    )
+    with pytest.raises(RuntimeError):
+        await importer.run_import(
+            "appointments", path, batch_size=2, db_engine=async_engine, rejects=rejects
+        )
+    monkeypatch.undo()
+    stats = await importer.run_import(
+        "appointments", path, batch_size=2, db_engine=async_engine, rejects=rejects
+    )
+
+    assert (stats.skipped, stats.imported, stats.rejected) == (2, 2, 1)
+    lines = [json.loads(line) for line in rejects.read_text().splitlines()]
+    assert [line["record"] for line in lines] == [1, 2]
+    assert lines[0]["data"] == '{"doctor_id": \n'
+    assert await count(test_db, Appointment) == 3
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_import_skips_overlapping_appointments(
+    async_engine, test_db: AsyncSession, tmp_path
+):
+    _, doctor = await create_test_doctor(test_db)
+    patient = Patient(name="Patient", doctor_id=doctor.id)
+    test_db.add(patient)
+    await test_db.flush()
+    test_db.add(
+        Appointment(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            date=datetime(2025, 1, 2, 10),
+            ends_at=datetime(2025, 1, 2, 10, 30),
+        )
+    )
+    await test_db.commit()
+    path = tmp_path / "appointments.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"doctor_id": doctor.id, "patient_id": patient.id, "date": date})
+            + "\n"
+            for date in (
+                "2025-01-01T10:00:00",
+                "2025-01-02T10:15:00",  # пересекается с приёмом в БД
+                "2025-01-03T10:00:00",
+                "2025-01-03T10:10:00",  # пересекается с записью выше
+            )
+        )
+    )
+    rejects = tmp_path / "rejects.jsonl"
+
+    stats = await importer.run_import(
+        "appointments", path, db_engine=async_engine, rejects=rejects
+    )
+
+    assert (stats.imported, stats.rejected) == (2, 2)
+    lines = [json.loads(line) for line in rejects.read_text().splitlines()]
+    assert [line["record"] for line in lines] == [1, 3]
+    assert lines[0]["error"] == "Doctor is already booked at this time"
+    assert await count(test_db, Appointment) == 3
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.coalescing import coalescing_stats
+from app.metrics import Histogram, registry
+from app.models import Patient
+from app.services import appointmenr_services
+
+# число запросов к БД без SAVEPOINT изоляции тестов
+pytestmark = pytest.mark.committing
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+def metric_value(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not found in /metrics")
+
+
+@pytest.mark.asyncio
+async def test_metrics_per_route_template(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    patients = [Patient(name=f"Patient {i}") for i in range(2)]
+    test_db.add_all(patients)
+    await test_db.commit()
+    ids = [patient.id for patient in patients]
+    # иначе запись берётся из identity map общей сессии без запроса
+    test_db.expunge_all()
+
+    for patient_id in ids:
+        response = await async_client.get(f"/patients/{patient_id}")
+        assert response.status_code == 200
+    size = len(response.content)
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    labels = 'method="GET",route="/patients/{patient_id}"'
+    assert metric_value(text, f'http_requests_total{{{labels},status="200"}}') == 2
+    assert metric_value(text, f"http_request_duration_seconds_count{{{labels}}}") == 2
+    assert (
+        metric_value(
+            text, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'
+        )
+        == 2
+    )
+    # по одному SELECT на запрос, каждый вернул одну строку
+    assert metric_value(text, f"http_request_db_queries_sum{{{labels}}}") == 2
+    assert metric_value(text, f"http_request_db_rows_total{{{labels}}}") == 2
+    assert metric_value(text, f"http_request_db_duration_seconds_sum{{{labels}}}") > 0
+    assert metric_value(text, f"http_response_size_bytes_sum{{{labels}}}") >= size
+    assert metric_value(text, "db_queries_total") >= 2
+    # сам /metrics не учитывается
+    assert 'route="/metrics"' not in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_unmatched_route_and_errors(async_client: AsyncClient):
+    await async_client.get("/no-such-path/1")
+    await async_client.get("/patients/999999")
+
+    text = (await async_client.get("/metrics")).text
+    assert (
+        metric_value(
+            text, 'http_requests_total{method="GET",route="<unmatched>",status="404"}'
+        )
+        == 1
+    )
+    assert (
+        metric_value(
+            text,
+            'http_requests_total{method="GET",route="/patients/{patient_id}",'
+            'status="404"}',
+        )
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_coalesced_requests_under_route(
+    async_client: AsyncClient, monkeypatch
+):
+    get_all = appointmenr_services.get_all_patient
+
+    async def slow_get_all(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await get_all(*args, **kwargs)
+
+    monkeypatch.setattr(appointmenr_services, "get_all_patient", slow_get_all)
+    before = coalescing_stats.coalesced
+    responses = await asyncio.gather(
+        *(async_client.get("/appointemts/") for _ in range(2))
+    )
+    assert [response.status_code for response in responses] == [200, 200]
+    assert coalescing_stats.coalesced - before == 1
+
+    text = (await async_client.get("/metrics")).text
+    labels = 'method="GET",route="/appointemts/"'
+    assert metric_value(text, f'http_requests_total{{{labels},status="200"}}') == 2
+    assert metric_value(text, f"http_request_duration_seconds_count{{{labels}}}") == 2
+    assert "<unmatched>" not in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "help", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/a",), value)
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency help", "# TYPE latency histogram"]
+    assert lines[2:] == [
+        'latency_bucket{route="/a",le="0.1"} 2',
+        'latency_bucket{route="/a",le="1.0"} 3',
+        'latency_bucket{route="/a",le="+Inf"} 4',
+        'latency_sum{route="/a"} 3.65',
+        'latency_count{route="/a"} 4',
+    ]
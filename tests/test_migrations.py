@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import inspect, text
+from app import migrations
+from app.migrations import constraint_exists, execute_all
+from app.migrations.versions import v0001_initial
+from app.database import Base
+
+
+async def drop_schema(isolated_engine):
+    async with isolated_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+
+def schema_snapshot(sync_conn) -> dict:
+    """Таблица -> (колонки, индексы, внешние ключи) в том виде, в каком
+    они есть в БД."""
+    inspector = inspect(sync_conn)
+    return {
+        table.name: (
+            {column["name"] for column in inspector.get_columns(table.name)},
+            {index["name"] for index in inspector.get_indexes(table.name)},
+            {
+                (tuple(key["constrained_columns"]), key["options"].get("ondelete"))
+                for key in inspector.get_foreign_keys(table.name)
+            },
+        )
+        for table in Base.metadata.sorted_tables
+    }
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_model_schema(isolated_engine):
+    # эталон — схема, которую создаёт create_all по моделям
+    async with isolated_engine.connect() as conn:
+        expected = await conn.run_sync(schema_snapshot)
+    await drop_schema(isolated_engine)
+
+    with pytest.raises(RuntimeError):
+        await migrations.verify(isolated_engine)
+
+    applied = await migrations.upgrade(isolated_engine)
+    assert applied == [migration.version for migration in migrations.discover()]
+    assert await migrations.verify(isolated_engine) == migrations.latest_version()
+    assert await migrations.upgrade(isolated_engine) == []
+
+    async with isolated_engine.connect() as conn:
+        assert await conn.run_sync(schema_snapshot) == expected
+
+
+@pytest.mark.asyncio
+async def test_upgrade_adopts_existing_database(isolated_engine):
+    """БД со схемой до миграций (её создавал create_all) принимается без ошибок.
+
+    Исходная схема берётся из v0001, а не из текущих моделей: остальные
+    миграции должны сами довести такую БД с данными до актуальной схемы.
+    """
+    async with isolated_engine.connect() as conn:
+        expected = await conn.run_sync(schema_snapshot)
+    await drop_schema(isolated_engine)
+    async with isolated_engine.begin() as conn:
+        await execute_all(conn, v0001_initial.STATEMENTS)
+        await conn.execute(text("INSERT INTO clinics (name) VALUES ('Clinic')"))
+        await conn.execute(
+            text("INSERT INTO doctors (name, clinic_id) VALUES ('Doctor', 1)")
+        )
+        await conn.execute(
+            text("INSERT INTO patients (name, doctor_id) VALUES ('Patient', 1)")
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO appointments (doctor_id, patient_id, date) "
+                "VALUES (1, 1, '2025-01-01 10:00'), (1, 1, '2025-01-01 11:00')"
+            )
+        )
+
+    applied = await migrations.upgrade(isolated_engine)
+
+    assert applied == [migration.version for migration in migrations.discover()]
+    assert await migrations.verify(isolated_engine) == migrations.latest_version()
+    async with isolated_engine.connect() as conn:
+        assert await conn.run_sync(schema_snapshot) == expected
+        ends = await conn.scalars(text("SELECT ends_at FROM appointments"))
+        assert len([end for end in ends if end is not None]) == 2
+        assert await constraint_exists(conn, "appointments_doctor_no_overlap")
@@ -0,0 +1,102 @@
+from datetime import datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, Clinic, Doctor, Patient
+
+
+async def create_test_data(db: AsyncSession):
+    """Две клиники по доктору, у каждого доктора пациент и две записи."""
+    clinics = [Clinic(name=f"Clinic {i}", address=f"Address {i}") for i in range(2)]
+    db.add_all(clinics)
+    await db.flush()
+    doctors = [
+        Doctor(name=f"Doctor {i}", clinic_id=c.id) for i, c in enumerate(clinics)
+    ]
+    db.add_all(doctors)
+    await db.flush()
+    patients = [
+        Patient(name=f"Patient {i}", doctor_id=d.id, clinic_id=d.clinic_id)
+        for i, d in enumerate(doctors)
+    ]
+    db.add_all(patients)
+    await db.flush()
+    appointments = [
+        Appointment(doctor_id=p.doctor_id, patient_id=p.id, date=datetime(2025, 1, day))
+        for p in patients
+        for day in (10, 20)
+    ]
+    db.add_all(appointments)
+    await db.commit()
+    return clinics, doctors, patients, appointments
+
+
+@pytest.mark.asyncio
+async def test_clinics_keyset_pages(async_client: AsyncClient, test_db: AsyncSession):
+    test_db.add_all([Clinic(name=f"Clinic {i}", address="Address") for i in range(5)])
+    await test_db.commit()
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after is not None:
+            params["after"] = after
+        response = await async_client.get("/clinics/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+
+@pytest.mark.asyncio
+async def test_limit_is_capped(async_client: AsyncClient):
+    response = await async_client.get("/clinics/", params={"limit": 100000})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_doctors_filter_by_clinic(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    clinics, doctors, _, _ = await create_test_data(test_db)
+    response = await async_client.get("/doctors/", params={"clinic_id": clinics[1].id})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["id"] for item in items] == [doctors[1].id]
+
+
+@pytest.mark.asyncio
+async def test_appointments_filters(async_client: AsyncClient, test_db: AsyncSession):
+    clinics, doctors, _, appointments = await create_test_data(test_db)
+
+    response = await async_client.get(
+        "/appointemts/", params={"clinic_id": clinics[0].id}
+    )
+    assert {item["doctor_id"] for item in response.json()["items"]} == {doctors[0].id}
+
+    response = await async_client.get(
+        "/appointemts/",
+        params={
+            "doctor_id": doctors[1].id,
+            "date_from": "2025-01-15T00:00:00",
+            "date_to": "2025-02-01T00:00:00",
+        },
+    )
+    items = response.json()["items"]
+    assert [item["id"] for item in items] == [appointments[3].id]
+
+
+@pytest.mark.asyncio
+async def test_invalid_date_range(async_client: AsyncClient):
+    response = await async_client.get(
+        "/patients/",
+        params={"date_from": "2025-02-01T00:00:00", "date_to": "2025-01-01T00:00:00"},
+    )
+    assert response.status_code == 400
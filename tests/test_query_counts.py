@@ -0,0 +1,140 @@
+from datetime import datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.querywatch import QueryLog
+
+
+async def create_test_graph(db: AsyncSession, size: int = 3):
+    """Клиника с несколькими докторами, пациентами и записями."""
+    clinic = Clinic(name="Clinic", address="Address")
+    db.add(clinic)
+    await db.flush()
+    for i in range(size):
+        doctor = Doctor(name=f"Doctor {i}", clinic_id=clinic.id)
+        db.add(doctor)
+        await db.flush()
+        for j in range(size):
+            patient = Patient(
+                name=f"Patient {i}-{j}", doctor_id=doctor.id, clinic_id=clinic.id
+            )
+            db.add(patient)
+            await db.flush()
+            db.add(
+                Appointment(
+                    doctor_id=doctor.id,
+                    patient_id=patient.id,
+                    date=datetime(2025, 1, 1 + j),
+                )
+            )
+    await db.commit()
+    # чтобы запросы не обслуживались из identity map тестовой сессии
+    db.expunge_all()
+    return clinic
+
+
+# (метод, путь, ожидаемое число SQL-запросов)
+ROUTES = [
+    ("GET", "/clinics/", 1),
+    ("GET", "/clinics/1", 1),
+    ("GET", "/clinics/name/Clinic", 1),
+    ("GET", "/doctors/", 1),
+    ("GET", "/doctors/1", 1),
+    ("GET", "/doctors/name/Doctor 0", 1),
+    ("GET", "/patients/", 1),
+    ("GET", "/patients/1", 1),
+    ("GET", "/patients/name/Patient 0-0", 1),
+    ("GET", "/appointemts/", 1),
+    ("GET", "/appointemts/1", 1),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method,path,expected", ROUTES)
+async def test_read_route_query_count(
+    async_client: AsyncClient,
+    test_db: AsyncSession,
+    sql_statements: QueryLog,
+    method: str,
+    path: str,
+    expected: int,
+):
+    await create_test_graph(test_db)
+    sql_statements.clear()
+
+    response = await async_client.request(method, path)
+
+    assert response.status_code == 200
+    assert sql_statements.count == expected, sql_statements.statements
+
+
+@pytest.mark.asyncio
+async def test_list_query_count_does_not_grow(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    await create_test_graph(test_db, size=6)
+    sql_statements.clear()
+
+    response = await async_client.get("/patients/", params={"limit": 500})
+
+    assert len(response.json()["items"]) == 36
+    assert sql_statements.count == 1
+
+
+@pytest.mark.asyncio
+async def test_write_routes_query_count(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    clinic = await create_test_graph(test_db)
+
+    sql_statements.clear()
+    response = await async_client.post(
+        "/clinics/", json={"name": "New Clinic", "address": "New Address"}
+    )
+    assert response.status_code == 200
+    # INSERT ... RETURNING
+    assert sql_statements.count == 1, sql_statements.statements
+
+    sql_statements.clear()
+    response = await async_client.put(
+        f"/clinics/{clinic.id}", json={"name": "Renamed", "address": "Address"}
+    )
+    assert response.status_code == 200
+    # UPDATE ... RETURNING
+    assert sql_statements.count == 1, sql_statements.statements
+
+    sql_statements.clear()
+    response = await async_client.patch(
+        f"/clinics/{clinic.id}", json={"address": "Moved"}
+    )
+    assert response.status_code == 200
+    assert sql_statements.count == 1, sql_statements.statements
+
+
+@pytest.mark.asyncio
+async def test_delete_clinic_query_count(
+    async_client: AsyncClient, test_db: AsyncSession, sql_statements: QueryLog
+):
+    """Число запросов на удаление не зависит от размера поддерева."""
+    counts = []
+    for size in (2, 4):
+        clinic = await create_test_graph(test_db, size=size)
+        sql_statements.clear()
+        response = await async_client.delete(f"/clinics/{clinic.id}")
+        assert response.status_code == 200
+        counts.append(sql_statements.count)
+    assert counts[0] == counts[1], sql_statements.statements
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model,attr",
+    [(Clinic, "doctors"), (Doctor, "clinic"), (Patient, "appointments")],
+)
+async def test_unloaded_relationship_raises(test_db: AsyncSession, model, attr: str):
+    await create_test_graph(test_db, size=1)
+    obj = await test_db.get(model, 1)
+    with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+        getattr(obj, attr)
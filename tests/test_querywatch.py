@@ -0,0 +1,105 @@
+import logging
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import async_get_db
+from app.main import app
+from app.models import Patient
+from app.querywatch import QueryWatchMiddleware, query_shape, watch_queries
+from .test_query_counts import create_test_graph
+
+# число запросов к БД без SAVEPOINT изоляции тестов
+pytestmark = pytest.mark.committing
+
+
+def test_query_shape_ignores_parameters():
+    assert query_shape("SELECT * FROM t WHERE id = $1") == query_shape(
+        "SELECT * FROM t\n WHERE id = $2"
+    )
+    assert query_shape("SELECT * FROM t WHERE id IN ($1, $2, $3)") == (
+        "SELECT * FROM t WHERE id IN (?, ...)"
+    )
+    assert query_shape("SELECT * FROM t WHERE id IN ($1, $2)") == query_shape(
+        "SELECT * FROM t WHERE id IN ($1, $2, $3, $4)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_watch_queries_flags_repeated_shape(test_db: AsyncSession):
+    await create_test_graph(test_db)
+
+    with watch_queries() as outer:
+        with watch_queries() as log:
+            for patient_id in (1, 2, 3):
+                await test_db.get(Patient, patient_id)
+        await test_db.get(Patient, 4)
+
+    assert log.count == 3
+    assert list(log.repeated(3).values()) == [3]
+    assert log.repeated(4) == {}
+    assert outer.count == 4
+    assert log.slow(0) == log.queries
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_headers_and_logs(
+    test_db: AsyncSession, caplog: pytest.LogCaptureFixture
+):
+    await create_test_graph(test_db)
+    watched = QueryWatchMiddleware(app, slow_ms=-1)
+    async with AsyncClient(
+        base_url="http://test", transport=ASGITransport(app=watched)
+    ) as client:
+        app.dependency_overrides[async_get_db] = lambda: test_db
+        try:
+            with caplog.at_level(logging.WARNING, logger="app.querywatch"):
+                response = await client.get("/patients/")
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["x-query-count"] == "1"
+    assert float(response.headers["x-query-time-ms"]) >= 0
+    # порог -1 мс: медленным считается любой запрос
+    assert response.headers["x-query-issues"] == "slow=1"
+    assert "Медленный запрос в GET /patients/" in caplog.text
+
+
+# (путь, бюджет запросов): связи догружаются одним IN на связь, без N+1
+BUDGETS = [
+    ("/patients/?include=doctor,clinic", 3),
+    ("/appointemts/?include=doctor,patient", 3),
+    ("/doctors/?include=clinic", 2),
+    ("/appointemts/1?include=doctor,patient", 3),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path,max_queries", BUDGETS)
+async def test_include_query_budget(
+    async_client: AsyncClient,
+    test_db: AsyncSession,
+    query_budget,
+    path: str,
+    max_queries: int,
+):
+    await create_test_graph(test_db, size=4)
+
+    with query_budget(max_queries, repeats=2):
+        response = await async_client.get(path)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_query_budget_fails_on_n_plus_one(test_db: AsyncSession, query_budget):
+    await create_test_graph(test_db)
+
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with query_budget(10):
+            for patient_id in (1, 2, 3):
+                await test_db.get(Patient, patient_id)
+    with pytest.raises(AssertionError, match="budget 2"):
+        with query_budget(2, repeats=10):
+            for patient_id in (4, 5, 6):
+                await test_db.get(Patient, patient_id)
@@ -0,0 +1,178 @@
+import time
+from contextlib import asynccontextmanager, contextmanager
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app import cache, database
+from app.coalescing import CoalescingMiddleware
+from app.main import app
+from app.replicas import PRIMARY_COOKIE, ReplicaRoutingMiddleware, ReplicaSet
+
+
+class StandIn:
+    """Заглушка реплики: connect() работает, пока реплика жива."""
+
+    def __init__(self, name: str, alive: bool = True):
+        self.name = name
+        self.alive = alive
+
+    @asynccontextmanager
+    async def connect(self):
+        if not self.alive:
+            raise ConnectionError(f"{self.name} is down")
+        yield self
+
+    async def execute(self, statement):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_round_robin_over_healthy_replicas():
+    first, second, third = StandIn("a"), StandIn("b", alive=False), StandIn("c")
+    replicas = ReplicaSet([first, second, third])
+    assert [replicas.choose() for _ in range(4)] == [first, second, third, first]
+
+    assert await replicas.check() == [first, third]
+    assert {replicas.choose() for _ in range(4)} == {first, third}
+
+    first.alive = third.alive = False
+    await replicas.check()
+    assert replicas.choose() is None
+
+    second.alive = True
+    await replicas.check()
+    assert replicas.choose() is second
+
+
+@contextmanager
+def statement_counter(db_engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(
+            db_engine.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+
+
+# запись на «основном» должна быть видна второму engine той же БД
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_client_writes(async_engine, monkeypatch):
+    # вместо реплики — второй engine той же тестовой БД
+    replica = create_async_engine(async_engine.url, poolclass=NullPool)
+    monkeypatch.setattr(database, "engine", async_engine)
+    routed = ReplicaRoutingMiddleware(app, replicas=ReplicaSet([replica]), window=60)
+    try:
+        with statement_counter(async_engine) as on_primary, statement_counter(
+            replica
+        ) as on_replica:
+            async with AsyncClient(
+                base_url="http://test", transport=ASGITransport(app=routed)
+            ) as client:
+                response = await client.get("/clinics/")
+                assert response.status_code == 200
+                assert (len(on_primary), len(on_replica)) == (0, 1)
+
+                response = await client.post(
+                    "/clinics/", json={"name": "Clinic", "address": "Address"}
+                )
+                assert response.status_code == 200
+                assert float(response.cookies[PRIMARY_COOKIE]) > time.time()
+                assert len(on_primary) == 1
+
+                # сразу после записи клиент читает с основного сервера
+                response = await client.get("/clinics/")
+                assert [item["name"] for item in response.json()["items"]] == ["Clinic"]
+                assert (len(on_primary), len(on_replica)) == (2, 1)
+
+                client.cookies.clear()
+                response = await client.get("/clinics/")
+                assert len(response.json()["items"]) == 1
+                assert (len(on_primary), len(on_replica)) == (2, 2)
+    finally:
+        await replica.dispose()
+
+
+@pytest.mark.committing
+@pytest.mark.asyncio
+async def test_batch_get_reads_from_replica_and_does_not_pin(async_engine, monkeypatch):
+    replica = create_async_engine(async_engine.url, poolclass=NullPool)
+    monkeypatch.setattr(database, "engine", async_engine)
+    routed = ReplicaRoutingMiddleware(app, replicas=ReplicaSet([replica]), window=60)
+    try:
+        with statement_counter(async_engine) as on_primary, statement_counter(
+            replica
+        ) as on_replica:
+            async with AsyncClient(
+                base_url="http://test", transport=ASGITransport(app=routed)
+            ) as client:
+                response = await client.post("/clinics/batch-get", json={"ids": [1]})
+                assert response.status_code == 200
+                assert PRIMARY_COOKIE not in response.cookies
+                assert (len(on_primary), len(on_replica)) == (0, 1)
+    finally:
+        await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_does_not_pin_and_no_replicas_means_primary(
+    async_client: AsyncClient,
+):
+    routed = ReplicaRoutingMiddleware(app, replicas=ReplicaSet([]), window=60)
+    async with AsyncClient(
+        base_url="http://test", transport=ASGITransport(app=routed)
+    ) as client:
+        response = await client.put(
+            "/clinics/999", json={"name": "Clinic", "address": "Address"}
+        )
+        assert response.status_code == 404
+        assert PRIMARY_COOKIE not in response.cookies
+        # без живых реплик чтение идёт на основной (здесь — тестовую сессию)
+        response = await client.get("/clinics/")
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_values_read_from_replica_are_not_cached():
+    async def load():
+        return "replica"
+
+    token = database.session_engine.set(StandIn("replica"))
+    try:
+        assert await cache.doctor_cache.get_or_load(1, load) == "replica"
+    finally:
+        database.session_engine.reset(token)
+    assert 1 not in cache.doctor_cache._data
+
+
+@pytest.mark.asyncio
+async def test_pinned_reads_skip_cache_and_store_primary_value():
+    async def stale():
+        return "stale"
+
+    async def fresh():
+        return "fresh"
+
+    await cache.doctor_cache.get_or_load(1, stale)
+    token = database.session_pinned.set(True)
+    try:
+        assert await cache.doctor_cache.get_or_load(1, fresh) == "fresh"
+    finally:
+        database.session_pinned.reset(token)
+    assert await cache.doctor_cache.get_or_load(1, stale) == "fresh"
+
+
+def test_coalescing_keeps_replica_and_primary_reads_apart():
+    middleware = CoalescingMiddleware(app=None)
+    scope = {"method": "GET", "path": "/clinics/", "query_string": b"", "headers": []}
+    assert middleware._key({**scope, "db_read": "replica"}) != middleware._key(
+        {**scope, "db_read": "primary"}
+    )
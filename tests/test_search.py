@@ -0,0 +1,53 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Clinic, Doctor, Patient
+from app.search import escape_like, similarity
+
+
+def test_similarity_matches_pg_trgm():
+    # пример из документации pg_trgm
+    assert similarity("word", "two words") == pytest.approx(0.363636, abs=1e-6)
+    assert similarity("Smirnov", "smirnof") == pytest.approx(0.6)
+    assert escape_like("50%_a/b") == "50/%/_a//b"
+
+
+@pytest.mark.asyncio
+async def test_search_prefix_typos_and_ranking(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    clinic = Clinic(name="Ivanovo Clinic", address="Address")
+    test_db.add(clinic)
+    await test_db.flush()
+    test_db.add(Doctor(name="Smirnov Petr", clinic_id=clinic.id))
+    test_db.add_all(
+        [
+            Patient(name=name, doctor_id=None)
+            for name in ("Ivanov Ivan", "ivanova Anna", "Sidorov Oleg")
+        ]
+    )
+    await test_db.commit()
+
+    response = await async_client.get("/search/", params={"q": "IVAN"})
+    assert response.status_code == 200
+    hits = response.json()
+    # совпадения по префиксу без учёта регистра идут первыми
+    assert {hit["name"] for hit in hits} == {
+        "Ivanov Ivan",
+        "ivanova Anna",
+        "Ivanovo Clinic",
+    }
+    assert hits == sorted(hits, key=lambda hit: -hit["score"])
+
+    response = await async_client.get("/search/", params={"q": "smirnof"})
+    assert [(hit["type"], hit["name"]) for hit in response.json()] == [
+        ("doctors", "Smirnov Petr")
+    ]
+
+    response = await async_client.get(
+        "/search/", params={"q": "ivan", "type": "clinics", "limit": 1}
+    )
+    assert [hit["type"] for hit in response.json()] == ["clinics"]
+
+    response = await async_client.get("/search/", params={"q": "i"})
+    assert response.status_code == 422
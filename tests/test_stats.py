@@ -0,0 +1,178 @@
+from datetime import date, datetime, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Appointment, Clinic, Doctor, Patient
+from app.stats import STATS_REFRESH_DAYS, refresh_window
+
+RANGE = {"date_from": "2025-01-01", "date_to": "2025-01-08"}
+
+
+async def create_stats_data(db: AsyncSession):
+    """Две клиники; у доктора 1 три приёма за два дня, у доктора 2 — один."""
+    first, second = Clinic(name="First", address="A"), Clinic(
+        name="Second", address="B"
+    )
+    db.add_all([first, second])
+    await db.flush()
+    doctors = [
+        Doctor(name="Busy", clinic_id=first.id),
+        Doctor(name="Idle", clinic_id=first.id),
+        Doctor(name="Other", clinic_id=second.id, slot_minutes=60),
+    ]
+    db.add_all(doctors)
+    await db.flush()
+    patients = [Patient(name=f"Patient {i}", clinic_id=first.id) for i in range(3)]
+    patients.append(Patient(name="Patient 3", clinic_id=second.id))
+    db.add_all(patients)
+    await db.flush()
+    for doctor, start in [
+        (doctors[0], datetime(2025, 1, 1, 9)),
+        (doctors[0], datetime(2025, 1, 1, 10)),
+        (doctors[0], datetime(2025, 1, 3, 9)),
+        (doctors[2], datetime(2025, 1, 2, 9)),
+        # вне диапазона
+        (doctors[0], datetime(2025, 2, 1, 9)),
+    ]:
+        minutes = doctor.slot_minutes or 30
+        db.add(
+            Appointment(
+                doctor_id=doctor.id,
+                patient_id=patients[0].id,
+                date=start,
+                ends_at=start + timedelta(minutes=minutes),
+            )
+        )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("source", ["live", "summary"])
+async def test_appointments_per_day(
+    async_client: AsyncClient, test_db: AsyncSession, source: str
+):
+    await create_stats_data(test_db)
+    if source == "summary":
+        response = await async_client.post("/stats/refresh")
+        assert response.json() == {"rows": 4}
+
+    response = await async_client.get(
+        "/stats/appointments-per-day", params={**RANGE, "source": source}
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "doctor_id": 1,
+            "day": "2025-01-01",
+            "appointments": 2,
+            "booked_minutes": 60,
+            "cumulative": 2,
+        },
+        {
+            "doctor_id": 1,
+            "day": "2025-01-03",
+            "appointments": 1,
+            "booked_minutes": 30,
+            "cumulative": 3,
+        },
+        {
+            "doctor_id": 3,
+            "day": "2025-01-02",
+            "appointments": 1,
+            "booked_minutes": 60,
+            "cumulative": 1,
+        },
+    ]
+
+    response = await async_client.get(
+        "/stats/appointments-per-day",
+        params={**RANGE, "source": source, "clinic_id": 2},
+    )
+    assert [row["doctor_id"] for row in response.json()] == [3]
+
+
+@pytest.mark.asyncio
+async def test_doctor_load(async_client: AsyncClient, test_db: AsyncSession):
+    await create_stats_data(test_db)
+    response = await async_client.get("/stats/doctor-load", params=RANGE)
+    assert response.status_code == 200
+    load = {row["name"]: row for row in response.json()}
+    assert load["Busy"]["appointments"] == 3
+    assert load["Busy"]["rank_in_clinic"] == 1
+    assert load["Busy"]["share_of_clinic"] == 1.0
+    assert load["Idle"]["appointments"] == 0
+    assert load["Idle"]["rank_in_clinic"] == 2
+    assert load["Other"]["booked_minutes"] == 60
+    assert load["Other"]["rank_in_clinic"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("source", ["live", "summary"])
+async def test_patients_per_clinic(
+    async_client: AsyncClient, test_db: AsyncSession, source: str
+):
+    await create_stats_data(test_db)
+    if source == "summary":
+        await async_client.post("/stats/refresh", params=RANGE)
+    response = await async_client.get(
+        "/stats/patients-per-clinic", params={"source": source}
+    )
+    assert response.json() == [
+        {"clinic_id": 1, "name": "First", "patients": 3, "share": 0.75, "rank": 1},
+        {"clinic_id": 2, "name": "Second", "patients": 1, "share": 0.25, "rank": 2},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_summary_refresh_by_range(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    await create_stats_data(test_db)
+    response = await async_client.post("/stats/refresh", params=RANGE)
+    assert response.json() == {"rows": 3}
+    response = await async_client.get(
+        "/stats/appointments-per-day",
+        params={
+            "date_from": "2025-01-01",
+            "date_to": "2025-03-01",
+            "source": "summary",
+        },
+    )
+    # февральский приём вне пересчитанного диапазона ещё не в сводке
+    assert len(response.json()) == 3
+
+
+@pytest.mark.asyncio
+async def test_stats_range_is_checked(async_client: AsyncClient):
+    response = await async_client.get(
+        "/stats/doctor-load",
+        params={"date_from": "2025-01-08", "date_to": "2025-01-01"},
+    )
+    assert response.status_code == 400
+    response = await async_client.get(
+        "/stats/doctor-load",
+        params={"date_from": "2024-01-01", "date_to": "2025-06-01"},
+    )
+    assert response.status_code == 400
+
+
+def test_refresh_window():
+    start, end = refresh_window(date(2025, 3, 1))
+    assert start == date(2025, 3, 1) - timedelta(days=STATS_REFRESH_DAYS)
+    assert end == date(2025, 3, 2) + timedelta(days=STATS_REFRESH_DAYS)
+
+
+@pytest.mark.asyncio
+async def test_clinic_summary_waits_for_refresh(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    await create_stats_data(test_db)
+    params = {"source": "summary"}
+    response = await async_client.get("/stats/patients-per-clinic", params=params)
+    assert [clinic["patients"] for clinic in response.json()] == [0, 0]
+
+    await async_client.post("/stats/refresh")
+    test_db.add(Patient(name="Patient 4", clinic_id=2))
+    await test_db.commit()
+    response = await async_client.get("/stats/patients-per-clinic", params=params)
+    assert [clinic["patients"] for clinic in response.json()] == [3, 1]
@@ -0,0 +1,123 @@
+import logging
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Clinic, Doctor
+from app.writes import CONFLICT_DETAIL, integrity_error
+from .test_booking import create_doctor_and_patient
+
+
+@pytest.mark.asyncio
+async def test_patch_changes_only_sent_fields(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    response = await async_client.post(
+        "/clinics/", json={"name": "Clinic", "address": "Address"}
+    )
+    clinic = response.json()
+    assert clinic["version"] == 1
+
+    response = await async_client.patch(
+        f"/clinics/{clinic['id']}", json={"address": "Moved"}
+    )
+    assert response.status_code == 200
+    patched = response.json()
+    assert patched["name"] == "Clinic"
+    assert patched["address"] == "Moved"
+    assert patched["version"] == 2
+
+    # пустой PATCH ничего не пишет
+    response = await async_client.patch(f"/clinics/{clinic['id']}", json={})
+    assert response.json()["version"] == 2
+    # обязательное поле нельзя обнулить
+    response = await async_client.patch(f"/clinics/{clinic['id']}", json={"name": None})
+    assert response.status_code == 422
+    response = await async_client.patch("/clinics/999", json={"name": "Other"})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_patch_patient_can_unset_doctor(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    _, patient = await create_doctor_and_patient(test_db)
+    response = await async_client.patch(
+        f"/patients/{patient.id}", json={"doctor_id": None}
+    )
+    assert response.status_code == 200
+    assert response.json()["doctor_id"] is None
+    assert response.json()["name"] == "Patient"
+
+
+@pytest.mark.asyncio
+async def test_broken_reference_is_404(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    doctor, patient = await create_doctor_and_patient(test_db)
+    # откат в сервисе истекает объекты общей с тестом сессии
+    doctor_id, patient_id = doctor.id, patient.id
+    response = await async_client.patch(
+        f"/patients/{patient_id}", json={"doctor_id": 999}
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Doctor with id=999 not found"
+
+    response = await async_client.post(
+        "/appointemts/",
+        json={"doctor_id": doctor_id, "patient_id": 999, "date": "2025-01-01T10:00"},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Patient with id=999 not found"
+
+
+@pytest.mark.asyncio
+async def test_patch_appointment_keeps_duration(
+    async_client: AsyncClient, test_db: AsyncSession
+):
+    doctor, patient = await create_doctor_and_patient(test_db)
+    other = Doctor(name="Other", clinic_id=doctor.clinic_id, slot_minutes=45)
+    test_db.add(other)
+    await test_db.commit()
+    response = await async_client.post(
+        "/appointemts/",
+        json={
+            "doctor_id": doctor.id,
+            "patient_id": patient.id,
+            "date": "2025-01-01T10:00:00",
+        },
+    )
+    appointment_id = response.json()["id"]
+
+    response = await async_client.patch(
+        f"/appointemts/{appointment_id}", json={"date": "2025-01-02T09:00:00"}
+    )
+    assert response.status_code == 200
+    assert response.json()["ends_at"] == "2025-01-02T09:30:00"
+
+    # другой доктор — длина приёма по его слоту
+    response = await async_client.patch(
+        f"/appointemts/{appointment_id}", json={"doctor_id": other.id}
+    )
+    assert response.status_code == 200
+    assert response.json()["date"] == "2025-01-02T09:00:00"
+    assert response.json()["ends_at"] == "2025-01-02T09:45:00"
+
+
+@pytest.mark.asyncio
+async def test_unmapped_conflict_hides_database_text(
+    test_db: AsyncSession, caplog: pytest.LogCaptureFixture
+):
+    clinic = Clinic(name="Clinic", address="Secret address")
+    test_db.add(clinic)
+    await test_db.commit()
+    values = {"id": clinic.id, "name": "Clinic", "address": "Secret address"}
+    with pytest.raises(IntegrityError) as info:
+        async with test_db.begin_nested():
+            await test_db.execute(insert(Clinic).values(values))
+
+    with caplog.at_level(logging.WARNING, logger="app.writes"):
+        error = integrity_error(Clinic, values, info.value)
+    assert (error.status_code, error.detail) == (409, CONFLICT_DETAIL)
+    assert "clinics_pkey" in caplog.text